@@ -1,11 +1,32 @@
 import requests
+import csv
+import copy
+import io
+import html
+import zipfile
 import json
+import os
+import sqlite3
 import re
+import math
+import hashlib
 import random
+import calendar
 from canvasapi import Canvas
 from canvasapi.custom_gradebook_columns import CustomGradebookColumn
 from canvasapi.custom_gradebook_columns import ColumnData
 import time
+import itertools
+import threading
+import multiprocessing
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, as_completed
+from collections import OrderedDict, deque, namedtuple
+from urllib.parse import parse_qs, urlencode, urlsplit, urlunsplit
+from functools import lru_cache
+from contextlib import contextmanager, redirect_stdout
+from bisect import bisect_left, bisect_right
+from array import array
+from requests.adapters import HTTPAdapter
 
 # Canvas API Configuration
 API_URL = 'https://morenetlab.instructure.com'
@@ -18,28 +39,115 @@ COURSE_ID = None
 canvas = None
 
 
-DATA_FILE = "canvas_data.json" # stores the student id and quiz ids so that they can be easily removed
+STATE_DB = "canvas_state.db" # SQLite store of the created students and quizzes so that they can be easily removed
+STATE_DB_TIMEOUT = 30 # seconds to wait for another run's write to finish
+DATA_FILE = "canvas_data.json" # older JSON state; imported into STATE_DB once (and again if it changes)
 DEFAULT_PASSWORD = "Pass123!"
+DEFAULT_MAX_WORKERS = 8 # number of students/requests processed in parallel
+
+# HTTP transport settings (can be overridden in config.json)
+HTTP_TIMEOUT = 30 # seconds before a Canvas request is abandoned
+HTTP_POOL_SIZE = 32 # keep-alive connections kept open per host; keep >= DEFAULT_MAX_WORKERS
+http_session = None # shared by the raw API helpers and the canvasapi requester
+
+# Pagination
+PAGE_SIZE = 100 # items requested per page (Canvas's maximum for most lists)
+PREFETCH_PAGES = 4 # pages fetched ahead while the caller works through the current one
+
+# GraphQL
+SUBMISSIONS_SOURCE = "rest" # "rest" or "graphql": how submission records are read (can be set in config.json)
+GRAPHQL_PAGE_SIZE = 100 # submissions requested per connection page
+GRAPHQL_BATCH_SIZE = 10 # assignments paged together in one GraphQL request
+
+# Rate-limit throttling (Canvas uses a leaky bucket, reported in X-Rate-Limit-Remaining)
+RATE_LIMIT_COMFORTABLE = 300.0 # no throttling while at least this much quota is left
+RATE_LIMIT_FLOOR = 50.0 # below this, requests are paced at the bucket's leak rate
+RATE_LIMIT_LEAK_RATE = 10.0 # quota units Canvas restores per second
+
+# Retries and circuit breaker
+RETRY_MAX_ATTEMPTS = 5 # attempts per request, including the first
+RETRY_BASE_DELAY = 0.5 # seconds; doubled on every retry (with full jitter)
+RETRY_MAX_DELAY = 30.0 # cap on a single backoff delay
+RETRY_BUDGET = 120.0 # seconds a request may spend retrying (and waiting on an open circuit) in total
+IDEMPOTENT_METHODS = frozenset(["GET", "HEAD", "OPTIONS", "PUT", "DELETE"]) # safe to replay after an unclear failure
+CIRCUIT_WINDOW = 20 # recent requests per host the circuit breaker looks at
+CIRCUIT_MIN_REQUESTS = 10 # outcomes needed before the circuit can open
+CIRCUIT_FAILURE_RATE = 0.5 # share of failed requests that opens the circuit
+CIRCUIT_COOLDOWN = 30.0 # seconds an open circuit waits before letting a probe request through
+
+# Fleet sync (many courses across worker processes)
+FLEET_PROCESSES = 4 # worker processes, each with its own Canvas client
+FLEET_REQUEST_RATE = 20.0 # requests per second shared by all worker processes (None = no limit)
+
+# Synthetic answer plans
+LEVEL_DIFFICULTY_STEP = 1.0 # logits of Rasch difficulty between consecutive question levels
+
+# Request metrics
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0) # histogram bounds in seconds
+METRICS_JSON_FILE = None # where report_metrics() writes the JSON summary (None = not written)
+METRICS_PROMETHEUS_FILE = None # where report_metrics() writes the Prometheus text format
+
+# Bulk write settings
+BULK_CHUNK_SIZE = 100 # column/user/content triples sent per bulk request
+PROGRESS_POLL_INTERVAL = 1.0 # seconds before the first Progress poll
+PROGRESS_TIMEOUT = 300 # seconds to wait for a Canvas background job
+GRADE_PAYLOAD_MAX_BYTES = 64 * 1024 # upper bound on the JSON body of one update_grades request
+
+# Grade mapping
+MAPPING_KEY = "quiz_4_mapping_data" # key of the score-to-percent rules inside the stored mapping data
+MAPPING_CHUNK_SIZE = 1000 # submissions mapped per GradeMapping.evaluate call while streaming
+
+MAPPING_CACHE_FILE = None # optional JSON file that keeps parsed quiz mappings between runs
+
+# Incremental grade sync
+WATERMARK_OVERLAP = 300 # seconds a watermark is set back from the run's start, to allow for clock skew
+
+# Quiz authoring
+QTI_IMPORT_THRESHOLD = 200 # question banks at least this large are imported as one QTI content migration
+MIGRATION_TIMEOUT = 600 # seconds to wait for a content migration to finish
+
+# Course/quiz/assignment object cache
+OBJECT_CACHE_TTL = 300 # seconds a fetched object is reused
+OBJECT_CACHE_SIZE = 512 # objects kept before the least recently used is evicted
+
+# Test student provisioning
+SIS_IMPORT_THRESHOLD = 500 # batches at least this large are created with one SIS import instead of per-user calls
+SIS_IMPORT_TIMEOUT = 900 # seconds to wait for a SIS import to finish
 
 
 #region ==================== Utility Functions ==================== #
 
-def initialize_canvas():
-    """Loads the API token and course ID from config.json, then initializes the Canvas object."""
-    global TOKEN, COURSE_ID, canvas, HEADERS  # Declare global variables
+def initialize_canvas(api_url=None, token=None, course_id=None, config_file="config.json"):
+    """
+    Loads the API token and course ID from config.json, then initializes the Canvas object.
+    config.json may also set "API_URL" (e.g. a local mock_canvas.py server). Passing api_url,
+    token and course_id overrides the file; if token and course_id are both given the file
+    is not read at all.
+    """
+    global API_URL, TOKEN, COURSE_ID, canvas, METRICS_JSON_FILE, METRICS_PROMETHEUS_FILE, SUBMISSIONS_SOURCE, \
+        MAPPING_CACHE_FILE  # Declare global variables
 
     try:
-        with open("config.json", "r") as file:
-            config = json.load(file)
-            TOKEN = config.get("TOKEN")
-            COURSE_ID = config.get("COURSE_ID")
+        config = {}
+        if not (token and course_id):
+            with open(config_file, "r") as file:
+                config = json.load(file)
+
+        API_URL = (api_url or config.get("API_URL") or API_URL).rstrip("/")
+        TOKEN = token or config.get("TOKEN")
+        COURSE_ID = course_id or config.get("COURSE_ID")
+        configure_http(pool_size=config.get("HTTP_POOL_SIZE"), timeout=config.get("HTTP_TIMEOUT"))
+        MAPPING_CACHE_FILE = config.get("MAPPING_CACHE_FILE", MAPPING_CACHE_FILE)
+        METRICS_JSON_FILE = config.get("METRICS_JSON_FILE", METRICS_JSON_FILE)
+        METRICS_PROMETHEUS_FILE = config.get("METRICS_PROMETHEUS_FILE", METRICS_PROMETHEUS_FILE)
+        SUBMISSIONS_SOURCE = config.get("SUBMISSIONS_SOURCE", SUBMISSIONS_SOURCE)
 
         if not TOKEN or not COURSE_ID:
             raise ValueError("Missing TOKEN or COURSE_ID in config.json")
 
         # Initialize Canvas API instance
         canvas = Canvas(API_URL, TOKEN)
-        HEADERS = {"Authorization": f"Bearer {TOKEN}"}
+        share_http_session(canvas)
         print("Canvas API initialized successfully.")
 
     except FileNotFoundError:
@@ -50,18 +158,1157 @@ def initialize_canvas():
         print(f"Unexpected error: {e}")
 
 def save_data_to_file(data):
-    """Saves data to a JSON file."""
-    with open(DATA_FILE, "w") as file:
-        json.dump(data, file, indent=4)
-    print(f"Data saved to {DATA_FILE}")
+    """
+    Replaces the tracked students and quizzes with data ({"students": [...], "quizzes": [...]}).
+    Kept for older scripts; new code should use the StateStore methods, which only touch the
+    records that changed.
+    """
+    get_state_store().replace_all(data.get("students", []), data.get("quizzes", []))
+    print(f"Data saved to {STATE_DB}")
 
 def load_data_from_file():
-    """Loads data from a JSON file."""
+    """Returns the tracked students and quizzes in the old canvas_data.json layout."""
+    store = get_state_store()
+    return {"students": store.get_students(), "quizzes": store.get_quizzes()}
+
+#endregion
+
+#region ==================== State Store ==================== #
+
+class StateStore:
+    """
+    SQLite store for the students and quizzes this project creates.
+
+    Each change is its own transaction touching only the affected rows, so tracking costs
+    the same however much is stored, and concurrent runs are serialised by SQLite (WAL mode)
+    instead of overwriting each other's JSON. Records are kept as JSON next to their indexed
+    id/course columns, so any extra fields (tokens, passwords, SIS ids) round-trip unchanged.
+    """
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS students (
+            id INTEGER PRIMARY KEY,
+            email TEXT,
+            data TEXT NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS students_email ON students (email);
+        CREATE TABLE IF NOT EXISTS quizzes (
+            id INTEGER PRIMARY KEY,
+            course_id INTEGER,
+            title TEXT,
+            created_seq INTEGER NOT NULL,
+            data TEXT NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS quizzes_course ON quizzes (course_id, created_seq);
+        CREATE TABLE IF NOT EXISTS answer_keys (
+            quiz_id INTEGER PRIMARY KEY,
+            course_id INTEGER,
+            version TEXT NOT NULL,
+            data TEXT NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS answer_keys_course ON answer_keys (course_id);
+        CREATE TABLE IF NOT EXISTS watermarks (
+            scope TEXT NOT NULL,
+            object_id INTEGER NOT NULL,
+            submitted_at TEXT,
+            graded_at TEXT,
+            PRIMARY KEY (scope, object_id)
+        );
+        CREATE TABLE IF NOT EXISTS meta (
+            key TEXT PRIMARY KEY,
+            value TEXT
+        );
+    """
+
+    def __init__(self, path=STATE_DB):
+        self.path = path
+        self.pid = os.getpid()
+        self.lock = threading.RLock()
+        self.connection = sqlite3.connect(path, timeout=STATE_DB_TIMEOUT, check_same_thread=False,
+                                          isolation_level=None) # transactions are opened explicitly
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("PRAGMA synchronous=NORMAL")
+        self.connection.executescript(self.SCHEMA)
+
+    @contextmanager
+    def transaction(self):
+        """Runs the block as one atomic write transaction (nested blocks join the outer one)."""
+        with self.lock:
+            if self.connection.in_transaction:
+                yield self.connection
+                return
+            self.connection.execute("BEGIN IMMEDIATE")
+            try:
+                yield self.connection
+            except BaseException:
+                self.connection.execute("ROLLBACK")
+                raise
+            self.connection.execute("COMMIT")
+
+    def query(self, sql, params=()):
+        with self.lock:
+            return self.connection.execute(sql, params).fetchall()
+
+    def close(self):
+        with self.lock:
+            self.connection.close()
+
+    # ---- students ----
+
+    def add_students(self, students):
+        """Inserts or updates student records (dicts with at least an "id") in one transaction."""
+        rows = [(student["id"], student.get("email"), json.dumps(student)) for student in students]
+        with self.transaction() as connection:
+            connection.executemany("INSERT OR REPLACE INTO students (id, email, data) VALUES (?, ?, ?)", rows)
+        return len(rows)
+
+    def get_students(self, student_ids=None):
+        """Returns all tracked students, or only those in student_ids, ordered by id."""
+        if student_ids is None:
+            rows = self.query("SELECT data FROM students ORDER BY id")
+        else:
+            ids = list(student_ids)
+            rows = self.query(f"SELECT data FROM students WHERE id IN ({','.join('?' * len(ids))}) ORDER BY id", ids)
+        return [json.loads(data) for data, in rows]
+
+    def get_student(self, student_id):
+        rows = self.query("SELECT data FROM students WHERE id = ?", (student_id,))
+        return json.loads(rows[0][0]) if rows else None
+
+    def count_students(self):
+        return self.query("SELECT COUNT(*) FROM students")[0][0]
+
+    def remove_students(self, student_ids=None):
+        """Removes the given students, or every student when student_ids is None."""
+        with self.transaction() as connection:
+            if student_ids is None:
+                connection.execute("DELETE FROM students")
+            else:
+                connection.executemany("DELETE FROM students WHERE id = ?", [(i,) for i in student_ids])
+
+    # ---- quizzes ----
+
+    def add_quizzes(self, quizzes):
+        """
+        Inserts or updates quiz records ({"id", "title", "course_id", ...}) in one transaction.
+        An updated quiz keeps its place in the creation order.
+        """
+        with self.transaction() as connection:
+            seq = connection.execute("SELECT COALESCE(MAX(created_seq), 0) FROM quizzes").fetchone()[0]
+            rows = [(quiz["id"], quiz.get("course_id"), quiz.get("title"), quiz["id"], seq + i, json.dumps(quiz))
+                    for i, quiz in enumerate(quizzes, start=1)]
+            connection.executemany("INSERT OR REPLACE INTO quizzes (id, course_id, title, created_seq, data) "
+                                   "VALUES (?, ?, ?, COALESCE((SELECT created_seq FROM quizzes WHERE id = ?), ?), ?)",
+                                   rows)
+        return len(rows)
+
+    def add_quiz(self, quiz):
+        self.add_quizzes([quiz])
+
+    def get_quizzes(self, course_id=None):
+        """Returns tracked quizzes in the order they were created, optionally for one course."""
+        if course_id is None:
+            rows = self.query("SELECT data FROM quizzes ORDER BY created_seq")
+        else:
+            rows = self.query("SELECT data FROM quizzes WHERE course_id = ? ORDER BY created_seq", (course_id,))
+        return [json.loads(data) for data, in rows]
+
+    def get_quiz(self, quiz_id):
+        rows = self.query("SELECT data FROM quizzes WHERE id = ?", (quiz_id,))
+        return json.loads(rows[0][0]) if rows else None
+
+    def last_quiz(self, course_id=None):
+        """Returns the most recently tracked quiz (optionally within a course), or None."""
+        if course_id is None:
+            rows = self.query("SELECT data FROM quizzes ORDER BY created_seq DESC LIMIT 1")
+        else:
+            rows = self.query("SELECT data FROM quizzes WHERE course_id = ? ORDER BY created_seq DESC LIMIT 1",
+                              (course_id,))
+        return json.loads(rows[0][0]) if rows else None
+
+    def remove_quiz(self, quiz_id):
+        with self.transaction() as connection:
+            connection.execute("DELETE FROM quizzes WHERE id = ?", (quiz_id,))
+
+    # ---- answer keys ----
+
+    def get_answer_key(self, quiz_id):
+        """Returns (version, answer key) for a quiz, or (None, None). Question IDs come back as ints."""
+        rows = self.query("SELECT version, data FROM answer_keys WHERE quiz_id = ?", (quiz_id,))
+        if not rows:
+            return None, None
+        version, data = rows[0]
+        return version, {int(question_id): entry for question_id, entry in json.loads(data).items()}
+
+    def get_answer_key_versions(self, course_id):
+        """Returns {quiz_id: version} for every answer key stored for a course."""
+        return dict(self.query("SELECT quiz_id, version FROM answer_keys WHERE course_id = ?", (course_id,)))
+
+    def put_answer_keys(self, entries):
+        """Stores [(quiz_id, course_id, version, answer key)] in one transaction."""
+        rows = [(quiz_id, course_id, version, json.dumps(answer_key))
+                for quiz_id, course_id, version, answer_key in entries]
+        with self.transaction() as connection:
+            connection.executemany("INSERT OR REPLACE INTO answer_keys (quiz_id, course_id, version, data) "
+                                   "VALUES (?, ?, ?, ?)", rows)
+
+    # ---- incremental sync watermarks ----
+
+    def get_watermark(self, scope, object_id):
+        """Returns {"submitted_at", "graded_at"} last recorded for (scope, object_id), or None."""
+        rows = self.query("SELECT submitted_at, graded_at FROM watermarks WHERE scope = ? AND object_id = ?",
+                          (scope, object_id))
+        return {"submitted_at": rows[0][0], "graded_at": rows[0][1]} if rows else None
+
+    def set_watermark(self, scope, object_id, submitted_at, graded_at):
+        with self.transaction() as connection:
+            connection.execute("INSERT OR REPLACE INTO watermarks (scope, object_id, submitted_at, graded_at) "
+                               "VALUES (?, ?, ?, ?)", (scope, object_id, submitted_at, graded_at))
+
+    # ---- whole-state operations ----
+
+    def replace_all(self, students, quizzes):
+        """Replaces every student and quiz in one transaction (used by save_data_to_file)."""
+        with self.transaction() as connection:
+            connection.execute("DELETE FROM students")
+            connection.execute("DELETE FROM quizzes")
+            self.add_students(students)
+            self.add_quizzes(quizzes)
+
+    def get_meta(self, key, default=None):
+        rows = self.query("SELECT value FROM meta WHERE key = ?", (key,))
+        return rows[0][0] if rows else default
+
+    def set_meta(self, key, value):
+        with self.transaction() as connection:
+            connection.execute("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", (key, value))
+
+    def import_json_file(self, json_file=DATA_FILE, force=False):
+        """
+        Merges a canvas_data.json file into the store: its students and quizzes are inserted
+        or updated by id, and records that were only ever added through the store are kept.
+        A file is imported once; it is read again only if it has been modified since (e.g.
+        rewritten by mock_canvas.py --data-file) or force is set. Returns the number of
+        records imported.
+        """
+        try:
+            stat = os.stat(json_file)
+        except FileNotFoundError:
+            return 0
+        meta_key = f"imported:{os.path.abspath(json_file)}"
+        signature = f"{stat.st_mtime_ns}:{stat.st_size}"
+        if not force and self.get_meta(meta_key) == signature:
+            return 0
+
+        with open(json_file, "r") as file:
+            data = json.load(file)
+        students, quizzes = data.get("students", []), data.get("quizzes", [])
+        with self.transaction() as connection:
+            self.add_students(students)
+            self.add_quizzes(quizzes)
+            connection.execute("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", (meta_key, signature))
+        print(f"📥 Imported {len(students)} students and {len(quizzes)} quizzes from {json_file} into {self.path}")
+        return len(students) + len(quizzes)
+
+state_store = None
+state_store_lock = threading.Lock()
+
+def get_state_store():
+    """
+    Returns the StateStore for STATE_DB, opening it on first use (or after STATE_DB changes,
+    or in a new process) and importing DATA_FILE if it is new or has changed.
+    """
+    global state_store
+    with state_store_lock:
+        if state_store is None or state_store.path != STATE_DB or state_store.pid != os.getpid():
+            state_store = StateStore(STATE_DB)
+            state_store.import_json_file(DATA_FILE)
+        return state_store
+
+#endregion
+
+#region ==================== HTTP Transport ==================== #
+
+http_session_lock = threading.Lock()
+
+class RateLimitThrottle:
+    """
+    Adaptive pacing driven by Canvas's X-Rate-Limit-Remaining and X-Request-Cost headers.
+
+    While the remaining quota is above RATE_LIMIT_COMFORTABLE, requests go out immediately.
+    As it drains toward RATE_LIMIT_FLOOR, requests are spaced further apart, up to the
+    interval at which the bucket refills as fast as the (average) request cost drains it.
+    The spacing is shared by all threads, so it does not depend on the worker count.
+    """
+
+    def __init__(self, comfortable=RATE_LIMIT_COMFORTABLE, floor=RATE_LIMIT_FLOOR, leak_rate=RATE_LIMIT_LEAK_RATE):
+        self.comfortable = comfortable
+        self.floor = floor
+        self.leak_rate = leak_rate
+        self.lock = threading.Lock()
+        self.remaining = None # last X-Rate-Limit-Remaining seen
+        self.average_cost = 1.0 # moving average of X-Request-Cost
+        self.next_slot = 0.0
+        self.requests = 0
+        self.throttled_requests = 0
+        self.throttled_seconds = 0.0
+
+    def interval(self):
+        """Seconds to leave between requests for the current quota level (0 while the bucket is full)."""
+        if self.remaining is None or self.remaining >= self.comfortable:
+            return 0.0
+        full_interval = self.average_cost / self.leak_rate
+        if self.remaining <= self.floor:
+            return full_interval
+        drained = (self.comfortable - self.remaining) / (self.comfortable - self.floor)
+        return full_interval * drained ** 2
+
+    def wait(self):
+        """Blocks until the caller may send its next request and returns the seconds it waited."""
+        with self.lock:
+            now = time.monotonic()
+            start = max(now, self.next_slot)
+            self.next_slot = start + self.interval()
+            delay = start - now
+            self.requests += 1
+            if delay > 0:
+                self.throttled_requests += 1
+                self.throttled_seconds += delay
+        if delay > 0:
+            time.sleep(delay)
+        return delay
+
+    def observe(self, response):
+        """Updates the quota estimate from a Canvas response."""
+        remaining = response.headers.get("X-Rate-Limit-Remaining")
+        cost = response.headers.get("X-Request-Cost")
+        with self.lock:
+            if remaining is not None:
+                try:
+                    self.remaining = float(remaining)
+                except ValueError:
+                    pass
+            if cost is not None:
+                try:
+                    self.average_cost = 0.8 * self.average_cost + 0.2 * float(cost)
+                except ValueError:
+                    pass
+            if response.status_code == 403 and b"Rate Limit Exceeded" in response.content:
+                self.remaining = 0.0
+
+    def stats(self):
+        """Returns a summary of how much throttling has happened so far."""
+        with self.lock:
+            return {
+                "requests": self.requests,
+                "throttled_requests": self.throttled_requests,
+                "throttled_seconds": round(self.throttled_seconds, 3),
+                "rate_limit_remaining": self.remaining,
+                "average_request_cost": round(self.average_cost, 3)
+            }
+
+throttle = RateLimitThrottle()
+
+ID_SEGMENT_PATTERN = re.compile(r"^(self|sis_[a-z_]+:.+|[0-9a-f]{32,})$") # path segments that name one object
+
+def endpoint_template(url):
+    """
+    Reduces a request URL to its endpoint template, e.g.
+    ".../api/v1/courses/12/quizzes/34/submissions?page=2" -> "/api/v1/courses/:course_id/quizzes/:quiz_id/submissions".
+    """
+    segments = urlsplit(url).path.rstrip("/").split("/")
+    for index in range(1, len(segments)):
+        segment = segments[index]
+        if segment.isdigit() or ID_SEGMENT_PATTERN.match(segment):
+            parent = segments[index - 1]
+            if parent.endswith("zzes"):
+                parent = parent[:-3]
+            elif parent.endswith("s") and not parent.endswith("ss"):
+                parent = parent[:-1]
+            segments[index] = f":{parent}_id" if parent and not parent.startswith(":") else ":id"
+    return "/".join(segments) or "/"
+
+def body_size(body):
+    """Size in bytes of a prepared request body."""
+    if body is None:
+        return 0
+    if isinstance(body, str):
+        return len(body.encode("utf-8"))
     try:
-        with open(DATA_FILE, "r") as file:
-            return json.load(file)
-    except FileNotFoundError:
-        return {"students": [], "quizzes": []}
+        return len(body)
+    except TypeError: # streamed bodies (generators, files)
+        return 0
+
+def percentile(sorted_values, percent):
+    """Nearest-rank percentile of an already sorted sequence (None if it is empty)."""
+    if not sorted_values:
+        return None
+    rank = max(1, math.ceil(percent / 100.0 * len(sorted_values)))
+    return sorted_values[rank - 1]
+
+def prometheus_escape(value):
+    """Escapes a Prometheus label value."""
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+class RequestMetrics:
+    """
+    Per-endpoint statistics for every request sent through CanvasSession, which covers both
+    canvas_request() and the canvasapi requester.
+
+    Requests are grouped by method and endpoint template ("GET /api/v1/courses/:course_id/quizzes"),
+    so calls for different courses, quizzes and users add up. Each endpoint keeps its request
+    count, status codes, bytes sent and received, retries, rate-limit throttle waits, a
+    LATENCY_BUCKETS histogram and every latency (for exact p50/p95/p99).
+    """
+
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        """Clears everything recorded so far."""
+        with self.lock:
+            self.started = time.time()
+            self.endpoints = {}
+
+    def _endpoint(self, method, url):
+        """Returns the stats dict of the request's endpoint (the caller holds the lock)."""
+        key = (method.upper(), endpoint_template(url))
+        stats = self.endpoints.get(key)
+        if stats is None:
+            stats = self.endpoints[key] = {
+                "requests": 0, "errors": 0, "status": {}, "bytes_out": 0, "bytes_in": 0, "retries": 0,
+                "throttle_waits": 0, "throttle_seconds": 0.0, "latency_sum": 0.0,
+                "latencies": array("d"), "histogram": [0] * (len(self.buckets) + 1)
+            }
+        return stats
+
+    def record(self, method, url, status, seconds, bytes_out=0, bytes_in=0, throttle_seconds=0.0):
+        """Records one finished request; status is None if it failed without a response."""
+        with self.lock:
+            stats = self._endpoint(method, url)
+            stats["requests"] += 1
+            if status is None or status >= 400:
+                stats["errors"] += 1
+            status = str(status) if status is not None else "error"
+            stats["status"][status] = stats["status"].get(status, 0) + 1
+            stats["bytes_out"] += bytes_out
+            stats["bytes_in"] += bytes_in
+            if throttle_seconds > 0:
+                stats["throttle_waits"] += 1
+                stats["throttle_seconds"] += throttle_seconds
+            stats["latency_sum"] += seconds
+            stats["latencies"].append(seconds)
+            stats["histogram"][bisect_left(self.buckets, seconds)] += 1
+
+    def record_retry(self, method, url):
+        """Counts a request that is about to be sent again."""
+        with self.lock:
+            self._endpoint(method, url)["retries"] += 1
+
+    def summary(self):
+        """Returns the statistics as a JSON-serialisable dict, slowest endpoints (by total time) first."""
+        with self.lock:
+            endpoints = []
+            for (method, template), stats in self.endpoints.items():
+                latencies = sorted(stats["latencies"])
+                endpoints.append({
+                    "method": method,
+                    "endpoint": template,
+                    "requests": stats["requests"],
+                    "errors": stats["errors"],
+                    "status": dict(sorted(stats["status"].items())),
+                    "bytes_out": stats["bytes_out"],
+                    "bytes_in": stats["bytes_in"],
+                    "retries": stats["retries"],
+                    "throttle_waits": stats["throttle_waits"],
+                    "throttle_seconds": round(stats["throttle_seconds"], 4),
+                    "seconds": round(stats["latency_sum"], 4),
+                    "latency": {
+                        "mean": round(stats["latency_sum"] / len(latencies), 4) if latencies else None,
+                        "p50": percentile(latencies, 50),
+                        "p95": percentile(latencies, 95),
+                        "p99": percentile(latencies, 99),
+                        "max": latencies[-1] if latencies else None
+                    },
+                    "histogram": {("+Inf" if index == len(self.buckets) else f"{self.buckets[index]:g}"): count
+                                  for index, count in enumerate(stats["histogram"])}
+                })
+            endpoints.sort(key=lambda endpoint: endpoint["seconds"], reverse=True)
+            return {
+                "started_at": time.strftime("%Y-%m-%dT%H:%M:%S", time.localtime(self.started)),
+                "elapsed_seconds": round(time.time() - self.started, 3),
+                "requests": sum(endpoint["requests"] for endpoint in endpoints),
+                "errors": sum(endpoint["errors"] for endpoint in endpoints),
+                "retries": sum(endpoint["retries"] for endpoint in endpoints),
+                "bytes_out": sum(endpoint["bytes_out"] for endpoint in endpoints),
+                "bytes_in": sum(endpoint["bytes_in"] for endpoint in endpoints),
+                "throttle_seconds": round(sum(endpoint["throttle_seconds"] for endpoint in endpoints), 4),
+                "endpoints": endpoints
+            }
+
+    def prometheus(self):
+        """Returns the statistics in the Prometheus text exposition format."""
+        def labels(method, template, **extra):
+            pairs = {"method": method, "endpoint": template, **extra}
+            escaped = (f'{name}="{prometheus_escape(value)}"' for name, value in pairs.items())
+            return "{" + ",".join(escaped) + "}"
+
+        with self.lock:
+            items = sorted(self.endpoints.items())
+            lines = ["# HELP canvas_requests_total Requests sent to Canvas, by endpoint and status code.",
+                     "# TYPE canvas_requests_total counter"]
+            for (method, template), stats in items:
+                for status, count in sorted(stats["status"].items()):
+                    lines.append(f"canvas_requests_total{labels(method, template, status=status)} {count}")
+
+            lines += ["# HELP canvas_request_duration_seconds Canvas request latency.",
+                      "# TYPE canvas_request_duration_seconds histogram"]
+            for (method, template), stats in items:
+                cumulative = 0
+                for index, count in enumerate(stats["histogram"]):
+                    cumulative += count
+                    bound = "+Inf" if index == len(self.buckets) else f"{self.buckets[index]:g}"
+                    lines.append(f"canvas_request_duration_seconds_bucket{labels(method, template, le=bound)} {cumulative}")
+                lines.append(f"canvas_request_duration_seconds_sum{labels(method, template)} {stats['latency_sum']:.6f}")
+                lines.append(f"canvas_request_duration_seconds_count{labels(method, template)} {stats['requests']}")
+
+            counters = [("canvas_request_bytes_total", "Request body bytes sent to Canvas.", "bytes_out"),
+                        ("canvas_response_bytes_total", "Response body bytes received from Canvas.", "bytes_in"),
+                        ("canvas_request_retries_total", "Requests sent again after a retryable failure.", "retries"),
+                        ("canvas_throttle_waits_total", "Requests delayed by the rate-limit throttle.", "throttle_waits"),
+                        ("canvas_throttle_wait_seconds_total", "Seconds spent waiting on the rate-limit throttle.",
+                         "throttle_seconds")]
+            for name, help_text, field in counters:
+                lines += [f"# HELP {name} {help_text}", f"# TYPE {name} counter"]
+                for (method, template), stats in items:
+                    value = stats[field]
+                    lines.append(f"{name}{labels(method, template)} {value:.6f}" if isinstance(value, float)
+                                 else f"{name}{labels(method, template)} {value}")
+            return "\n".join(lines) + "\n"
+
+request_metrics = RequestMetrics()
+
+class CircuitOpenError(requests.ConnectionError):
+    """Raised instead of sending a request while the host's circuit breaker is open."""
+
+class CircuitBreaker:
+    """
+    Per-host circuit breaker shared by every worker thread.
+
+    The outcomes of the last CIRCUIT_WINDOW requests to each host are kept. Once at least
+    CIRCUIT_MIN_REQUESTS of them are in and CIRCUIT_FAILURE_RATE of them failed (5xx or no
+    response at all), the circuit opens. Nothing is sent to that host for CIRCUIT_COOLDOWN
+    seconds, then a single probe request is let through. The circuit closes again if the
+    probe succeeds and stays open for another cooldown if it fails. The thread sending the
+    probe is handed a token by before_request and passes it back to record, so outcomes of
+    other requests that were already in flight do not end the probe.
+    """
+
+    def __init__(self, window=CIRCUIT_WINDOW, min_requests=CIRCUIT_MIN_REQUESTS,
+                 failure_rate=CIRCUIT_FAILURE_RATE, cooldown=CIRCUIT_COOLDOWN):
+        self.window = window
+        self.min_requests = min_requests
+        self.failure_rate = failure_rate
+        self.cooldown = cooldown
+        self.lock = threading.Lock()
+        self.hosts = {}
+        self.trips = 0
+
+    def _host(self, host):
+        """Returns the state of host (the caller holds the lock)."""
+        state = self.hosts.get(host)
+        if state is None:
+            state = self.hosts[host] = {"outcomes": deque(maxlen=self.window), "opened_at": None, "probing": None}
+        return state
+
+    def before_request(self, host):
+        """
+        Returns (wait, probe). wait is 0 if a request to host may be sent now, else the seconds
+        to wait before asking again. probe is None, or the token to pass to record() when the
+        request sent now is the circuit's probe.
+        """
+        with self.lock:
+            state = self._host(host)
+            if state["opened_at"] is None:
+                return 0.0, None
+            remaining = state["opened_at"] + self.cooldown - time.monotonic()
+            if remaining > 0:
+                return remaining, None
+            if state["probing"] is not None:
+                return min(1.0, self.cooldown), None # another thread's probe is in flight
+            state["probing"] = object()
+            return 0.0, state["probing"]
+
+    def record(self, host, failed, probe=None):
+        """
+        Records the outcome of one request to host, opening or closing the circuit as needed.
+        Only the outcome carrying the current probe token ends the probe.
+        """
+        with self.lock:
+            state = self._host(host)
+            if probe is not None and probe is state["probing"]:
+                state["probing"] = None
+                if failed:
+                    state["opened_at"] = time.monotonic()
+                else:
+                    state["opened_at"] = None
+                    state["outcomes"].clear()
+                    print(f"✅ Circuit to {host} closed; requests resume.")
+                return
+            state["outcomes"].append(failed)
+            outcomes = state["outcomes"]
+            if (state["opened_at"] is None and len(outcomes) >= self.min_requests
+                    and sum(outcomes) >= self.failure_rate * len(outcomes)):
+                state["opened_at"] = time.monotonic()
+                self.trips += 1
+                print(f"🛑 Circuit to {host} opened after {sum(outcomes)}/{len(outcomes)} failed requests; "
+                      f"pausing for {self.cooldown}s.")
+
+    def reset(self):
+        """Closes every circuit and forgets past outcomes."""
+        with self.lock:
+            self.hosts = {}
+
+circuit_breaker = CircuitBreaker()
+
+def is_rate_limited(response):
+    """True for Canvas's rate-limit rejections (429, or 403 with "Rate Limit Exceeded")."""
+    return response.status_code == 429 or (response.status_code == 403 and b"Rate Limit Exceeded" in response.content)
+
+def should_retry(response, error, idempotent):
+    """
+    Decides whether a failed attempt may be sent again.
+
+    Rate-limit rejections, 503 and connect failures never reached the application, so they
+    are retried for any request. 502, 504, read timeouts and dropped connections may have
+    been processed, so they are retried only for idempotent requests.
+    """
+    if error is not None:
+        if isinstance(error, requests.ConnectTimeout):
+            return True
+        return idempotent and isinstance(error, (requests.ConnectionError, requests.Timeout))
+    if is_rate_limited(response) or response.status_code == 503:
+        return True
+    return idempotent and response.status_code in (502, 504)
+
+def retry_delay(attempt, response=None):
+    """Seconds to wait before retry number attempt: full-jitter exponential backoff, or Retry-After if longer."""
+    delay = random.uniform(0, min(RETRY_MAX_DELAY, RETRY_BASE_DELAY * 2 ** (attempt - 1)))
+    retry_after = response.headers.get("Retry-After") if response is not None else None
+    if retry_after:
+        try:
+            delay = max(delay, float(retry_after))
+        except ValueError:
+            pass
+    return delay
+
+class SharedRequestBudget:
+    """
+    Request pacing shared by several processes: at most rate requests per second in total.
+    The next free send time lives in shared memory (a multiprocessing Value), so every
+    worker process that was handed the same budget draws from it. time.monotonic() is
+    system-wide, so the slots line up across processes.
+    """
+
+    def __init__(self, rate, context=None):
+        self.rate = rate
+        self.next_slot = (context or multiprocessing).Value("d", 0.0)
+
+    def wait(self):
+        """Blocks until this process may send its next request and returns the seconds it waited."""
+        with self.next_slot.get_lock():
+            now = time.monotonic()
+            start = max(now, self.next_slot.value)
+            self.next_slot.value = start + 1.0 / self.rate
+        delay = start - now
+        if delay > 0:
+            time.sleep(delay)
+        return delay
+
+request_budget = None # SharedRequestBudget set in fleet worker processes
+
+class CanvasSession(requests.Session):
+    """
+    requests.Session used for every call to Canvas.
+    Applies HTTP_TIMEOUT to any request that does not set its own timeout, paces
+    requests with the shared rate-limit throttle and records them in request_metrics.
+    This also covers the requests made by the canvasapi library.
+
+    Failed attempts that should_retry() accepts are sent again with jittered exponential
+    backoff, within RETRY_MAX_ATTEMPTS and RETRY_BUDGET seconds; the last response (or
+    error) is returned as usual. Every attempt goes through the host's circuit breaker.
+    idempotent defaults to True for IDEMPOTENT_METHODS; pass idempotent=True for POSTs
+    that are safe to replay (e.g. setting grades) and False for any request that is not.
+    """
+
+    def request(self, method, url, idempotent=None, **kwargs):
+        if kwargs.get("timeout") is None:
+            kwargs["timeout"] = HTTP_TIMEOUT
+        if idempotent is None:
+            idempotent = method.upper() in IDEMPOTENT_METHODS
+        host = urlsplit(url).netloc
+        deadline = time.monotonic() + RETRY_BUDGET
+
+        for attempt in itertools.count(1):
+            wait, probe = circuit_breaker.before_request(host)
+            while wait > 0:
+                if time.monotonic() + wait > deadline:
+                    request_metrics.record(method, url, None, 0.0)
+                    raise CircuitOpenError(f"Circuit to {host} is open; {method} {url} not sent.")
+                time.sleep(wait)
+                wait, probe = circuit_breaker.before_request(host)
+
+            response, error = None, None
+            try:
+                response = self.request_once(method, url, **kwargs)
+            except requests.RequestException as e:
+                error = e
+            circuit_breaker.record(host, error is not None or response.status_code >= 500, probe)
+
+            if attempt >= RETRY_MAX_ATTEMPTS or not should_retry(response, error, idempotent):
+                break
+            delay = retry_delay(attempt, response)
+            if time.monotonic() + delay > deadline:
+                break
+            request_metrics.record_retry(method, url)
+            time.sleep(delay)
+
+        if error is not None:
+            raise error
+        return response
+
+    def request_once(self, method, url, **kwargs):
+        """Sends a single attempt, paced by the throttle (and fleet budget) and recorded in request_metrics."""
+        waited = request_budget.wait() if request_budget is not None else 0.0
+        waited += throttle.wait()
+        started = time.perf_counter()
+        try:
+            response = super().request(method, url, **kwargs)
+        except requests.RequestException:
+            request_metrics.record(method, url, None, time.perf_counter() - started, throttle_seconds=waited)
+            raise
+        throttle.observe(response)
+        request_metrics.record(method, url, response.status_code, time.perf_counter() - started,
+                               bytes_out=body_size(response.request.body), bytes_in=len(response.content),
+                               throttle_seconds=waited)
+        return response
+
+def report_throttle():
+    """Prints and returns how long requests have waited on the rate-limit throttle."""
+    stats = throttle.stats()
+    print(f"⏱️ Throttled {stats['throttled_requests']}/{stats['requests']} requests "
+          f"for {stats['throttled_seconds']}s (quota left: {stats['rate_limit_remaining']}).")
+    return stats
+
+def report_metrics(json_file=None, prometheus_file=None):
+    """
+    Prints the busiest endpoints and returns request_metrics.summary().
+    The summary is also written as JSON to json_file (default METRICS_JSON_FILE) and in the
+    Prometheus text format to prometheus_file (default METRICS_PROMETHEUS_FILE), when set.
+    """
+    summary = request_metrics.summary()
+    print(f"📊 {summary['requests']} requests ({summary['errors']} errors, {summary['retries']} retries), "
+          f"{summary['bytes_out'] / 1024:.1f} KiB out, {summary['bytes_in'] / 1024:.1f} KiB in, "
+          f"{summary['throttle_seconds']}s throttled.")
+    for endpoint in summary["endpoints"][:10]:
+        latency = endpoint["latency"]
+        print(f"   {endpoint['method']:<6} {endpoint['endpoint']:<70} {endpoint['requests']:>6} req  "
+              f"p50 {latency['p50'] * 1000:.0f}ms  p95 {latency['p95'] * 1000:.0f}ms  p99 {latency['p99'] * 1000:.0f}ms")
+
+    json_file = json_file or METRICS_JSON_FILE
+    prometheus_file = prometheus_file or METRICS_PROMETHEUS_FILE
+    try:
+        if json_file:
+            with open(json_file, "w") as file:
+                json.dump(summary, file, indent=4)
+            print(f"💾 Request metrics written to {json_file}")
+        if prometheus_file:
+            with open(prometheus_file, "w") as file:
+                file.write(request_metrics.prometheus())
+            print(f"💾 Prometheus metrics written to {prometheus_file}")
+    except OSError as e:
+        print(f"❌ Error writing request metrics: {e}")
+    return summary
+
+def get_http_session():
+    """
+    Returns the shared keep-alive session, creating it on first use.
+    The connection pool is sized by HTTP_POOL_SIZE so concurrent workers reuse
+    open TCP/TLS connections instead of opening one per request.
+    """
+    global http_session
+    if http_session is None:
+        with http_session_lock:
+            if http_session is None:
+                session = CanvasSession()
+                adapter = HTTPAdapter(pool_connections=4, pool_maxsize=HTTP_POOL_SIZE)
+                session.mount("https://", adapter)
+                session.mount("http://", adapter)
+                http_session = session
+    return http_session
+
+def configure_http(pool_size=None, timeout=None):
+    """
+    Overrides the pool size and/or default timeout.
+    Changing the pool size replaces the shared session (and re-attaches it to canvas).
+    """
+    global HTTP_POOL_SIZE, HTTP_TIMEOUT, http_session
+    if timeout:
+        HTTP_TIMEOUT = timeout
+    if pool_size and pool_size != HTTP_POOL_SIZE:
+        HTTP_POOL_SIZE = pool_size
+        with http_session_lock:
+            old_session, http_session = http_session, None
+        if old_session is not None:
+            old_session.close()
+        if canvas is not None:
+            share_http_session(canvas)
+
+def share_http_session(canvas_obj):
+    """Makes the canvasapi requester of canvas_obj send its requests through the shared session."""
+    canvas_obj._Canvas__requester._session = get_http_session()
+
+@lru_cache(maxsize=None)
+def build_headers(token):
+    """
+    Builds the request headers for one identity (the admin token or a student token).
+    Cached, so the headers are built once per token; do not modify the returned dict.
+    Masquerading is done with the as_user_id query parameter, not with headers.
+    """
+    return {"Authorization": f"Bearer {token}", "Accept": "application/json"}
+
+def canvas_request(method, path, token=None, as_user_id=None, params=None, idempotent=None, **kwargs):
+    """
+    Sends a request to Canvas over the shared keep-alive session and returns the response.
+
+    :param method: HTTP method, e.g. "GET" or "POST".
+    :param path: API path such as "/api/v1/courses/1", or a full URL (e.g. a pagination link).
+    :param token: The token to authenticate with; defaults to the admin TOKEN.
+    :param as_user_id: (Optional) Masquerade as this user.
+    :param params: (Optional) Query string parameters.
+    :param idempotent: (Optional) Whether the request may be replayed after an unclear failure;
+        defaults to True for GET/PUT/DELETE and False for POST (see CanvasSession).
+    :param kwargs: Passed on to requests (json=, data=, timeout=, ...).
+    """
+    url = path if path.startswith("http") else f"{API_URL}{path}"
+    if as_user_id is not None:
+        params = dict(params or {})
+        params["as_user_id"] = as_user_id
+    return get_http_session().request(method, url, headers=build_headers(token or TOKEN), params=params,
+                                      idempotent=idempotent, **kwargs)
+
+def fetch_page(url, params=None, token=None):
+    """Fetches one page of a list and returns (response, payload)."""
+    response = canvas_request("GET", url, token=token, params=params)
+    response.raise_for_status()
+    return response, response.json()
+
+def page_url(url, page):
+    """Returns url with its page= query parameter replaced."""
+    parts = urlsplit(url)
+    query = parse_qs(parts.query, keep_blank_values=True)
+    query["page"] = [str(page)]
+    return urlunsplit(parts._replace(query=urlencode(query, doseq=True)))
+
+def numbered_last_page(response):
+    """Returns the last page number if Canvas uses numbered pages for this list, else None."""
+    next_link = response.links.get("next", {}).get("url")
+    last_link = response.links.get("last", {}).get("url")
+    if not next_link or not last_link:
+        return None
+    next_page = parse_qs(urlsplit(next_link).query).get("page", [""])[0]
+    last_page = parse_qs(urlsplit(last_link).query).get("page", [""])[0]
+    return int(last_page) if next_page.isdigit() and last_page.isdigit() else None
+
+def iter_paginated(path, params=None, token=None, key=None, record=None, per_page=PAGE_SIZE,
+                   prefetch=PREFETCH_PAGES):
+    """
+    Yields every item of a paginated Canvas list.
+
+    Pages are requested with per_page items. When Canvas numbers its pages (the Link header
+    has a numeric "last" page), up to prefetch later pages are fetched concurrently while the
+    caller processes the current one; bookmark-style lists are fetched one page ahead. Only a
+    bounded number of pages is held at a time, so memory stays flat however long the list is.
+
+    :param key: Selects the list inside wrapped responses such as {"quiz_submissions": [...]}.
+    :param record: Optional namedtuple type; each item is reduced to its fields instead of
+        being yielded as the full JSON dict.
+    """
+    def items_of(payload):
+        items = payload.get(key, []) if key else payload
+        if record is None:
+            return items
+        return [record(*(item.get(field) for field in record._fields)) for item in items]
+
+    params = dict(params or {})
+    params.setdefault("per_page", per_page)
+    response, payload = fetch_page(path, params=params, token=token)
+    last_page = numbered_last_page(response)
+
+    with ThreadPoolExecutor(max_workers=max(1, prefetch)) as executor:
+        if last_page is not None:
+            # Numbered pages: keep a window of upcoming pages in flight
+            next_link = response.links["next"]["url"]
+            first_next = int(parse_qs(urlsplit(next_link).query)["page"][0])
+            upcoming = iter(range(first_next, last_page + 1))
+            window = deque()
+            for page in itertools.islice(upcoming, max(1, prefetch)):
+                window.append(executor.submit(fetch_page, page_url(next_link, page), None, token))
+
+            yield from items_of(payload)
+            while window:
+                response, payload = window.popleft().result()
+                for page in itertools.islice(upcoming, 1):
+                    window.append(executor.submit(fetch_page, page_url(next_link, page), None, token))
+                yield from items_of(payload)
+        else:
+            # Bookmark links: the next URL is only known once a page arrives, so stay one page ahead
+            while True:
+                next_link = response.links.get("next", {}).get("url")
+                pending = executor.submit(fetch_page, next_link, None, token) if next_link else None
+                yield from items_of(payload)
+                if pending is None:
+                    break
+                response, payload = pending.result()
+
+#endregion
+
+#region ==================== Paginated Records ==================== #
+
+# Lightweight records for long lists; only the fields the grade functions read are kept
+QuizSubmissionRecord = namedtuple("QuizSubmissionRecord", ["id", "user_id", "score", "attempt", "workflow_state"])
+SubmissionRecord = namedtuple("SubmissionRecord", ["id", "user_id", "assignment_id", "score", "grade",
+                                                   "submitted_at", "graded_at", "workflow_state"])
+EnrollmentRecord = namedtuple("EnrollmentRecord", ["id", "user_id", "type", "enrollment_state"])
+ColumnEntryRecord = namedtuple("ColumnEntryRecord", ["user_id", "content"])
+
+def iter_quiz_submissions(course_id, quiz_id):
+    """Streams a quiz's submissions as QuizSubmissionRecords."""
+    return iter_paginated(f"/api/v1/courses/{course_id}/quizzes/{quiz_id}/submissions",
+                          key="quiz_submissions", record=QuizSubmissionRecord)
+
+def iter_assignment_submissions(course_id, assignment_id, params=None, source=None):
+    """
+    Streams an assignment's submissions as SubmissionRecords.
+    source ("rest" or "graphql", default SUBMISSIONS_SOURCE) picks the API; filtered
+    listings (params) always use REST.
+    """
+    if (source or SUBMISSIONS_SOURCE) == "graphql" and not params:
+        return iter_graphql_submissions(course_id, [assignment_id])
+    return iter_paginated(f"/api/v1/courses/{course_id}/assignments/{assignment_id}/submissions",
+                          params=params, record=SubmissionRecord)
+
+def iter_enrollments(course_id, params=None):
+    """Streams a course's enrollments as EnrollmentRecords."""
+    return iter_paginated(f"/api/v1/courses/{course_id}/enrollments", params=params, record=EnrollmentRecord)
+
+def iter_course_submissions(course_id, assignment_ids, params=None, source=None):
+    """
+    Streams the submissions of every student in a course for the given assignments as
+    SubmissionRecords, using one paginated GET /courses/:id/students/submissions.
+    With source="graphql" (default SUBMISSIONS_SOURCE) they are read with
+    iter_graphql_submissions instead; filtered listings (params) always use REST.
+    """
+    if (source or SUBMISSIONS_SOURCE) == "graphql" and not params:
+        return iter_graphql_submissions(course_id, assignment_ids)
+    params = dict(params or {})
+    params.update({"student_ids[]": "all", "assignment_ids[]": list(assignment_ids)})
+    return iter_paginated(f"/api/v1/courses/{course_id}/students/submissions", params=params,
+                          record=SubmissionRecord)
+
+GRAPHQL_SUBMISSIONS_QUERY = """
+query AssignmentSubmissions($first: Int!{variables}) {{
+{fields}
+}}
+"""
+GRAPHQL_SUBMISSIONS_FIELD = """  {alias}: assignment(id: ${alias}) {{
+    submissionsConnection(first: $first, after: ${alias}_after, filter: {{states: [unsubmitted, submitted, pending_review, graded]}}) {{
+      nodes {{ _id userId assignmentId score grade submittedAt gradedAt state }}
+      pageInfo {{ hasNextPage endCursor }}
+    }}
+  }}"""
+
+def graphql_request(query, variables=None):
+    """Sends a query to Canvas's /api/graphql endpoint and returns its "data"; GraphQL errors raise ValueError."""
+    response = canvas_request("POST", "/api/graphql", json={"query": query, "variables": variables or {}},
+                              idempotent=True) # queries do not change anything
+    response.raise_for_status()
+    payload = response.json()
+    if payload.get("errors"):
+        raise ValueError(f"GraphQL errors: {'; '.join(error.get('message', '') for error in payload['errors'])}")
+    return payload.get("data") or {}
+
+def iter_graphql_submissions(course_id, assignment_ids, page_size=GRAPHQL_PAGE_SIZE, batch_size=GRAPHQL_BATCH_SIZE):
+    """
+    Streams the submissions of the given assignments as SubmissionRecords, read through
+    GraphQL instead of REST.
+
+    Up to batch_size assignments are paged together: each request holds one aliased
+    submissionsConnection per assignment, each with its own cursor, and assignments drop
+    out of the batch once their last page has arrived. course_id is unused (GraphQL
+    assignment ids are global) but kept so the call matches iter_course_submissions.
+    """
+    pending = [str(assignment_id) for assignment_id in assignment_ids]
+    for start in range(0, len(pending), batch_size):
+        cursors = {f"a{index}": (assignment_id, None)
+                   for index, assignment_id in enumerate(pending[start:start + batch_size])}
+        while cursors:
+            query = GRAPHQL_SUBMISSIONS_QUERY.format(
+                variables="".join(f", ${alias}: ID!, ${alias}_after: String" for alias in cursors),
+                fields="\n".join(GRAPHQL_SUBMISSIONS_FIELD.format(alias=alias) for alias in cursors))
+            variables = {"first": page_size}
+            for alias, (assignment_id, cursor) in cursors.items():
+                variables[alias] = assignment_id
+                variables[f"{alias}_after"] = cursor
+            data = graphql_request(query, variables)
+
+            next_cursors = {}
+            for alias, (assignment_id, _) in cursors.items():
+                connection = (data.get(alias) or {}).get("submissionsConnection") or {}
+                for node in connection.get("nodes") or []:
+                    yield SubmissionRecord(int(node["_id"]), int(node["userId"]), int(node["assignmentId"]),
+                                           node.get("score"), node.get("grade"), node.get("submittedAt"),
+                                           node.get("gradedAt"), node.get("state"))
+                page_info = connection.get("pageInfo") or {}
+                if page_info.get("hasNextPage"):
+                    next_cursors[alias] = (assignment_id, page_info.get("endCursor"))
+            cursors = next_cursors
+
+def compare_submission_sources(course_id, assignment_ids):
+    """
+    Reads the same submissions over REST and over GraphQL and returns, for each source,
+    the records read, requests sent, bytes received and seconds taken.
+    """
+    results = {}
+    for source in ("rest", "graphql"):
+        before = request_metrics.summary()
+        started = time.perf_counter()
+        records = sum(1 for _ in iter_course_submissions(course_id, assignment_ids, source=source))
+        elapsed = time.perf_counter() - started
+        after = request_metrics.summary()
+        results[source] = {"records": records, "requests": after["requests"] - before["requests"],
+                           "bytes_in": after["bytes_in"] - before["bytes_in"], "seconds": round(elapsed, 3)}
+        print(f"📊 {source}: {records} submissions in {results[source]['requests']} requests, "
+              f"{results[source]['bytes_in'] / 1024:.1f} KiB, {elapsed:.2f}s")
+    return results
+
+def iter_changed_submissions(course_id, assignment_id, watermark, ignore_graded_until=None):
+    """
+    Streams an assignment's submissions that were submitted or graded after watermark
+    ({"submitted_at", "graded_at"} timestamps) as SubmissionRecords. Canvas only filters
+    students/submissions by submitted_since or graded_since, so both are requested and
+    merged; records not newer than the watermark are dropped here as well.
+
+    :param ignore_graded_until: Grading up to this time is not counted as activity (e.g.
+        the grades update_quiz_grades itself posted).
+    """
+    seen = set()
+    for field, param in (("submitted_at", "submitted_since"), ("graded_at", "graded_since")):
+        since = watermark.get(field)
+        if not since:
+            continue
+        if field == "graded_at" and ignore_graded_until:
+            since = max(since, ignore_graded_until)
+        for submission in iter_course_submissions(course_id, [assignment_id], params={param: since}):
+            if submission.id in seen or not (getattr(submission, field) or "") > since:
+                continue
+            seen.add(submission.id)
+            yield submission
+
+def watermark_start():
+    """Returns the timestamp a run's watermark is set to: now (UTC) less WATERMARK_OVERLAP, in Canvas's format."""
+    return time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime(time.time() - WATERMARK_OVERLAP))
+
+def watermark_before(timestamp):
+    """Returns a Canvas timestamp (UTC) less WATERMARK_OVERLAP, in Canvas's format."""
+    seconds = calendar.timegm(time.strptime(timestamp[:19], "%Y-%m-%dT%H:%M:%S"))
+    return time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime(seconds - WATERMARK_OVERLAP))
+
+def iter_column_entries(course_id, column_id):
+    """Streams a custom gradebook column's entries as ColumnEntryRecords."""
+    return iter_paginated(f"/api/v1/courses/{course_id}/custom_gradebook_columns/{column_id}/data",
+                          record=ColumnEntryRecord)
+
+#endregion
+
+#region ==================== Object Cache ==================== #
+
+class ObjectCache:
+    """
+    Thread-safe memo of Canvas objects keyed by (instance URL, type, id).
+    Entries expire after ttl seconds, and the least recently used entry is evicted
+    once maxsize entries are held. Anything that edits or deletes an object should
+    call invalidate() so the next lookup fetches it again.
+    """
+
+    def __init__(self, ttl=OBJECT_CACHE_TTL, maxsize=OBJECT_CACHE_SIZE):
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self.entries = OrderedDict() # key -> (expires_at, object)
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get_or_load(self, key, loader):
+        """Returns the cached object for key, calling loader() to fetch it if missing or expired."""
+        now = time.monotonic()
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry and entry[0] > now:
+                self.entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            self.misses += 1
+
+        obj = loader()
+        self.put(key, obj)
+        return obj
+
+    def put(self, key, obj):
+        """Stores obj under key, evicting the least recently used entries if needed."""
+        with self.lock:
+            self.entries[key] = (time.monotonic() + self.ttl, obj)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.maxsize:
+                self.entries.popitem(last=False)
+
+    def invalidate(self, kind=None, object_id=None):
+        """
+        Drops cached entries. With no arguments everything is dropped; with only kind,
+        every object of that type; with both, the one object.
+        """
+        with self.lock:
+            if kind is None:
+                self.entries.clear()
+                return
+            for key in [k for k in self.entries if k[1] == kind and (object_id is None or k[2] == str(object_id))]:
+                del self.entries[key]
+
+    def stats(self):
+        with self.lock:
+            return {"size": len(self.entries), "hits": self.hits, "misses": self.misses}
+
+object_cache = ObjectCache()
+
+def get_cached_course(course_id):
+    """Returns the Course object for course_id, fetching it only if it is not cached."""
+    return object_cache.get_or_load((API_URL, "course", str(course_id)), lambda: canvas.get_course(course_id))
+
+def get_cached_quiz(course_id, quiz_id):
+    """Returns the Quiz object for quiz_id, fetching it only if it is not cached."""
+    return object_cache.get_or_load((API_URL, "quiz", str(quiz_id)),
+                                    lambda: get_cached_course(course_id).get_quiz(quiz_id))
+
+def get_cached_assignment(course_id, assignment_id):
+    """Returns the Assignment object for assignment_id, fetching it only if it is not cached."""
+    return object_cache.get_or_load((API_URL, "assignment", str(assignment_id)),
+                                    lambda: get_cached_course(course_id).get_assignment(assignment_id))
+
+def invalidate_cached_object(kind, object_id=None):
+    """Drops a cached object (kind is "course", "quiz" or "assignment") after it has been changed."""
+    object_cache.invalidate(kind, object_id)
 
 #endregion
 
@@ -84,100 +1331,244 @@ def check_account_id():
 
 def check_URL_Response():
     """Checks if the Canvas API URL is reachable."""
-    response = requests.get(API_URL)
+    response = get_http_session().get(API_URL)
     print(f"API Response: {response.status_code}")
 #endregion
 
 #region ==================  Test Student Functions ==================== #
 
-def create_test_students():
-    """Creates 3 test students and saves their details for later use."""
-    account = canvas.get_account(ACCOUNT_ID)
-    data = load_data_from_file()
-    students = []
-
-    for i in range(1, 4):
-        name = f"Test Student{i}"
-        email = f"teststudent{i}@example.com"
+def build_test_roster(count=3, csv_file=None, start=1):
+    """
+    Builds the list of students to provision: either count generated students
+    ("Test Student{i}", "teststudent{i}@example.com") or the rows of csv_file, which
+    needs "name" and "email" columns and may have a "password" column.
+    """
+    if csv_file:
+        with open(csv_file, "r", newline="") as file:
+            return [
+                {"name": row["name"].strip(), "email": row["email"].strip(),
+                 "password": (row.get("password") or DEFAULT_PASSWORD).strip()}
+                for row in csv.DictReader(file) if row.get("email")
+            ]
+    return [
+        {"name": f"Test Student{i}", "email": f"teststudent{i}@example.com", "password": DEFAULT_PASSWORD}
+        for i in range(start, start + count)
+    ]
+
+def create_test_student(account, student):
+    """Creates one user from a roster entry. Returns the saved student record, or None on failure."""
+    student_pseudonym = {
+        "unique_id": student["email"],
+        "password": student["password"],
+        "send_confirmation": False
+    }
 
-        student_pseudonym = {
-            "unique_id": email,
-            "password": DEFAULT_PASSWORD,
-            "send_confirmation": False
+    student_info = {
+        "user": {"name": student["name"], "skip_registration": True},
+        "communication_channel": {
+            "type": "email",
+            "address": student["email"],
+            "skip_confirmation": True
         }
+    }
 
-        student_info = {
-            "user": {"name": name, "skip_registration": True},
-            "communication_channel": {
-                "type": "email",
-                "address": email,
-                "skip_confirmation": True
-            }
+    try:
+        new_student = account.create_user(pseudonym=student_pseudonym, **student_info)
+        print(f"Created student: {student['name']} (ID: {new_student.id})")
+        return {
+            "id": new_student.id,
+            "name": student["name"],
+            "email": student["email"],
+            "password": student["password"]
         }
+    except Exception as e:
+        print(f"Failed to create student {student['name']}: {e}")
+        return None
 
-        try:
-            new_student = account.create_user(pseudonym=student_pseudonym, **student_info)
-            students.append({
-                "id": new_student.id,
-                "name": name,
-                "email": email,
-                "password": DEFAULT_PASSWORD
-            })
-            print(f"Created student: {name} (ID: {new_student.id})")
-        except Exception as e:
-            print(f"Failed to create student {name}: {e}")
+def provision_students_via_sis_import(roster, account_id=ACCOUNT_ID, timeout=SIS_IMPORT_TIMEOUT):
+    """
+    Creates a large batch of users with a single SIS import (users.csv) instead of one
+    create_user call each, waits for it to finish, and then looks up the new Canvas IDs
+    with one paginated search on the batch's SIS ID prefix.
+    Returns the created student records.
+    """
+    batch = f"sbg-{int(time.time())}"
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(["user_id", "login_id", "password", "full_name", "email", "status"])
+    for i, student in enumerate(roster, start=1):
+        student["sis_user_id"] = f"{batch}-{i}"
+        writer.writerow([student["sis_user_id"], student["email"], student["password"], student["name"],
+                         student["email"], "active"])
+
+    url = f"/api/v1/accounts/{account_id}/sis_imports"
+    response = canvas_request("POST", url, params={"import_type": "instructure_csv", "extension": "csv"},
+                              files={"attachment": ("users.csv", buffer.getvalue().encode("utf-8"), "text/csv")})
+    if response.status_code != 200:
+        print(f"❌ SIS import could not be started: {response.status_code} - {response.text}")
+        return []
+    sis_import = response.json()
+    print(f"📤 SIS import {sis_import['id']} started for {len(roster)} students.")
+
+    # Poll the import until Canvas has processed the file
+    deadline = time.monotonic() + timeout
+    interval = PROGRESS_POLL_INTERVAL
+    finished_states = ("imported", "imported_with_messages", "failed", "failed_with_messages", "aborted")
+    while sis_import.get("workflow_state") not in finished_states:
+        if time.monotonic() + interval > deadline:
+            print(f"❌ SIS import {sis_import['id']} did not finish within {timeout}s.")
+            return []
+        time.sleep(interval)
+        interval = min(interval * 1.5, 10.0)
+        response = canvas_request("GET", f"{url}/{sis_import['id']}")
+        if response.status_code == 200:
+            sis_import = response.json()
+
+    if sis_import["workflow_state"] not in ("imported", "imported_with_messages"):
+        print(f"❌ SIS import {sis_import['id']} ended as '{sis_import['workflow_state']}'.")
+        return []
+    print(f"✅ SIS import {sis_import['id']} finished ({sis_import['workflow_state']}).")
+
+    # One paginated search returns every user in the batch with their new Canvas ID
+    by_sis_id = {student["sis_user_id"]: student for student in roster}
+    students = []
+    for user in iter_paginated(f"/api/v1/accounts/{account_id}/users",
+                               params={"search_term": batch, "per_page": 100}):
+        student = by_sis_id.get(user.get("sis_user_id"))
+        if student:
+            students.append({"id": user["id"], "name": student["name"], "email": student["email"],
+                             "password": student["password"], "sis_user_id": student["sis_user_id"]})
+
+    missing = len(roster) - len(students)
+    if missing:
+        print(f"⚠️ {missing} students from SIS import {sis_import['id']} were not found afterwards.")
+    return students
+
+def create_test_students(count=3, csv_file=None, max_workers=DEFAULT_MAX_WORKERS,
+                         sis_import_threshold=SIS_IMPORT_THRESHOLD):
+    """
+    Creates test students and saves their details for later use.
+
+    By default creates 3 students; pass count for more, or csv_file (columns name, email and
+    optionally password) to create a specific roster. Users are created concurrently by up to
+    max_workers threads, and batches of sis_import_threshold or more go through a single SIS
+    import instead. Generated students are numbered after the ones already saved, and all
+    created students are added to the state store in one transaction.
+    Returns the list of created student records.
+    """
+    store = get_state_store()
+    roster = build_test_roster(count=count, csv_file=csv_file, start=store.count_students() + 1)
 
-    data["students"] = students
-    save_data_to_file(data)
+    if len(roster) >= sis_import_threshold:
+        students = provision_students_via_sis_import(roster)
+    else:
+        account = canvas.get_account(ACCOUNT_ID)
+        with ThreadPoolExecutor(max_workers=max(1, max_workers)) as executor:
+            created = list(executor.map(lambda student: create_test_student(account, student), roster))
+        students = [student for student in created if student]
 
-def enroll_students_to_course(course_id):
-    """Enrolls the created test students into a given course and accepts invites."""
-    course = canvas.get_course(course_id)
-    data = load_data_from_file()
+    print(f"✅ Created {len(students)}/{len(roster)} test students.")
 
-    for student in data["students"]:
-        enrollment_data = {
-            "user_id": student["id"],
+    store.add_students(students)
+    return students
+
+def enroll_student(course, student):
+    """
+    Enrolls one student as an invited StudentEnrollment.
+    Returns the new enrollment as a dict ({"id", "user_id", "enrollment_state"}), or None on failure.
+    """
+    try:
+        enrollment = course.enroll_user(student["id"], enrollment={
             "type": "StudentEnrollment",
             "enrollment_state": "invited",
-            "send_confirmation": False
-        }
-        try:
-            course.enroll_user(student["id"], **enrollment_data)
-            print(f"Enrolled {student['name']} (ID: {student['id']}) into Course {course_id}")
+            "notify": False
+        })
+        print(f"Enrolled {student['name']} (ID: {student['id']}) into Course {course.id}")
+        return {"id": enrollment.id, "user_id": enrollment.user_id, "enrollment_state": enrollment.enrollment_state}
 
-        except Exception as e:
-            print(f"Failed to enroll {student['name']}: {e}")
+    except Exception as e:
+        print(f"Failed to enroll {student['name']}: {e}")
+        return None
 
-    accept_all_course_invites(course_id)
+def enroll_students_to_course(course_id, max_workers=DEFAULT_MAX_WORKERS):
+    """
+    Enrolls the created test students into a given course and accepts invites.
+    Enrollments and accepts both run concurrently on up to max_workers threads. The invites
+    are accepted straight from the enrollment responses, so no enrollment list is fetched.
+    Returns a summary dict {"enrolled", "enroll_failed", "accepted", "accept_failed"}.
+    """
+    course = get_cached_course(course_id)
+    students = get_state_store().get_students()
+
+    with ThreadPoolExecutor(max_workers=max(1, max_workers)) as executor:
+        enrollments = list(executor.map(lambda student: enroll_student(course, student), students))
+
+    enroll_failed = [student["id"] for student, enrollment in zip(students, enrollments) if enrollment is None]
+    invited = [e for e in enrollments if e and e["enrollment_state"] == "invited"]
+    accept_summary = accept_course_invites(course_id, invited, max_workers=max_workers)
+
+    summary = {
+        "enrolled": len(students) - len(enroll_failed),
+        "enroll_failed": enroll_failed,
+        "accepted": accept_summary["accepted"],
+        "accept_failed": accept_summary["failed"]
+    }
+    print(f"✅ Enrolled {summary['enrolled']}/{len(students)} students and accepted {summary['accepted']} invites "
+          f"in Course {course_id}.")
+    if enroll_failed or summary["accept_failed"]:
+        print(f"❌ Enrollment failed for {enroll_failed}; accept failed for {summary['accept_failed']}")
+    return summary
 
-def accept_all_course_invites(course_id):
-    """Accepts all pending enrollment invitations for a given course."""
-    course = canvas.get_course(course_id)
-    enrollments = course.get_enrollments()
-    pending_enrollments = [e for e in enrollments if e.enrollment_state == "invited"]
+def accept_course_invites(course_id, enrollments, max_workers=DEFAULT_MAX_WORKERS):
+    """
+    Accepts the given invited enrollments (dicts with "id" and "user_id") in parallel,
+    masquerading as each student. Returns {"accepted": count, "failed": [user_id, ...]}.
+    """
+    def accept(enrollment):
+        student_id = enrollment["user_id"]
+        accept_url = f"/api/v1/courses/{course_id}/enrollments/{enrollment['id']}/accept"
+        try:
+            response = canvas_request("POST", accept_url, as_user_id=student_id, idempotent=True)
+            if response.status_code == 200:
+                print(f"Enrollment accepted for Student ID: {student_id}")
+                return True
+            print(f"Failed to accept enrollment for Student ID: {student_id}: {response.status_code}")
+        except Exception as e:
+            print(f"Failed to accept enrollment for Student ID: {student_id}: {e}")
+        return False
 
-    for enrollment in pending_enrollments:
-        student_id = enrollment.user_id
-        enrollment_id = enrollment.id
+    with ThreadPoolExecutor(max_workers=max(1, max_workers)) as executor:
+        results = list(executor.map(accept, enrollments))
 
-        accept_url = f"{API_URL}/api/v1/courses/{course_id}/enrollments/{enrollment_id}/accept"
-        headers = {"Authorization": f"Bearer {TOKEN}"}
-        params = {"as_user_id": student_id}
+    return {
+        "accepted": sum(results),
+        "failed": [e["user_id"] for e, ok in zip(enrollments, results) if not ok]
+    }
 
-        response = requests.post(accept_url, headers=headers, params=params)
+def accept_all_course_invites(course_id, user_ids=None, max_workers=DEFAULT_MAX_WORKERS):
+    """
+    Accepts all pending enrollment invitations for a given course.
+    Only invited student enrollments are requested from Canvas (state[]=invited), and if
+    user_ids is given only those users' invites are accepted.
+    Returns {"accepted": count, "failed": [user_id, ...]}.
+    """
+    params = {"state[]": "invited", "type[]": "StudentEnrollment", "per_page": 100}
+    wanted = {int(user_id) for user_id in user_ids} if user_ids is not None else None
+    pending_enrollments = [
+        e for e in iter_paginated(f"/api/v1/courses/{course_id}/enrollments", params=params)
+        if wanted is None or e["user_id"] in wanted
+    ]
 
-        if response.status_code == 200:
-            print(f"Enrollment accepted for Student ID: {student_id}")
-        else:
-            print(f"Failed to accept enrollment for Student ID: {student_id}")
+    summary = accept_course_invites(course_id, pending_enrollments, max_workers=max_workers)
+    print(f"✅ Accepted {summary['accepted']}/{len(pending_enrollments)} pending invites in Course {course_id}.")
+    return summary
 
 def remove_students_from_lab():
     """Completely deletes test students from the Canvas account."""
-    data = load_data_from_file()
+    store = get_state_store()
     account = canvas.get_account(ACCOUNT_ID)
 
-    for student in data["students"]:
+    for student in store.get_students():
         try:
             # Use delete_user() to permanently remove the user
             deleted_user = account.delete_user(student["id"])
@@ -186,59 +1577,312 @@ def remove_students_from_lab():
         except Exception as e:
             print(f"Failed to delete {student['name']}: {e}")
 
-    # Clear student data from file
-    data["students"] = []
-    save_data_to_file(data)
+    # Clear student data from the state store
+    store.remove_students()
 #endregion
 
 #region ==================== Sample Quiz Completion Functions ==================== #
 
-def create_quiz_from_json(course_id, quiz_title, json_file='quiz_data.json'):
-    """Creates a quiz in a Canvas course using data from a JSON file and saves quiz info."""
+def format_question(question, position):
+    """Returns the Canvas question payload for one quiz_data.json question at an explicit position."""
+    return {
+        "question_name": question.get("question_name", "Default Name"),
+        "question_text": question.get("question_text", ""),
+        "question_type": question.get("question_type", "multiple_choice_question"),
+        "points_possible": question.get("points_possible", 1),
+        "position": position,
+        "answers": question.get("answers", [])
+    }
+
+def create_quiz_question(course_id, quiz_id, question, position):
+    """
+    Creates one question at the given (1-based) position.
+    Returns {"position", "question_name", "status", "question_id", "error"}.
+    """
+    result = {"position": position, "question_name": question.get("question_name"), "status": "failed",
+              "question_id": None, "error": None}
+    try:
+        url = f"/api/v1/courses/{course_id}/quizzes/{quiz_id}/questions"
+        response = canvas_request("POST", url, json={"question": format_question(question, position)})
+        if response.status_code == 200:
+            result.update(status="created", question_id=response.json()["id"])
+        else:
+            result["error"] = f"{response.status_code} - {response.text}"
+    except Exception as e:
+        result["error"] = str(e)
+    return result
+
+def create_quiz_questions(course_id, quiz_id, questions, positions=None, max_workers=DEFAULT_MAX_WORKERS):
+    """
+    Creates questions concurrently on up to max_workers threads. Every question is sent with
+    its position, so the quiz keeps the file's order whatever order the requests finish in.
+    positions (1-based) limits the run to those questions, e.g. to repair a partial quiz.
+    Returns the per-question results in position order.
+    """
+    wanted = sorted(positions) if positions else range(1, len(questions) + 1)
+    with ThreadPoolExecutor(max_workers=max(1, max_workers)) as executor:
+        results = list(executor.map(
+            lambda position: create_quiz_question(course_id, quiz_id, questions[position - 1], position), wanted))
+    # The quiz's question count and updated_at changed, and answer keys are versioned by them
+    invalidate_cached_object("quiz", quiz_id)
+    return results
+
+def build_qti_package(quiz_title, questions):
+    """
+    Packages questions as a QTI 1.2 zip (imsmanifest.xml plus one assessment) for a Canvas
+    qti_converter content migration. Choice questions (multiple choice, true/false, multiple
+    answers) carry their correct answers; other types are imported without scoring rules.
+    """
+    def text(value):
+        return html.escape(str(value), quote=True)
+
+    items = []
+    for position, question in enumerate(questions, start=1):
+        question_type = question.get("question_type", "multiple_choice_question")
+        cardinality = "Multiple" if question_type == "multiple_answers_question" else "Single"
+        labels, correct = [], []
+        for index, answer in enumerate(question.get("answers", []), start=1):
+            ident = f"q{position}_a{index}"
+            labels.append(f'<response_label ident="{ident}"><material><mattext texttype="text/plain">'
+                          f'{text(answer.get("answer_text", ""))}</mattext></material></response_label>')
+            if float(answer.get("weight", 0) or 0) > 0:
+                correct.append(f'<varequal respident="response{position}">{ident}</varequal>')
+        condition = "".join(correct) if len(correct) <= 1 else f"<and>{''.join(correct)}</and>"
+        items.append(
+            f'<item ident="q{position}" title="{text(question.get("question_name", "Question"))}">'
+            "<itemmetadata><qtimetadata>"
+            f"<qtimetadatafield><fieldlabel>question_type</fieldlabel><fieldentry>{question_type}</fieldentry></qtimetadatafield>"
+            f"<qtimetadatafield><fieldlabel>points_possible</fieldlabel><fieldentry>{question.get('points_possible', 1)}</fieldentry></qtimetadatafield>"
+            "</qtimetadata></itemmetadata>"
+            f'<presentation><material><mattext texttype="text/html">{text(question.get("question_text", ""))}</mattext></material>'
+            f'<response_lid ident="response{position}" rcardinality="{cardinality}"><render_choice>{"".join(labels)}'
+            "</render_choice></response_lid></presentation>"
+            '<resprocessing><outcomes><decvar maxvalue="100" minvalue="0" varname="SCORE" vartype="Decimal"/></outcomes>'
+            + (f'<respcondition continue="No"><conditionvar>{condition}</conditionvar>'
+               '<setvar action="Set" varname="SCORE">100</setvar></respcondition>' if correct else "")
+            + "</resprocessing></item>")
+
+    assessment = ('<?xml version="1.0" encoding="UTF-8"?>'
+                  '<questestinterop xmlns="http://www.imsglobal.org/xsd/ims_qtiasiv1p2">'
+                  f'<assessment ident="sbg_quiz" title="{text(quiz_title)}"><section ident="root_section">'
+                  f'{"".join(items)}</section></assessment></questestinterop>')
+    manifest = ('<?xml version="1.0" encoding="UTF-8"?>'
+                '<manifest identifier="sbg_manifest" xmlns="http://www.imsglobal.org/xsd/imsccv1p1/imscp_v1p1">'
+                '<resources><resource identifier="sbg_quiz" type="imsqti_xmlv1p2">'
+                '<file href="sbg_quiz.xml"/></resource></resources></manifest>')
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w", zipfile.ZIP_DEFLATED) as archive:
+        archive.writestr("imsmanifest.xml", manifest)
+        archive.writestr("sbg_quiz.xml", assessment)
+    return buffer.getvalue()
+
+def import_quiz_via_qti(course_id, quiz_title, quiz_data, questions, timeout=MIGRATION_TIMEOUT):
+    """
+    Creates a quiz and all its questions with one QTI content migration instead of one
+    POST per question: the package is uploaded to the migration's pre_attachment URL,
+    the migration's Progress is awaited, and the remaining quiz settings are applied with
+    one edit. Returns (quiz object or None, [migration issue descriptions]).
+    """
+    package = build_qti_package(quiz_title, questions)
+    url = f"/api/v1/courses/{course_id}/content_migrations"
+    response = canvas_request("POST", url, json={
+        "migration_type": "qti_converter",
+        "pre_attachment": {"name": "sbg_quiz.zip", "size": len(package)},
+        "settings": {"import_quizzes_next": False}
+    })
+    if response.status_code != 200:
+        return None, [f"Content migration could not be started: {response.status_code} - {response.text}"]
+    migration = response.json()
+
+    # The upload URL is not a Canvas API endpoint, so it is sent without the token
+    upload = migration["pre_attachment"]
+    upload_response = get_http_session().post(
+        upload["upload_url"], data=upload.get("upload_params", {}),
+        files={upload.get("file_param", "file"): ("sbg_quiz.zip", package, "application/zip")})
+    if upload_response.status_code not in (200, 201):
+        return None, [f"QTI package upload failed: {upload_response.status_code} - {upload_response.text}"]
+    print(f"📤 Uploaded QTI package with {len(questions)} questions (migration {migration['id']}).")
+
+    response = canvas_request("GET", f"{url}/{migration['id']}")
+    if response.status_code != 200:
+        return None, [f"Content migration {migration['id']} could not be read: {response.status_code} - {response.text}"]
+    migration = response.json()
+    if migration.get("progress_url"):
+        response = canvas_request("GET", migration["progress_url"])
+        if response.status_code != 200:
+            return None, [f"Content migration {migration['id']} progress could not be read: "
+                          f"{response.status_code} - {response.text}"]
+        progress = wait_for_progress(response.json(), timeout=timeout)
+        if not progress or progress["workflow_state"] != "completed":
+            return None, [f"Content migration {migration['id']} did not complete."]
+
+    issues = [issue.get("description") for issue in
+              iter_paginated(f"{url}/{migration['id']}/migration_issues")]
+
+    # The migration does not return the quiz; find the newest quiz with this title
+    matches = [quiz for quiz in iter_paginated(f"/api/v1/courses/{course_id}/quizzes",
+                                               params={"search_term": quiz_title})
+               if quiz["title"] == quiz_title]
+    if not matches:
+        return None, issues + [f"No quiz titled '{quiz_title}' was found after the migration."]
+    quiz = get_cached_quiz(course_id, max(quiz["id"] for quiz in matches))
+
+    settings = {key: value for key, value in quiz_data.items() if key != "title"}
+    if settings:
+        quiz = quiz.edit(quiz=settings)
+        invalidate_cached_object("quiz", quiz.id)
+    return quiz, issues
+
+def author_quizzes(course_ids, quiz_title, quiz_data, questions, max_workers=DEFAULT_MAX_WORKERS, method="auto"):
+    """
+    Creates the same quiz in every course in course_ids and records each in the state store.
+
+    With method "questions" the quizzes are created first, then all questions for all courses
+    share one pool of max_workers threads. With method "qti" each course gets one QTI content
+    migration. "auto" uses QTI for banks of QTI_IMPORT_THRESHOLD questions or more.
+
+    Returns {course_id: report}, where a report is {"course_id", "quiz_id", "title", "method",
+    "created", "failed": [{"position", "question_name", "error"}], "issues"}. A QTI import is
+    checked by listing the quiz's questions; positions it did not create count as failed.
+    Failed positions are kept in the state store so repair_quiz_questions can finish the quiz later.
+    """
+    if method == "auto":
+        method = "qti" if len(questions) >= QTI_IMPORT_THRESHOLD else "questions"
+    reports = {course_id: {"course_id": course_id, "quiz_id": None, "title": quiz_title, "method": method,
+                           "created": 0, "failed": [], "issues": []} for course_id in course_ids}
+
+    def create_quiz(course_id):
+        try:
+            if method == "qti":
+                return import_quiz_via_qti(course_id, quiz_title, quiz_data, questions)
+            quiz = get_cached_course(course_id).create_quiz(quiz=dict(quiz_data, title=quiz_title))
+            return quiz, []
+        except Exception as e:
+            return None, [f"Quiz could not be created: {e}"]
+
+    with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(course_ids)))) as executor:
+        created = dict(zip(course_ids, executor.map(create_quiz, course_ids)))
+
+    tasks = []
+    for course_id, (quiz, issues) in created.items():
+        report = reports[course_id]
+        report["issues"] = issues
+        if quiz is None:
+            print(f"❌ Quiz '{quiz_title}' was not created in course {course_id}: {'; '.join(issues)}")
+            continue
+        report["quiz_id"] = quiz.id
+        print(f"Quiz created: {quiz.title} (ID: {quiz.id}) in course {course_id}")
+        if method == "qti":
+            try:
+                missing = missing_question_positions(course_id, quiz.id, len(questions))
+            except Exception as e:
+                report["issues"].append(f"Imported questions could not be listed: {e}")
+                continue
+            report["failed"] = [{"position": position, "question_name": questions[position - 1].get("question_name"),
+                                 "error": "Not created by the QTI import"} for position in missing]
+            report["created"] = len(questions) - len(missing)
+        else:
+            tasks += [(course_id, quiz.id, position) for position in range(1, len(questions) + 1)]
+
+    # Questions for every course share one bounded pool
+    with ThreadPoolExecutor(max_workers=max(1, max_workers)) as executor:
+        results = executor.map(lambda task: (task[0], create_quiz_question(task[0], task[1], questions[task[2] - 1],
+                                                                           task[2])), tasks)
+        for course_id, result in results:
+            report = reports[course_id]
+            if result["status"] == "created":
+                report["created"] += 1
+            else:
+                report["failed"].append({key: result[key] for key in ("position", "question_name", "error")})
+    for quiz_id in {task[1] for task in tasks}:
+        invalidate_cached_object("quiz", quiz_id)
+
+    store = get_state_store()
+    store.add_quizzes([{"id": report["quiz_id"], "title": quiz_title, "course_id": course_id,
+                        "failed_positions": [failure["position"] for failure in report["failed"]]}
+                       for course_id, report in reports.items() if report["quiz_id"]])
+    for report in reports.values():
+        if report["failed"]:
+            print(f"⚠️ Quiz {report['quiz_id']} in course {report['course_id']}: {len(report['failed'])} questions "
+                  f"failed (positions {[failure['position'] for failure in report['failed']]}); "
+                  f"run repair_quiz_questions to finish it.")
+    return reports
+
+def load_quiz_file(json_file):
+    """Returns (quiz settings, questions) from a quiz_data.json-style file."""
     with open(json_file, "r") as file:
         quiz_data = json.load(file)
-
     questions = quiz_data.pop("questions", [])
-    quiz_data["title"] = quiz_title
+    return quiz_data, questions
+
+def create_quiz_in_courses(course_ids, quiz_title, json_file='quiz_data.json', max_workers=DEFAULT_MAX_WORKERS,
+                           method="auto"):
+    """Creates the quiz in json_file in every course in course_ids. Returns {course_id: report} (see author_quizzes)."""
+    quiz_data, questions = load_quiz_file(json_file)
+    reports = author_quizzes(list(course_ids), quiz_title, quiz_data, questions, max_workers=max_workers,
+                             method=method)
+    complete = sum(1 for report in reports.values() if report["quiz_id"] and not report["failed"])
+    print(f"✅ Quiz '{quiz_title}' complete in {complete}/{len(reports)} courses.")
+    return reports
+
+def missing_question_positions(course_id, quiz_id, question_count):
+    """Lists a quiz's questions and returns the positions from 1 to question_count that have none."""
+    existing = {question.get("position") for question in
+                iter_paginated(f"/api/v1/courses/{course_id}/quizzes/{quiz_id}/questions")}
+    return [position for position in range(1, question_count + 1) if position not in existing]
+
+def repair_quiz_questions(course_id, quiz_id, json_file='quiz_data.json', positions=None,
+                          max_workers=DEFAULT_MAX_WORKERS):
+    """
+    Creates the questions a partial quiz is missing, without rebuilding the quiz.
+    By default the positions are the failures recorded in the state store; if none are
+    recorded, the quiz's questions are listed and any position without a question is filled.
+    Returns the per-question results.
+    """
+    _, questions = load_quiz_file(json_file)
+    store = get_state_store()
+    tracked = store.get_quiz(quiz_id) or {"id": quiz_id, "title": None, "course_id": course_id}
+    if positions is None:
+        positions = tracked.get("failed_positions")
+    if not positions:
+        positions = missing_question_positions(course_id, quiz_id, len(questions))
+    if not positions:
+        print(f"✅ Quiz {quiz_id} already has all {len(questions)} questions.")
+        return []
 
-    course = canvas.get_course(int(course_id))
-    quiz = course.create_quiz(quiz=quiz_data)
-    print(f"Quiz created: {quiz.title} (ID: {quiz.id})")
+    results = create_quiz_questions(course_id, quiz_id, questions, positions=positions, max_workers=max_workers)
+    tracked["failed_positions"] = [result["position"] for result in results if result["status"] != "created"]
+    store.add_quiz(tracked)
+    print(f"🔧 Repaired quiz {quiz_id}: {len(results) - len(tracked['failed_positions'])}/{len(results)} "
+          f"missing questions created.")
+    return results
 
-    for question in questions:
-        formatted_question = {
-            "question_name": question.get("question_name", "Default Name"),
-            "question_text": question.get("question_text", ""),
-            "question_type": question.get("question_type", "multiple_choice_question"),
-            "points_possible": question.get("points_possible", 1),
-            "answers": question.get("answers", [])
-        }
-        quiz.create_question(question=formatted_question)
-
-    # Save quiz details to the file
-    data = load_data_from_file()
-    quiz_entry = {
-        "id": quiz.id,
-        "title": quiz.title,
-        "course_id": course_id
-    }
-    data["quizzes"].append(quiz_entry)
-    save_data_to_file(data)
+def create_quiz_from_json(course_id, quiz_title, json_file='quiz_data.json', max_workers=DEFAULT_MAX_WORKERS,
+                          method="auto"):
+    """
+    Creates a quiz in a Canvas course using data from a JSON file and saves quiz info.
+    Questions are created concurrently (or, for large banks, with one QTI migration; see
+    author_quizzes). Returns the report for the course, including any failed questions.
+    """
+    quiz_data, questions = load_quiz_file(json_file)
+    report = author_quizzes([course_id], quiz_title, quiz_data, questions, max_workers=max_workers,
+                            method=method)[course_id]
 
     def delete_previous_quiz_and_create_new(course_id, quiz_title, json_file='quiz_data.json'):
         """
         Deletes the most recently created quiz and creates a new one.
-        Saves new quiz details to canvas_data.json.
+        Saves new quiz details to the state store.
         """
-        data = load_data_from_file()
+        store = get_state_store()
 
         # Delete previous quiz
-        if data["quizzes"]:
-            last_quiz = data["quizzes"].pop()  # Get last quiz
+        last_quiz = store.last_quiz()
+        if last_quiz:
             try:
-                course = canvas.get_course(course_id)
-                quiz = course.get_quiz(last_quiz["id"])
+                quiz = get_cached_quiz(course_id, last_quiz["id"])
                 quiz.delete()
+                invalidate_cached_object("quiz", last_quiz["id"])
+                store.remove_quiz(last_quiz["id"])
                 print(f"Deleted previous quiz: {last_quiz['title']} (ID: {last_quiz['id']})")
             except Exception as e:
                 print(f"Failed to delete quiz {last_quiz['title']}: {e}")
@@ -251,7 +1895,7 @@ def create_quiz_from_json(course_id, quiz_title, json_file='quiz_data.json'):
             questions = quiz_data.pop("questions", [])
             quiz_data["title"] = quiz_title
 
-            course = canvas.get_course(course_id)
+            course = get_cached_course(course_id)
             quiz = course.create_quiz(quiz=quiz_data)
             print(f"Created new quiz: {quiz.title} (ID: {quiz.id})")
 
@@ -267,16 +1911,16 @@ def create_quiz_from_json(course_id, quiz_title, json_file='quiz_data.json'):
 
             # Save new quiz details
             new_quiz_entry = {"id": quiz.id, "title": quiz.title, "course_id": course_id}
-            data["quizzes"].append(new_quiz_entry)
-            save_data_to_file(data)
+            store.add_quiz(new_quiz_entry)
 
         except Exception as e:
             print(f"Failed to create new quiz: {e}")
 
+    return report
+
 def check_quiz_type(course_id, quiz_id):
     """Checks if a quiz is a Classic Quiz or a New Quiz."""
-    course = canvas.get_course(course_id)
-    quiz = course.get_quiz(quiz_id)
+    quiz = get_cached_quiz(course_id, quiz_id)
 
     if hasattr(quiz, 'quiz_engine'):
         quiz_type = "New Quiz" if quiz.quiz_engine == 2 else "Classic Quiz"
@@ -284,45 +1928,109 @@ def check_quiz_type(course_id, quiz_id):
     else:
         print("Could not determine quiz type.")
 
-def get_quiz_answer_key(course_id, quiz_id):
+ANSWER_KEY_FORMAT = 2 # bumped when stored answer keys gain fields (2: question positions)
+
+def quiz_version(quiz):
     """
-    Retrieve the correct answers for all quiz questions (requires instructor/admin token)
-    and also store wrong answers for each question.
-    Returns a dict mapping question_id to a dict with "correct" and "wrong" keys.
+    Returns the version an answer key is stored under: the answer key format, the quiz's
+    updated_at and its question count.
     """
-    try:
-        course = canvas.get_course(course_id)
-        quiz = course.get_quiz(quiz_id)
-        questions = quiz.get_questions()
+    if isinstance(quiz, dict):
+        return f"{ANSWER_KEY_FORMAT}:{quiz.get('updated_at')}:{quiz.get('question_count')}"
+    return f"{ANSWER_KEY_FORMAT}:{getattr(quiz, 'updated_at', None)}:{getattr(quiz, 'question_count', None)}"
 
-        answer_key = {}
+def build_answer_key(questions):
+    """
+    Builds {question_id: {"correct": answer_id, "wrong": [answer_ids], "position": position}}
+    from quiz question dicts. Questions without a 100-weight answer are left out.
+    """
+    answer_key = {}
+    for question in questions:
+        possible_answers = question.get("answers") or []  # List of answer choices
 
-        for question in questions:
-            question_id = question.id
-            possible_answers = question.answers  # List of answer choices
+        # Find the correct answer (weight = 100)
+        correct_answer = next((ans for ans in possible_answers if ans.get("weight", 0) == 100), None)
 
-            # Find the correct answer (weight = 100)
-            correct_answer = next((ans for ans in possible_answers if ans.get("weight", 0) == 100), None)
+        if correct_answer:
+            wrong_answers = [ans["id"] for ans in possible_answers if ans["id"] != correct_answer["id"]]
+            answer_key[question["id"]] = {
+                "correct": correct_answer["id"],
+                "wrong": wrong_answers,
+                "position": question.get("position")
+            }
+    return answer_key
 
-            if correct_answer:
-                all_answer_ids = [ans["id"] for ans in possible_answers]
-                wrong_answers = [ans["id"] for ans in possible_answers if ans["id"] != correct_answer["id"]]
-                answer_key[question_id] = {
-                    "correct": correct_answer["id"],
-                    "wrong": wrong_answers
-                }
+def question_order(answer_key):
+    """
+    Returns the answer key's question IDs in quiz order (Q1, Q2, ...). Questions are created
+    concurrently, so their IDs do not follow the file's order; their positions do.
+    """
+    return sorted(answer_key, key=lambda question_id: (answer_key[question_id].get("position") is None,
+                                                       answer_key[question_id].get("position") or 0, question_id))
+
+def fetch_answer_key(course_id, quiz_id):
+    """Lists a quiz's questions (requires instructor/admin token) and builds its answer key."""
+    return build_answer_key(iter_paginated(f"/api/v1/courses/{course_id}/quizzes/{quiz_id}/questions"))
 
-        print(f"✅ Retrieved answer key for Quiz {quiz_id}: {answer_key}")
+def get_quiz_answer_key(course_id, quiz_id, refresh=False):
+    """
+    Retrieve the correct answers for all quiz questions (requires instructor/admin token)
+    and also store wrong answers for each question.
+    Returns a dict mapping question_id to a dict with "correct" and "wrong" keys.
+
+    The key is kept in the state store under the quiz's version (updated_at and question
+    count), so the questions are only listed again when the quiz has changed or refresh is set.
+    """
+    try:
+        quiz = get_cached_quiz(course_id, quiz_id)
+        version = quiz_version(quiz)
+        store = get_state_store()
+
+        stored_version, answer_key = store.get_answer_key(quiz_id)
+        if answer_key is not None and stored_version == version and not refresh:
+            print(f"✅ Using stored answer key for Quiz {quiz_id} ({len(answer_key)} questions).")
+            return answer_key
+
+        answer_key = fetch_answer_key(course_id, quiz_id)
+        store.put_answer_keys([(quiz_id, course_id, version, answer_key)])
+        print(f"✅ Retrieved answer key for Quiz {quiz_id} ({len(answer_key)} questions).")
         return answer_key
 
     except Exception as e:
         print(f"❌ Failed to get answer key for Quiz {quiz_id}: {e}")
         return None
 
+def warm_answer_keys(course_id, quiz_ids=None, max_workers=DEFAULT_MAX_WORKERS):
+    """
+    Makes sure the state store holds a current answer key for every quiz in a course (or
+    just quiz_ids). The quizzes come from one paginated listing; only quizzes whose version
+    changed have their questions listed, concurrently, and all new keys are stored in one
+    transaction. Returns {quiz_id: answer key}.
+    """
+    wanted = {int(quiz_id) for quiz_id in quiz_ids} if quiz_ids else None
+    store = get_state_store()
+    stored_versions = store.get_answer_key_versions(course_id)
+
+    quizzes = [quiz for quiz in iter_paginated(f"/api/v1/courses/{course_id}/quizzes")
+               if wanted is None or quiz["id"] in wanted]
+    stale = [quiz for quiz in quizzes if stored_versions.get(quiz["id"]) != quiz_version(quiz)]
+
+    with ThreadPoolExecutor(max_workers=max(1, max_workers)) as executor:
+        fetched = list(executor.map(lambda quiz: fetch_answer_key(course_id, quiz["id"]), stale))
+    store.put_answer_keys([(quiz["id"], course_id, quiz_version(quiz), answer_key)
+                           for quiz, answer_key in zip(stale, fetched)])
+
+    answer_keys = dict(zip((quiz["id"] for quiz in stale), fetched))
+    for quiz in quizzes:
+        if quiz["id"] not in answer_keys:
+            answer_keys[quiz["id"]] = store.get_answer_key(quiz["id"])[1]
+    print(f"✅ Answer keys ready for {len(quizzes)} quizzes in course {course_id} ({len(stale)} rebuilt).")
+    return answer_keys
+
 def get_quiz(quiz_id, student_id):
     """Retrieve quiz details while masquerading as a student."""
-    url = f"{API_URL}/courses/{COURSE_ID}/quizzes/{quiz_id}?as_user_id={student_id}"
-    response = requests.get(url, headers=HEADERS)
+    url = f"/api/v1/courses/{COURSE_ID}/quizzes/{quiz_id}"
+    response = canvas_request("GET", url, as_user_id=student_id)
     if response.status_code == 200:
         quiz_data = response.json()
         print("Quiz Details:", quiz_data)
@@ -336,12 +2044,10 @@ def start_quiz(course_id, quiz_id, student_id, token):
     Retrieve an active (untaken) quiz submission for a student using the student's token.
     If none exists, try to create a new submission.
     """
-    url_submissions = f"{API_URL}/api/v1/courses/{course_id}/quizzes/{quiz_id}/submissions"
-    headers = {"Authorization": f"Bearer {token}", "Content-Type": "application/json"}
-    params = {"as_user_id": student_id}
+    url_submissions = f"/api/v1/courses/{course_id}/quizzes/{quiz_id}/submissions"
 
     # Step 1: Check for an existing active submission
-    response = requests.get(url_submissions, headers=headers, params=params)
+    response = canvas_request("GET", url_submissions, token=token, as_user_id=student_id)
     if response.status_code == 200:
         submissions = response.json().get("quiz_submissions", [])
         active_submission = next((s for s in submissions if s.get("workflow_state") == "untaken"), None)
@@ -355,7 +2061,7 @@ def start_quiz(course_id, quiz_id, student_id, token):
         return None
 
     # Step 2: If no active submission exists, create one using the student token
-    response = requests.post(url_submissions, headers=headers, params=params)
+    response = canvas_request("POST", url_submissions, token=token, as_user_id=student_id)
     if response.status_code == 200:
         new_submission = response.json()["quiz_submissions"][0]
         print(f"✅ Created new submission for Student {student_id}: {new_submission['id']}")
@@ -369,8 +2075,7 @@ def answer_quiz_questions(course_id, quiz_id, quiz_submission_id, student_id, an
     Answer quiz questions using the instructor-provided answer key.
     """
     try:
-        course = canvas.get_course(course_id)
-        quiz = course.get_quiz(quiz_id)
+        quiz = get_cached_quiz(course_id, quiz_id)
 
         # ✅ Directly get submission instead of searching
         quiz_submission = quiz.get_quiz_submission(quiz_submission_id)
@@ -414,10 +2119,8 @@ def submit_quiz(course_id, quiz_id, quiz_submission_id, student_id):
     """
     Submit the quiz for grading via a direct API call.
     """
-    url = f"{API_URL}/api/v1/courses/{course_id}/quizzes/{quiz_id}/submissions/{quiz_submission_id}/complete"
-    headers = {"Authorization": f"Bearer {TOKEN}", "Content-Type": "application/json"}
-    params = {"as_user_id": student_id}
-    response = requests.post(url, headers=headers, params=params)
+    url = f"/api/v1/courses/{course_id}/quizzes/{quiz_id}/submissions/{quiz_submission_id}/complete"
+    response = canvas_request("POST", url, as_user_id=student_id)
 
     if response.status_code == 200:
         print(f"✅ Quiz {quiz_id} submitted for Student {student_id}")
@@ -428,8 +2131,7 @@ def complete_quiz_for_students_OLD(course_id, quiz_id, correct_answers_map):
     """
     Masquerades as each student and completes the quiz.
     """
-    data = load_data_from_file()
-    students = data["students"]
+    students = get_state_store().get_students()
 
     # Retrieve the correct answer key (requires instructor/admin token)
     answer_key = get_quiz_answer_key(course_id, quiz_id)
@@ -437,80 +2139,154 @@ def complete_quiz_for_students_OLD(course_id, quiz_id, correct_answers_map):
         print("❌ Failed to retrieve answer key. Exiting.")
         return
 
-    for index, student in enumerate(students):
-        student_id = student["id"]
-        print(f"\n🚀 Masquerading as {student['name']} (ID: {student_id}) to take quiz {quiz_id}...")
+    for index, student in enumerate(students):
+        student_id = student["id"]
+        print(f"\n🚀 Masquerading as {student['name']} (ID: {student_id}) to take quiz {quiz_id}...")
+
+        # Start the quiz and get the correct submission ID
+        quiz_submission_id = start_quiz(course_id, quiz_id, student_id)
+        if not quiz_submission_id:
+            continue
+
+        # Submit answers using the correct answer key
+        correct_questions = correct_answers_map.get(index, [])
+        answer_quiz_questions(course_id, quiz_id, quiz_submission_id, student_id, answer_key, correct_questions)
+
+        # Submit quiz
+        submit_quiz(course_id, quiz_id, quiz_submission_id, student_id)
+
+        print(f"✅ Quiz {quiz_id} completed for {student['name']}\n")
+
+def build_student_answers(answer_key, sorted_question_ids, correct_questions, rng=random):
+    """
+    Builds the {question_id: answer_id} dict for one student.
+    Questions whose order (1-based) is in correct_questions get the correct answer,
+    all others get a wrong answer picked with rng (or the correct one if no wrong answers exist).
+    """
+    correct_questions = set(correct_questions)
+    student_answers = {}
+    for idx, q_id in enumerate(sorted_question_ids, start=1):
+        if idx in correct_questions:
+            student_answers[q_id] = answer_key[q_id]["correct"]
+        else:
+            if answer_key[q_id]["wrong"]:
+                student_answers[q_id] = rng.choice(answer_key[q_id]["wrong"])
+            else:
+                student_answers[q_id] = answer_key[q_id]["correct"]
+    return student_answers
+
+def take_quiz_as_student(course_id, quiz_id, student, answer_key, sorted_question_ids, correct_questions, rng=random):
+    """
+    Runs the start -> answer -> complete chain for a single student, in order.
+    Returns a result dict describing how far the student got:
+      {"student_id", "name", "status", "step", "submission_id", "error", "elapsed"}
+    status is "completed" or "failed"; step is the last step that was attempted.
+    """
+    started = time.perf_counter()
+    student_id = student["id"]
+    result = {
+        "student_id": student_id,
+        "name": student.get("name"),
+        "status": "failed",
+        "step": "token",
+        "submission_id": None,
+        "error": None,
+        "elapsed": 0.0
+    }
+
+    try:
+        student_token = student.get("token")
+        if not student_token:
+            print(f"❌ No token found for Student {student_id}")
+            result["error"] = "No token found"
+            return result
+
+        print(f"\n🚀 Masquerading as {student.get('name')} (ID: {student_id}) to take quiz {quiz_id}...")
+
+        # Start or retrieve the quiz submission using the student token
+        result["step"] = "start"
+        submission = start_quiz(course_id, quiz_id, student_id, student_token)
+        if not submission:
+            result["error"] = "Could not start or find a quiz submission"
+            return result
+        result["submission_id"] = submission["id"]
+
+        # Build and submit the student's answers based on question order
+        result["step"] = "answer"
+        student_answers = build_student_answers(answer_key, sorted_question_ids, correct_questions, rng)
+        answered = submit_answers_masquerading(course_id, quiz_id, submission["id"], student_id, student_answers,
+                                               submission.get("attempt"), submission.get("validation_token"),
+                                               student_token)
+        if answered is None:
+            result["error"] = "Failed to submit answers"
+            return result
 
-        # Start the quiz and get the correct submission ID
-        quiz_submission_id = start_quiz(course_id, quiz_id, student_id)
-        if not quiz_submission_id:
-            continue
+        # Complete the quiz submission using the student token
+        result["step"] = "complete"
+        completed = complete_quiz_submission(course_id, quiz_id, submission, student_id, student_token)
+        if completed is None:
+            result["error"] = "Failed to complete the quiz submission"
+            return result
 
-        # Submit answers using the correct answer key
-        correct_questions = correct_answers_map.get(index, [])
-        answer_quiz_questions(course_id, quiz_id, quiz_submission_id, student_id, answer_key, correct_questions)
+        result["status"] = "completed"
+        print(f"✅ Quiz {quiz_id} completed for {student.get('name')}\n")
 
-        # Submit quiz
-        submit_quiz(course_id, quiz_id, quiz_submission_id, student_id)
+    except Exception as e:
+        print(f"❌ Quiz {quiz_id} failed for Student {student_id} during '{result['step']}': {e}")
+        result["error"] = str(e)
 
-        print(f"✅ Quiz {quiz_id} completed for {student['name']}\n")
+    finally:
+        result["elapsed"] = round(time.perf_counter() - started, 3)
 
-def complete_quiz_for_students(course_id, quiz_id, correct_answers_map):
+    return result
+
+def complete_quiz_for_students(course_id, quiz_id, correct_answers_map, max_workers=DEFAULT_MAX_WORKERS, seed=None):
     """
     Masquerades as each student and completes the quiz.
     correct_answers_map is a dictionary mapping student index (0, 1, 2, …)
     to a list of question orders (e.g. [1, 3]) that the student should answer correctly.
     This version uses each student's token from the JSON file to create an active submission.
+
+    Students are processed concurrently by up to max_workers threads; each student's
+    start -> answer -> complete chain still runs in order. Use max_workers=1 for the
+    old one-at-a-time behaviour.
+
+    For large rosters, generate_answer_plan builds correct_answers_map from a score
+    distribution. With a seed the wrong answers are picked reproducibly as well.
+
+    Returns a list of per-student result dicts (see take_quiz_as_student), in roster order.
     """
-    data = load_data_from_file()
-    students = data["students"]
+    students = get_state_store().get_students()
 
     # Retrieve the answer key (requires instructor/admin token)
     answer_key = get_quiz_answer_key(course_id, quiz_id)
     if not answer_key:
         print("❌ Failed to retrieve answer key. Exiting.")
-        return
-
-    # Sort question IDs in ascending order; assume that order corresponds to Q1, Q2, ...
-    sorted_question_ids = sorted(answer_key.keys())
-
-    for index, student in enumerate(students):
-        student_id = student["id"]
-        student_token = student.get("token")
-        if not student_token:
-            print(f"❌ No token found for Student {student_id}")
-            continue
-
-        print(f"\n🚀 Masquerading as {student['name']} (ID: {student_id}) to take quiz {quiz_id}...")
-
-        # Start or retrieve the quiz submission using the student token
-        submission = start_quiz(course_id, quiz_id, student_id, student_token)
-        if not submission:
-            continue
+        return []
 
-        # Build the student's answers based on question order
-        correct_questions = correct_answers_map.get(index, [])
-        student_answers = {}
-        for idx, q_id in enumerate(sorted_question_ids, start=1):
-            if idx in correct_questions:
-                student_answers[q_id] = answer_key[q_id]["correct"]
-            else:
-                if answer_key[q_id]["wrong"]:
-                    student_answers[q_id] = random.choice(answer_key[q_id]["wrong"])
-                else:
-                    student_answers[q_id] = answer_key[q_id]["correct"]
+    # Order the questions by position, so the first one is Q1, the second Q2, ...
+    sorted_question_ids = question_order(answer_key)
 
-        # Assuming 'submission' is the quiz submission dict you received from start_quiz
-        attempt = submission.get("attempt")
-        validation_token = submission.get("validation_token")
-        # Build your student_answers dict as before...
-        submit_answers_masquerading(course_id, quiz_id, submission["id"], student_id, student_answers, attempt,
-                                    validation_token, student_token)
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=max(1, max_workers)) as executor:
+        futures = [
+            executor.submit(take_quiz_as_student, course_id, quiz_id, student, answer_key,
+                            sorted_question_ids, correct_answers_map.get(index, []),
+                            random.Random(f"{seed}:{index}") if seed is not None else random)
+            for index, student in enumerate(students)
+        ]
+        results = [future.result() for future in futures]
+    elapsed = time.perf_counter() - started
 
-        # Complete the quiz submission using the student token
-        complete_quiz_submission(course_id, quiz_id, submission, student_id, student_token)
+    completed = sum(1 for r in results if r["status"] == "completed")
+    print(f"📊 Quiz {quiz_id}: {completed}/{len(results)} students completed in {elapsed:.1f}s "
+          f"using {max_workers} workers.")
+    for r in results:
+        if r["status"] != "completed":
+            print(f"   ❌ {r['name']} (ID: {r['student_id']}) failed at '{r['step']}': {r['error']}")
+    report_throttle()
 
-        print(f"✅ Quiz {quiz_id} completed for {student['name']}\n")
+    return results
 
 def complete_quiz_submission(course_id, quiz_id, submission, student_id, access_code=None):
     """
@@ -532,19 +2308,14 @@ def complete_quiz_submission(course_id, quiz_id, submission, student_id, access_
         print(f"❌ Submission data incomplete for Student {student_id}. Cannot complete quiz.")
         return None
 
-    url = f"{API_URL}/api/v1/courses/{course_id}/quizzes/{quiz_id}/submissions/{quiz_submission_id}/complete"
-    headers = {
-        "Authorization": f"Bearer {TOKEN}",
-        "Content-Type": "application/json"
-    }
-    params = {"as_user_id": student_id}
+    url = f"/api/v1/courses/{course_id}/quizzes/{quiz_id}/submissions/{quiz_submission_id}/complete"
     payload = {
         "attempt": attempt,
         "validation_token": validation_token,
         "access_code": access_code  # Can be None if not needed
     }
 
-    response = requests.post(url, headers=headers, params=params, json=payload)
+    response = canvas_request("POST", url, as_user_id=student_id, json=payload)
     if response.status_code == 200:
         print(f"✅ Quiz {quiz_id} submitted for Student {student_id}")
         return response.json()
@@ -567,14 +2338,9 @@ def submit_answers_masquerading(course_id, quiz_id, quiz_submission_id, student_
     :param attempt: The attempt number from the submission object.
     :param validation_token: The validation token from the submission object.
     :param student_token: The student's API token.
+    :return: The JSON response on success; None otherwise.
     """
-    url = f"{API_URL}/api/v1/quiz_submissions/{quiz_submission_id}/questions"
-    headers = {
-        "Authorization": f"Bearer {student_token}",
-        "Content-Type": "application/json"
-    }
-    params = {"as_user_id": student_id}
-
+    url = f"/api/v1/quiz_submissions/{quiz_submission_id}/questions"
     payload = {
         "attempt": attempt,
         "validation_token": validation_token,
@@ -584,12 +2350,15 @@ def submit_answers_masquerading(course_id, quiz_id, quiz_submission_id, student_
         ]
     }
 
-    response = requests.post(url, json=payload, headers=headers, params=params)
+    response = canvas_request("POST", url, token=student_token, as_user_id=student_id, json=payload,
+                              idempotent=True) # re-sending the same answers is harmless
     if response.status_code == 200:
         print(f"✅ Successfully submitted answers for Student {student_id}")
+        return response.json()
     else:
         print(
             f"❌ Masquerade Failed to submit answers for Student {student_id}: {response.status_code} - {response.text}")
+        return None
 
 def complete_quiz_submission(course_id, quiz_id, submission, student_id, student_token, access_code=None):
     """
@@ -614,12 +2383,7 @@ def complete_quiz_submission(course_id, quiz_id, submission, student_id, student
         print(f"❌ Submission data incomplete for Student {student_id}. Cannot complete quiz.")
         return None
 
-    url = f"{API_URL}/api/v1/courses/{course_id}/quizzes/{quiz_id}/submissions/{quiz_submission_id}/complete"
-    headers = {
-        "Authorization": f"Bearer {student_token}",
-        "Content-Type": "application/json"
-    }
-    params = {"as_user_id": student_id}
+    url = f"/api/v1/courses/{course_id}/quizzes/{quiz_id}/submissions/{quiz_submission_id}/complete"
     payload = {
         "attempt": attempt,
         "validation_token": validation_token
@@ -627,7 +2391,7 @@ def complete_quiz_submission(course_id, quiz_id, submission, student_id, student
     if access_code:
         payload["access_code"] = access_code
 
-    response = requests.post(url, headers=headers, params=params, json=payload)
+    response = canvas_request("POST", url, token=student_token, as_user_id=student_id, json=payload)
     if response.status_code == 200:
         print(f"✅ Quiz {quiz_id} submitted for Student {student_id}")
         return response.json()
@@ -636,16 +2400,659 @@ def complete_quiz_submission(course_id, quiz_id, submission, student_id, student
         return None
 #endregion
 
+#region ==================== Synthetic Answer Plans ==================== #
+
+QUESTION_LEVEL_PATTERN = re.compile(r"\blevel\s+(\d+)\b", re.IGNORECASE)
+
+def question_levels(questions):
+    """Returns the "level N" of each question (read from its text), or None where there is none."""
+    levels = []
+    for question in questions:
+        match = QUESTION_LEVEL_PATTERN.search(question.get("question_text") or "")
+        levels.append(int(match.group(1)) if match else None)
+    return levels
+
+def level_difficulties(levels, step=LEVEL_DIFFICULTY_STEP):
+    """
+    Turns question levels into Rasch difficulties (in logits), centred on the average level:
+    each level is step logits harder than the one below. Questions without a level get 0.
+    """
+    known = [level for level in levels if level is not None]
+    centre = sum(known) / len(known) if known else 0.0
+    return [(level - centre) * step if level is not None else 0.0 for level in levels]
+
+def sample_abilities(count, rng, distribution="normal", mean=0.0, sd=1.0, separation=3.0, weight=0.5):
+    """
+    Draws count student abilities (in logits).
+
+    :param distribution: "normal" (mean, sd); "bimodal", two normal groups mean -/+ separation/2
+        apart with weight of the students in the upper group; or "uniform" over mean +/- 2 sd.
+    """
+    if distribution == "normal":
+        return [rng.gauss(mean, sd) for _ in range(count)]
+    if distribution == "bimodal":
+        half = separation / 2
+        return [rng.gauss(mean + half if rng.random() < weight else mean - half, sd) for _ in range(count)]
+    if distribution == "uniform":
+        return [rng.uniform(mean - 2 * sd, mean + 2 * sd) for _ in range(count)]
+    raise ValueError(f"Unknown ability distribution '{distribution}'")
+
+def generate_answer_plan(student_count, questions=None, question_count=None, difficulties=None,
+                         distribution="normal", seed=None, **distribution_args):
+    """
+    Builds a correct_answers_map ({student index: [question numbers answered correctly]}) for
+    complete_quiz_for_students from a Rasch model: student i answers question j correctly
+    with probability 1 / (1 + exp(difficulty_j - ability_i)).
+
+    Question difficulties come from difficulties, or from the "level N" in each question's text
+    when questions (quiz_data.json-style dicts, e.g. questions.question_data_list) are given,
+    or are all 0 for question_count questions. Abilities follow distribution (see
+    sample_abilities). The same seed always gives the same plan.
+    """
+    if difficulties is None:
+        difficulties = level_difficulties(question_levels(questions)) if questions else [0.0] * (question_count or 0)
+    rng = random.Random(seed)
+    abilities = sample_abilities(student_count, rng, distribution, **distribution_args)
+
+    # P(correct) = e^a / (e^a + e^b); the exponentials are computed once per student and per question
+    question_weights = [math.exp(difficulty) for difficulty in difficulties]
+    plan = {}
+    for index, ability in enumerate(abilities):
+        student_weight = math.exp(ability)
+        draws = [rng.random() for _ in question_weights]
+        plan[index] = [number for number, (weight, draw) in enumerate(zip(question_weights, draws), start=1)
+                       if draw * (student_weight + weight) < student_weight]
+    return plan
+
+def summarize_answer_plan(plan, question_count):
+    """Returns the score histogram and each question's share of correct answers for a plan."""
+    scores = [len(correct) for correct in plan.values()]
+    histogram = [0] * (question_count + 1)
+    for score in scores:
+        histogram[min(score, question_count)] += 1
+    correct_counts = [0] * question_count
+    for correct in plan.values():
+        for number in correct:
+            correct_counts[number - 1] += 1
+    students = len(plan) or 1
+    return {
+        "students": len(plan),
+        "mean_score": round(sum(scores) / students, 3),
+        "score_histogram": histogram,
+        "question_p_values": [round(count / students, 3) for count in correct_counts]
+    }
+
+#endregion
+
+#region ==================== Bulk Gradebook Writes ==================== #
+
+def wait_for_progress(progress, timeout=PROGRESS_TIMEOUT, poll_interval=PROGRESS_POLL_INTERVAL, max_interval=10.0):
+    """
+    Polls a Canvas Progress object (a dict with at least "id" and "workflow_state")
+    until the background job completes or fails. The poll interval grows by 1.5x each
+    round, up to max_interval.
+    Returns the final Progress dict, or None if the job did not finish within timeout.
+    """
+    deadline = time.monotonic() + timeout
+    interval = poll_interval
+
+    while progress.get("workflow_state") not in ("completed", "failed"):
+        if time.monotonic() + interval > deadline:
+            print(f"❌ Progress {progress.get('id')} did not finish within {timeout}s.")
+            return None
+        time.sleep(interval)
+        interval = min(interval * 1.5, max_interval)
+
+        response = canvas_request("GET", f"/api/v1/progress/{progress['id']}")
+        if response.status_code != 200:
+            print(f"⚠️ Could not poll progress {progress['id']}: {response.status_code} - {response.text}")
+            continue
+        progress = response.json()
+
+    return progress
+
+def bulk_update_column_data(course_id, column_values, chunk_size=BULK_CHUNK_SIZE):
+    """
+    Writes many custom gradebook column values with the bulk column data endpoint
+    (PUT /courses/:id/custom_gradebook_column_data) instead of one PUT per student.
+
+    :param course_id: The course ID.
+    :param column_values: Iterable of (column_id, user_id, content) triples.
+    :param chunk_size: Number of triples sent per request.
+    :return: A summary dict {"sent", "chunks", "failed_users"}.
+    """
+    column_data = [
+        {"column_id": column_id, "user_id": user_id, "content": str(content)}
+        for column_id, user_id, content in column_values
+    ]
+    url = f"/api/v1/courses/{course_id}/custom_gradebook_column_data"
+    summary = {"sent": len(column_data), "chunks": 0, "failed_users": []}
+
+    # Send every chunk first so Canvas can work on them while we poll
+    pending = []
+    for start in range(0, len(column_data), max(1, chunk_size)):
+        chunk = column_data[start:start + chunk_size]
+        summary["chunks"] += 1
+        try:
+            response = canvas_request("PUT", url, json={"column_data": chunk})
+            if response.status_code == 200:
+                pending.append((chunk, response.json()))
+            else:
+                print(f"❌ Bulk column update failed: {response.status_code} - {response.text}")
+                summary["failed_users"].extend(entry["user_id"] for entry in chunk)
+        except Exception as e:
+            print(f"❌ Bulk column update error: {e}")
+            summary["failed_users"].extend(entry["user_id"] for entry in chunk)
+
+    for chunk, progress in pending:
+        final = wait_for_progress(progress)
+        if final and final.get("workflow_state") == "completed":
+            print(f"✅ Bulk column update finished for {len(chunk)} entries (progress {final['id']}).")
+        else:
+            print(f"❌ Bulk column update did not complete for {len(chunk)} entries.")
+            summary["failed_users"].extend(entry["user_id"] for entry in chunk)
+
+    return summary
+
+def chunk_grade_data(grade_mapping, max_bytes=GRADE_PAYLOAD_MAX_BYTES):
+    """
+    Splits a {user_id: grade} dict into a list of update_grades "grade_data" dicts
+    whose JSON encoding stays under max_bytes each.
+    """
+    base_size = len('{"grade_data": {}}')
+    chunks = []
+    current = {}
+    size = base_size
+
+    for user_id, grade in grade_mapping.items():
+        entry = {"posted_grade": str(grade)}
+        entry_size = len(json.dumps({str(user_id): entry})) # includes room for the separator
+        if current and size + entry_size > max_bytes:
+            chunks.append(current)
+            current = {}
+            size = base_size
+        current[str(user_id)] = entry
+        size += entry_size
+
+    if current:
+        chunks.append(current)
+    return chunks
+
+def post_grade_chunk(course_id, assignment_id, grade_data):
+    """
+    Posts one grade_data chunk to submissions/update_grades and waits for its Progress job.
+    Returns the completed Progress dict (truthy), or False if the job did not complete.
+    """
+    url = f"/api/v1/courses/{course_id}/assignments/{assignment_id}/submissions/update_grades"
+    try:
+        response = canvas_request("POST", url, json={"grade_data": grade_data}, idempotent=True)
+        if response.status_code != 200:
+            print(f"❌ Bulk grade update failed: {response.status_code} - {response.text}")
+            return False
+        final = wait_for_progress(response.json())
+        if final and final.get("workflow_state") == "completed":
+            return final
+        print(f"❌ Bulk grade update job did not complete: {final.get('message') if final else 'timed out'}")
+        return False
+    except Exception as e:
+        print(f"❌ Bulk grade update error: {e}")
+        return False
+
+def post_grade_for_student(course_id, assignment_id, user_id, grade):
+    """
+    Posts a single student's grade (used as the fallback when a bulk chunk fails).
+    Returns the updated submission dict (truthy), or False if the update failed.
+    """
+    url = f"/api/v1/courses/{course_id}/assignments/{assignment_id}/submissions/{user_id}"
+    try:
+        response = canvas_request("PUT", url, json={"submission": {"posted_grade": str(grade)}})
+        if response.status_code == 200:
+            print(f"✅ Updated grade for User {user_id} individually.")
+            return response.json()
+        print(f"❌ Failed to update grade for User {user_id}: {response.status_code} - {response.text}")
+    except Exception as e:
+        print(f"❌ Failed to update grade for User {user_id}: {e}")
+    return False
+
+def post_grades_in_chunks(course_id, assignment_id, grade_mapping, max_bytes=GRADE_PAYLOAD_MAX_BYTES,
+                          max_workers=DEFAULT_MAX_WORKERS):
+    """
+    Posts a {user_id: grade} map to an assignment.
+
+    The map is split into payload-size-bounded chunks (chunk_grade_data), the chunks are
+    posted concurrently and each Progress job is polled with backoff. Only the users in
+    chunks that failed are retried one at a time.
+
+    :return: A summary dict {"posted", "chunks", "failed_chunks", "fallback_updated", "failed_users",
+        "completed_at"}, where completed_at is Canvas's time when the last of the grades was
+        applied (a bulk job's completion, or a per-student post's graded_at).
+    """
+    chunks = chunk_grade_data(grade_mapping, max_bytes=max_bytes)
+    summary = {"posted": len(grade_mapping), "chunks": len(chunks), "failed_chunks": 0,
+               "fallback_updated": 0, "failed_users": [], "completed_at": None}
+    if not chunks:
+        return summary
+
+    with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(chunks)))) as executor:
+        results = list(executor.map(lambda chunk: post_grade_chunk(course_id, assignment_id, chunk), chunks))
+
+    retry_users = []
+    for chunk, ok in zip(chunks, results):
+        if not ok:
+            summary["failed_chunks"] += 1
+            retry_users.extend(chunk.keys())
+    summary["completed_at"] = max((ok.get("updated_at") or "" for ok in results if ok), default=None) or None
+
+    if retry_users:
+        print(f"⚠️ {len(retry_users)} grades were not applied in bulk; posting them individually.")
+        user_ids = {str(user_id): user_id for user_id in grade_mapping}
+        with ThreadPoolExecutor(max_workers=max(1, max_workers)) as executor:
+            futures = {
+                user_key: executor.submit(post_grade_for_student, course_id, assignment_id, user_key,
+                                          grade_mapping[user_ids[user_key]])
+                for user_key in retry_users
+            }
+        for user_key, future in futures.items():
+            submission = future.result()
+            if submission:
+                summary["fallback_updated"] += 1
+                graded_at = submission.get("graded_at") or ""
+                summary["completed_at"] = max(summary["completed_at"] or "", graded_at) or None
+            else:
+                summary["failed_users"].append(user_ids[user_key])
+
+    return summary
+
+def chunk_course_grade_data(grades, max_bytes=GRADE_PAYLOAD_MAX_BYTES):
+    """
+    Splits a {(assignment_id, user_id): grade} dict into course-level update_grades
+    "grade_data" dicts ({assignment_id: {user_id: {"posted_grade"}}}) whose JSON encoding
+    stays under max_bytes each.
+    """
+    base_size = len('{"grade_data": {}}')
+    chunks = []
+    current = {}
+    size = base_size
+
+    for (assignment_id, user_id), grade in grades.items():
+        entry = {"posted_grade": str(grade)}
+        user_size = len(json.dumps({str(user_id): entry}))
+        header_size = len(json.dumps({str(assignment_id): {}}))
+        entry_size = user_size + (header_size if str(assignment_id) not in current else 0)
+        if current and size + entry_size > max_bytes:
+            chunks.append(current)
+            current = {}
+            size = base_size
+            entry_size = user_size + header_size # a new chunk always needs the assignment's header
+        current.setdefault(str(assignment_id), {})[str(user_id)] = entry
+        size += entry_size
+
+    if current:
+        chunks.append(current)
+    return chunks
+
+def post_course_grade_chunk(course_id, grade_data):
+    """
+    Posts one course-level grade_data chunk (grades for several assignments) to
+    /courses/:id/submissions/update_grades and waits for its Progress job.
+    Returns True if Canvas reports the job as completed.
+    """
+    url = f"/api/v1/courses/{course_id}/submissions/update_grades"
+    try:
+        response = canvas_request("POST", url, json={"grade_data": grade_data}, idempotent=True)
+        if response.status_code != 200:
+            print(f"❌ Bulk grade update failed: {response.status_code} - {response.text}")
+            return False
+        final = wait_for_progress(response.json())
+        if final and final.get("workflow_state") == "completed":
+            return True
+        print(f"❌ Bulk grade update job did not complete: {final.get('message') if final else 'timed out'}")
+        return False
+    except Exception as e:
+        print(f"❌ Bulk grade update error: {e}")
+        return False
+
+def post_course_grades(course_id, grades, max_bytes=GRADE_PAYLOAD_MAX_BYTES, max_workers=DEFAULT_MAX_WORKERS):
+    """
+    Posts grades for many assignments of one course: {(assignment_id, user_id): grade}.
+    Works like post_grades_in_chunks, but each chunk may span assignments, so a whole
+    course's grades go out in as few requests as the payload limit allows.
+
+    :return: A summary dict {"posted", "chunks", "failed_chunks", "fallback_updated", "failed_users"},
+        where failed_users holds (assignment_id, user_id) pairs.
+    """
+    chunks = chunk_course_grade_data(grades, max_bytes=max_bytes)
+    summary = {"posted": len(grades), "chunks": len(chunks), "failed_chunks": 0,
+               "fallback_updated": 0, "failed_users": []}
+    if not chunks:
+        return summary
+
+    with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(chunks)))) as executor:
+        results = list(executor.map(lambda chunk: post_course_grade_chunk(course_id, chunk), chunks))
+
+    retry = []
+    keys = {(str(assignment_id), str(user_id)): (assignment_id, user_id) for assignment_id, user_id in grades}
+    for chunk, ok in zip(chunks, results):
+        if not ok:
+            summary["failed_chunks"] += 1
+            retry.extend(keys[(assignment_key, user_key)]
+                         for assignment_key, users in chunk.items() for user_key in users)
+
+    if retry:
+        print(f"⚠️ {len(retry)} grades were not applied in bulk; posting them individually.")
+        with ThreadPoolExecutor(max_workers=max(1, max_workers)) as executor:
+            futures = {key: executor.submit(post_grade_for_student, course_id, key[0], key[1], grades[key])
+                       for key in retry}
+        for key, future in futures.items():
+            if future.result():
+                summary["fallback_updated"] += 1
+            else:
+                summary["failed_users"].append(key)
+
+    return summary
+
+def plan_column_writes(column_values, column_entries):
+    """
+    Compares (column_id, user_id, value) targets with the column's current entries
+    ({user_id: entry with .content}) and returns (changes, unchanged), where changes holds
+    (column_id, user_id, current, target) for every value that differs.
+    """
+    changes = []
+    for column_id, user_id, value in column_values:
+        entry = column_entries.get(user_id)
+        current = entry.content if entry is not None else None
+        if current is not None and str(current).strip() == str(value).strip():
+            continue
+        changes.append((column_id, user_id, current, value))
+    return changes, len(column_values) - len(changes)
+
+def grade_matches(submission, label, percent, points_possible):
+    """True if a submission already carries the grade label (or the score it stands for)."""
+    if submission.grade is not None and str(submission.grade).strip() == str(label).strip():
+        return True
+    if submission.score is None or percent is None or not points_possible:
+        return False
+    return abs(submission.score - percent / 100.0 * points_possible) < 1e-6
+
+def plan_grade_writes(targets, points_possible):
+    """
+    targets is [(submission, label, percent)]. Returns (changes, unchanged), where changes
+    holds (user_id, current grade, target label) for every submission whose posted grade
+    differs from its target.
+    """
+    changes = [(submission.user_id, submission.grade, label) for submission, label, percent in targets
+               if not grade_matches(submission, label, percent, points_possible)]
+    return changes, len(targets) - len(changes)
+
+def print_write_plan(what, changes, unchanged, dry_run=False):
+    """Prints a write plan; with dry_run every change is listed as a diff line."""
+    if dry_run:
+        for change in changes:
+            user_id, current, target = change[-3:]
+            print(f"   ~ User {user_id}: {current!r} -> {target!r}")
+    verb = "would change" if dry_run else "to write"
+    print(f"📝 {what}: {len(changes)} {verb}, {unchanged} already up to date.")
+
+#endregion
+
+#region ==================== Grade Mapping Engine ==================== #
+
+MAPPING_RANGE = re.compile(r"^\s*(-?\d+(?:\.\d+)?)\s*-\s*(-?\d+(?:\.\d+)?)\s*$") # "7-8" (inclusive)
+MAPPING_THRESHOLD = re.compile(r"^\s*(?:>=\s*(-?\d+(?:\.\d+)?)|(-?\d+(?:\.\d+)?)\s*\+)\s*$") # ">=9" or "9+"
+MAPPING_SCORE = re.compile(r"^\s*(-?\d+(?:\.\d+)?)\s*$") # "7"
+
+class GradeMapping:
+    """
+    A score-to-percent mapping compiled into a sorted table of score segments.
+
+    Rule keys:
+        "7"     -> scores from 7 up to (not including) 8, so 7.5 maps like 7
+        "7.5"   -> exactly 7.5
+        "6-8"   -> 6 through 8 inclusive
+        ">=9"   -> 9 and above (also written "9+")
+    Values are percents such as "80%" or 80. Where rules overlap, the rule with the highest
+    starting score wins, then the narrower one.
+    """
+
+    def __init__(self, rules):
+        """rules is a list of (low, high, percent, label) with high exclusive."""
+        # Every rule boundary starts a segment; each segment takes the winning rule at its start
+        boundaries = sorted({bound for low, high, _, _ in rules for bound in (low, high) if bound != math.inf})
+        self.starts = array("d")
+        self.percents = array("d")
+        self.labels = []
+        for start in boundaries:
+            covering = [rule for rule in rules if rule[0] <= start < rule[1]]
+            if covering:
+                _, _, percent, label = max(covering, key=lambda rule: (rule[0], -rule[1]))
+            else:
+                percent, label = math.nan, None
+            if self.labels and self.labels[-1] == label:
+                continue # same result as the previous segment; extend it
+            self.starts.append(start)
+            self.percents.append(percent)
+            self.labels.append(label)
+
+    def segment(self, score):
+        """Returns the table index for score, or -1 when no rule covers it."""
+        if score is None:
+            return -1
+        index = bisect_right(self.starts, score) - 1
+        if index < 0 or self.labels[index] is None:
+            return -1
+        return index
+
+    def percent(self, score):
+        """Returns the mapped percent (e.g. 80.0) for one score, or None."""
+        index = self.segment(score)
+        return self.percents[index] if index >= 0 else None
+
+    def label(self, score):
+        """Returns the mapped value as written in the mapping (e.g. "80%"), or None."""
+        index = self.segment(score)
+        return self.labels[index] if index >= 0 else None
+
+    def evaluate(self, scores):
+        """
+        Maps a whole sequence of raw scores in one pass.
+        Returns a list of segment indexes (-1 where unmapped) to use with percents/labels.
+        """
+        starts, labels = self.starts, self.labels
+        indexes = [bisect_right(starts, score) - 1 if score is not None else -1 for score in scores]
+        return [index if index >= 0 and labels[index] is not None else -1 for index in indexes]
+
+    def map_records(self, records, chunk_size=MAPPING_CHUNK_SIZE):
+        """
+        Maps a stream of records that have a .score (e.g. QuizSubmissionRecords) chunk_size
+        at a time, yielding (record, segment index) pairs, so only one chunk is held in memory.
+        """
+        records = iter(records)
+        while True:
+            chunk = list(itertools.islice(records, chunk_size))
+            if not chunk:
+                return
+            yield from zip(chunk, self.evaluate(record.score for record in chunk))
+
+    def evaluate_percents(self, scores):
+        """Returns the mapped percent for every score in scores (None where unmapped)."""
+        return [self.percents[index] if index >= 0 else None for index in self.evaluate(scores)]
+
+    def evaluate_labels(self, scores):
+        """Returns the mapped value for every score in scores (None where unmapped)."""
+        return [self.labels[index] if index >= 0 else None for index in self.evaluate(scores)]
+
+def parse_mapping_rule(key, value):
+    """Turns one mapping entry into a (low, high, percent, label) rule. Raises ValueError if malformed."""
+    key = str(key)
+    try:
+        percent = float(str(value).strip().rstrip("%"))
+    except ValueError:
+        raise ValueError(f"Mapping value {value!r} for {key!r} is not a percent.")
+    label = value if isinstance(value, str) else f"{value:g}%"
+
+    match = MAPPING_RANGE.match(key)
+    if match:
+        low, high = float(match.group(1)), float(match.group(2))
+        if high < low:
+            raise ValueError(f"Mapping range {key!r} ends before it starts.")
+        return low, math.nextafter(high, math.inf), percent, label
+    match = MAPPING_THRESHOLD.match(key)
+    if match:
+        return float(match.group(1) or match.group(2)), math.inf, percent, label
+    match = MAPPING_SCORE.match(key)
+    if match:
+        score = float(match.group(1))
+        high = score + 1 if score.is_integer() else math.nextafter(score, math.inf)
+        return score, high, percent, label
+    raise ValueError(f"Unrecognised mapping rule {key!r}.")
+
+def compile_grade_mapping(mapping_data, key=MAPPING_KEY):
+    """
+    Compiles mapping_data (as stored in the quiz description) into a GradeMapping.
+    Accepts the full {"quiz_4_mapping_data": {...}} dict, the inner rule dict, or an
+    already compiled GradeMapping. Returns None when there are no rules.
+    """
+    if isinstance(mapping_data, GradeMapping):
+        return mapping_data
+    rules = (mapping_data or {}).get(key, mapping_data)
+    if not rules or any(isinstance(value, dict) for value in rules.values()):
+        return None # empty, or a wrapper that holds some other key
+    return GradeMapping([parse_mapping_rule(rule_key, value) for rule_key, value in rules.items()])
+
+def map_quiz_scores(course_id, quiz_id, grade_mapping, user_ids=None):
+    """
+    Streams a quiz's submissions and maps their raw scores (points correct) with grade_mapping.
+    Raw scores are read from the quiz submissions because posting a mapped grade rewrites
+    the assignment's score, so mapping that again would map the grade twice.
+
+    Returns {user_id: (raw score, segment index)} for every scored submission (segment -1
+    where no rule covers the score), optionally only for the users in user_ids. A student's
+    latest scored attempt wins.
+    """
+    scores = {}
+    if user_ids is not None and not user_ids:
+        return scores # nobody to map; skip listing the submissions
+    for submission, segment in grade_mapping.map_records(iter_quiz_submissions(course_id, quiz_id)):
+        if submission.score is not None and (user_ids is None or submission.user_id in user_ids):
+            scores[submission.user_id] = (submission.score, segment)
+    return scores
+
+#endregion
+
 #region ==================== Quiz Grade Mapping Functions ==================== #
 
+MAPPING_BLOCK_PATTERN = re.compile(r"<div(?:\s+style=['\"][^'\"]*['\"])?>.*?MAPPING_DATA_END\s*</div>",
+                                   re.DOTALL | re.IGNORECASE)
+MAPPING_DATA_PATTERN = re.compile(r"MAPPING_DATA_START\s*(.*?)\s*MAPPING_DATA_END", re.DOTALL | re.IGNORECASE)
+
+class MappingStore:
+    """
+    Parsed quiz mappings keyed by (instance URL, quiz id), each stored with the quiz's
+    updated_at and a hash of its description. A mapping is reused as long as updated_at is
+    unchanged; if updated_at moved but the description hash is the same, the parse is still
+    reused. With a path, entries are also kept in a JSON file between runs. Callers get
+    copies of the cached mappings, so changing one does not change the cache.
+    """
+
+    def __init__(self, path=None):
+        self.fixed_path = path # None: use MAPPING_CACHE_FILE as it is when the cache is used
+        self.entries = {} # key -> {"updated_at", "hash", "mapping"}
+        self.lock = threading.Lock()
+        self.loaded_path = None
+        self.loaded = False
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def path(self):
+        return self.fixed_path if self.fixed_path is not None else MAPPING_CACHE_FILE
+
+    @path.setter
+    def path(self, path):
+        self.fixed_path = path
+
+    def key(self, quiz_id):
+        return f"{API_URL}|{quiz_id}"
+
+    def load(self):
+        """Reads the disk cache the first time it is needed (and again if the path changes)."""
+        path = self.path
+        if self.loaded and self.loaded_path == path:
+            return
+        self.loaded, self.loaded_path = True, path
+        if not path:
+            return
+        try:
+            with open(path, "r") as file:
+                self.entries.update(json.load(file))
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            print(f"⚠️ Ignoring unreadable mapping cache {path}: {e}")
+
+    def save(self):
+        if not self.path:
+            return
+        with open(self.path, "w") as file:
+            json.dump(self.entries, file)
+
+    def resolve(self, quiz_id, updated_at, description, persist=True):
+        """
+        Returns the mapping data for a quiz given its updated_at and description, parsing
+        the description only when neither matches the cached entry. Returns None if the
+        description has no mapping block.
+        """
+        key = self.key(quiz_id)
+        with self.lock:
+            self.load()
+            entry = self.entries.get(key)
+            if entry and updated_at and entry["updated_at"] == updated_at:
+                self.hits += 1
+                return copy.deepcopy(entry["mapping"])
+
+        description_hash = hashlib.sha1((description or "").encode("utf-8")).hexdigest()
+        reused = bool(entry and entry["hash"] == description_hash)
+        mapping_data = entry["mapping"] if reused else extract_mapping_from_description(description or "")
+        with self.lock:
+            if reused:
+                self.hits += 1
+            else:
+                self.misses += 1
+        self.store(quiz_id, updated_at, description_hash, mapping_data, persist=persist)
+        return copy.deepcopy(mapping_data)
+
+    def store(self, quiz_id, updated_at, description_hash, mapping_data, persist=True):
+        with self.lock:
+            self.load()
+            self.entries[self.key(quiz_id)] = {"updated_at": updated_at, "hash": description_hash,
+                                               "mapping": copy.deepcopy(mapping_data)}
+            if persist:
+                self.save()
+
+    def invalidate(self, quiz_id=None):
+        with self.lock:
+            self.load()
+            if quiz_id is None:
+                self.entries.clear()
+            else:
+                self.entries.pop(self.key(quiz_id), None)
+            self.save()
+
+    def stats(self):
+        with self.lock:
+            return {"size": len(self.entries), "hits": self.hits, "misses": self.misses}
+
+mapping_store = MappingStore() # follows MAPPING_CACHE_FILE
+
 def remove_existing_mapping_data(description):
     """
     Removes any existing mapping data block from the quiz description.
     Assumes the block is enclosed in a div
     and contains the markers MAPPING_DATA_START and MAPPING_DATA_END.
     """
-    pattern = r"<div(?:\s+style=['\"][^'\"]*['\"])?>.*?MAPPING_DATA_END\s*</div>"
-    cleaned = re.sub(pattern, "", description, flags=re.DOTALL | re.IGNORECASE)
+    if "mapping_data_end" not in description.lower():
+        return description.strip() # nothing to remove; skip the regex scan
+    cleaned = MAPPING_BLOCK_PATTERN.sub("", description)
     return cleaned.strip()
 
 def append_mapping_to_quiz_description(course_id, quiz_id, mapping_data):
@@ -655,8 +3062,7 @@ def append_mapping_to_quiz_description(course_id, quiz_id, mapping_data):
     Before appending, it removes any existing mapping block.
     """
     try:
-        course_obj = canvas.get_course(course_id)
-        quiz_obj = course_obj.get_quiz(quiz_id)
+        quiz_obj = get_cached_quiz(course_id, quiz_id)
 
         # Remove any existing mapping data
         current_description = remove_existing_mapping_data(quiz_obj.description or "")
@@ -677,6 +3083,10 @@ def append_mapping_to_quiz_description(course_id, quiz_id, mapping_data):
         new_description = current_description + new_block
 
         updated_quiz = quiz_obj.edit(quiz={"description": new_description})
+        invalidate_cached_object("quiz", quiz_id)
+        # The new mapping is already known; record it against the edited quiz so it is not re-parsed
+        mapping_store.store(quiz_id, getattr(updated_quiz, "updated_at", None),
+                            hashlib.sha1(new_description.encode("utf-8")).hexdigest(), mapping_data)
         print("Quiz description updated with new mapping data.")
         return updated_quiz
 
@@ -688,8 +3098,7 @@ def extract_mapping_from_description(description):
     """
     Extracts mapping data from a quiz description that contains the plain text markers.
     """
-    pattern = r"MAPPING_DATA_START\s*(.*?)\s*MAPPING_DATA_END"
-    match = re.search(pattern, description, re.DOTALL | re.IGNORECASE)
+    match = MAPPING_DATA_PATTERN.search(description)
     if match:
         mapping_json = match.group(1).strip()
         try:
@@ -705,14 +3114,11 @@ def extract_mapping_from_description(description):
 def get_quiz_mapping(course_id, quiz_id):
     """
     Retrieves the quiz description and extracts the mapping data.
+    The parsed mapping is cached in mapping_store until the quiz's updated_at changes.
     """
     try:
-        course_obj = canvas.get_course(course_id)
-        quiz_obj = course_obj.get_quiz(quiz_id)
-        description = quiz_obj.description or ""
-        print("Full quiz description:")
-        print(description)
-        mapping_data = extract_mapping_from_description(description)
+        quiz_obj = get_cached_quiz(course_id, quiz_id)
+        mapping_data = mapping_store.resolve(quiz_id, getattr(quiz_obj, "updated_at", None), quiz_obj.description)
         if mapping_data:
             print(f"✅ Retrieved mapping data: {mapping_data}")
         else:
@@ -722,6 +3128,33 @@ def get_quiz_mapping(course_id, quiz_id):
         print(f"Error retrieving quiz mapping: {e}")
         return None
 
+def resolve_quiz_mappings(course_id, quiz_ids=None, quizzes=None):
+    """
+    Resolves the mapping data of many quizzes from one paginated listing of the course's
+    quizzes, instead of fetching each quiz. Only descriptions that changed since they were
+    last parsed are parsed again. Returns {quiz_id: mapping_data or None}.
+
+    :param quiz_ids: Optional quiz IDs to resolve; by default every quiz in the course.
+    :param quizzes: Quiz dicts the caller has already listed; used instead of listing again.
+    """
+    wanted = {int(quiz_id) for quiz_id in quiz_ids} if quiz_ids else None
+    mappings = {}
+    misses_before = mapping_store.stats()["misses"]
+    if quizzes is None:
+        quizzes = iter_paginated(f"/api/v1/courses/{course_id}/quizzes")
+    for quiz in quizzes:
+        if wanted is not None and quiz["id"] not in wanted:
+            continue
+        mappings[quiz["id"]] = mapping_store.resolve(quiz["id"], quiz.get("updated_at"), quiz.get("description"),
+                                                     persist=False)
+    with mapping_store.lock:
+        mapping_store.save()
+
+    parsed = mapping_store.stats()["misses"] - misses_before
+    found = sum(1 for mapping_data in mappings.values() if mapping_data)
+    print(f"✅ Resolved mappings for {len(mappings)} quizzes ({found} with mapping data, {parsed} parsed).")
+    return mappings
+
 def update_all_submission_grades(course_id, quiz_id, mapping_data):
     """
     For a given quiz, update every student's submission grade based on the custom mapping.
@@ -742,60 +3175,47 @@ def update_all_submission_grades(course_id, quiz_id, mapping_data):
     The function:
       1. Retrieves the quiz object.
       2. Gets all quiz submissions.
-      3. For each submission:
-           - Reads the raw score (the number of points the student got correct).
-           - Converts that score to a string to look it up in the mapping.
-           - If a mapping exists for that raw score, converts the percentage string to a float.
-           - Computes the new score as (mapped_percentage / 100) * points_possible.
-           - Updates the submission using canvasapi’s update_score_and_comments().
+      3. Maps the raw scores (the number of points the student got correct) to percentages
+         with the compiled GradeMapping, a chunk of submissions at a time.
+      4. For each mapped submission, computes the new score as (mapped_percentage / 100) *
+         points_possible and updates the submission's score.
     """
     try:
-        course_obj = canvas.get_course(course_id)
-        quiz_obj = course_obj.get_quiz(quiz_id)
-        submissions = quiz_obj.get_submissions()  # PaginatedList of QuizSubmission objects
-
-        # Extract the mapping data; here we assume it's stored under the key "quiz_4_mapping_data"
-        mapping = mapping_data.get("quiz_4_mapping_data")
-        if not mapping:
-            print("No mapping found under key 'quiz_4_mapping_data'.")
+        quiz_obj = get_cached_quiz(course_id, quiz_id)
+        submissions = iter_quiz_submissions(course_id, quiz_id)  # QuizSubmissionRecords
+
+        grade_mapping = compile_grade_mapping(mapping_data)
+        if not grade_mapping:
+            print(f"No mapping found under key '{MAPPING_KEY}'.")
             return
 
-        for submission in submissions:
-            # Retrieve the raw score (number of points correct)
-            raw_score = submission.score
-            if raw_score is None:
-                print(f"Submission {submission.id} has no raw score; skipping.")
-                continue
+        # Get total points for the quiz; note the correct attribute is points_possible
+        points_possible = quiz_obj.points_possible
 
-            # Convert the raw score to an integer string key (e.g., 5 -> "5")
-            raw_score_str = str(int(raw_score))
-            if raw_score_str not in mapping:
+        for submission, segment in grade_mapping.map_records(submissions):
+            raw_score_str = f"{submission.score:g}" if submission.score is not None else None
+            if segment < 0:
                 print(f"No mapping rule found for raw score '{raw_score_str}' in submission {submission.id}; skipping.")
                 continue
+            mapped_percent = grade_mapping.percents[segment]
 
-            mapped_percent_str = mapping[raw_score_str]
-            try:
-                mapped_percent = float(mapped_percent_str.strip("%"))
-            except Exception as e:
-                print(f"Error converting mapped percentage for submission {submission.id}: {e}")
-                continue
-
-            # Get total points for the quiz; note the correct attribute is points_possible
-            points_possible = quiz_obj.points_possible
             new_score = (mapped_percent / 100.0) * points_possible
 
             try:
-                # Update the submission using canvasapi's update_score_and_comments
-                updated_submission = submission.update_score_and_comments(score=new_score)
+                # Same request canvasapi's update_score_and_comments(score=...) sends
+                url = f"/api/v1/courses/{course_id}/quizzes/{quiz_id}/submissions/{submission.id}"
+                response = canvas_request("PUT", url, data={"score": new_score})
+                response.raise_for_status()
                 print(
                     f"✅ Updated submission {submission.id}: raw score {raw_score_str} -> new score {new_score} ({mapped_percent}%)")
             except Exception as e:
                 print(f"❌ Failed to update submission {submission.id}: {e}")
     except Exception as e:
         print(f"Failed to update all submission grades: {e}")
-def get_or_create_custom_grade_column(course_obj, title="Mapped Percent"):
+def get_or_create_custom_grade_column(course_obj, title="Mapped Percent", create=True):
     """
-    Retrieves a custom gradebook column by title. If it doesn't exist, creates it.
+    Retrieves a custom gradebook column by title. If it doesn't exist, creates it
+    (or, with create=False, returns None).
     Returns a GradebookColumn object.
     """
     print(f"🔍 DEBUG: get_or_create_custom_grade_column() called for '{title}'")
@@ -812,6 +3232,9 @@ def get_or_create_custom_grade_column(course_obj, title="Mapped Percent"):
         return None
 
     # If not found, create a new one:
+    if not create:
+        print(f"ℹ️ Custom grade column '{title}' does not exist yet.")
+        return None
     try:
         print(f"⚠️ Creating new grade column '{title}'...")
         new_col = course_obj.create_custom_column(
@@ -823,7 +3246,7 @@ def get_or_create_custom_grade_column(course_obj, title="Mapped Percent"):
         print(f"❌ Error creating custom grade column: {e}")
         return None
 
-def update_all_submission_custom_grades(course_id, quiz_id, mapping_data):
+def update_all_submission_custom_grades(course_id, quiz_id, mapping_data, chunk_size=BULK_CHUNK_SIZE):
     """
     For a given quiz, updates a custom gradebook column (e.g. 'Mapped Percent')
     for every student based on the mapping_data.
@@ -840,17 +3263,16 @@ def update_all_submission_custom_grades(course_id, quiz_id, mapping_data):
           "10": "100%"
        }
     }
-    The raw score (converted to string) is used as a key.
+    The mapping is compiled once (see GradeMapping) and applied to the streamed raw scores a
+    chunk at a time. All values are written with bulk_update_column_data, chunk_size entries per request.
     """
     try:
-        course_obj = canvas.get_course(course_id)
-        quiz_obj = course_obj.get_quiz(quiz_id)
-        submissions = quiz_obj.get_submissions()  # returns a PaginatedList of QuizSubmission objects
-
-        # Assume the mapping data is stored under a key such as "quiz_4_mapping_data"
-        mapping = mapping_data.get("quiz_4_mapping_data")
-        if not mapping:
-            print("No mapping found under key 'quiz_4_mapping_data'.")
+        course_obj = get_cached_course(course_id)
+        submissions = iter_quiz_submissions(course_id, quiz_id)  # QuizSubmissionRecords
+
+        grade_mapping = compile_grade_mapping(mapping_data)
+        if not grade_mapping:
+            print(f"No mapping found under key '{MAPPING_KEY}'.")
             return
 
         # Get (or create) the custom grade column for mapped percent scores
@@ -859,27 +3281,27 @@ def update_all_submission_custom_grades(course_id, quiz_id, mapping_data):
             print("Could not get or create custom grade column.")
             return
 
-        for submission in submissions:
-            # submission.score is the raw score (points correct)
-            raw_score = submission.score
-            if raw_score is None:
+        # submission.score is the raw score (points correct)
+        column_values = []
+        for submission, segment in grade_mapping.map_records(submissions):
+            if submission.score is None:
                 print(f"Submission {submission.id} has no raw score; skipping.")
                 continue
 
-            raw_score_str = str(int(raw_score))
-            if raw_score_str not in mapping:
+            raw_score_str = f"{submission.score:g}"
+            if segment < 0:
                 print(f"No mapping rule found for raw score '{raw_score_str}' in submission {submission.id}; skipping.")
                 continue
+            mapped_percent = grade_mapping.labels[segment]
 
-            mapped_percent = mapping[raw_score_str]
-            # Here, you might choose to store the mapped percent as a string or convert it to a number.
-            # We update the custom grade column for this student.
-            try:
-                # update_column_data expects a string for the column_data
-                updated = custom_column.update_column_data(column_data=mapped_percent, user_id=submission.user_id)
-                print(f"✅ Updated submission for Student {submission.user_id}: raw score {raw_score_str} -> mapped {mapped_percent}")
-            except Exception as e:
-                print(f"❌ Failed to update submission {submission.id} for Student {submission.user_id}: {e}")
+            # The column stores the mapped percent as a string (e.g. "80%")
+            column_values.append((custom_column.id, submission.user_id, mapped_percent))
+            print(f"🎯 Student {submission.user_id}: raw score {raw_score_str} -> mapped {mapped_percent}")
+
+        summary = bulk_update_column_data(course_id, column_values, chunk_size=chunk_size)
+        print(f"✅ Updated {summary['sent'] - len(summary['failed_users'])}/{summary['sent']} column entries "
+              f"in {summary['chunks']} bulk requests.")
+        return summary
     except Exception as e:
         print(f"Failed to update all submission grades: {e}")
 
@@ -891,7 +3313,7 @@ def get_custom_gradebook_columns(course):
     Retrieve custom gradebook columns for a course using the Canvas instance's _requester.
     """
     url = f"/api/v1/courses/{course.id}/custom_gradebook_columns"
-    response = canvas.get_course(course.id).get_custom_gradebook_columns()
+    response = get_cached_course(course.id).get_custom_gradebook_columns()
 
     if response.status_code == 200:
         columns = response.json().get("custom_gradebook_columns", [])
@@ -928,10 +3350,8 @@ def delete_custom_column_raw(course_id, column_id):
     :param course_id: Canvas course ID
     :param column_id: ID of the custom gradebook column to delete
     """
-    url = f"{API_URL}/api/v1/courses/{course_id}/custom_gradebook_columns/{column_id}"
-    headers = {"Authorization": f"Bearer {TOKEN}"}
-
-    response = requests.delete(url, headers=headers)
+    url = f"/api/v1/courses/{course_id}/custom_gradebook_columns/{column_id}"
+    response = canvas_request("DELETE", url)
 
     if response.status_code == 200:
         print(f"✅ Successfully deleted custom column {column_id} via raw API.")
@@ -947,7 +3367,7 @@ def delete_custom_column(course_id, column_id):
     :param column_id: ID of the custom gradebook column to delete
     """
     try:
-        course = canvas.get_course(course_id)
+        course = get_cached_course(course_id)
         column = course.get_custom_column(column_id)
         column.delete()
         print(f"✅ Successfully deleted custom column {column_id} in course {course_id}.")
@@ -956,164 +3376,477 @@ def delete_custom_column(course_id, column_id):
 
 
 # Example Usage:
-delete_custom_column(course_id=1234, column_id=5678)
+# delete_custom_column(course_id=1234, column_id=5678)
 
 
-def update_gradebook_column_for_quiz(course_id, quiz_id, mapping_data):
+def update_gradebook_column_for_quiz(course_id, quiz_id, mapping_data, chunk_size=BULK_CHUNK_SIZE,
+                                     incremental=False, dry_run=False):
     """
     Updates a custom gradebook column for a quiz and assigns student grades.
+    The mapped values are written with bulk_update_column_data, chunk_size entries per request.
+
+    With incremental=True only the students whose quiz assignment was submitted or graded
+    since the last run (the watermark kept in the state store) are updated; the first
+    incremental run, or incremental=False, rescans every submission. The changed assignment
+    submissions only pick the students: their raw scores always come from the quiz
+    submissions (see map_quiz_scores), so grades posted by update_quiz_grades are never mapped.
+
+    Values already in the column are not sent again. With dry_run=True nothing is written
+    (not even a missing column); the planned changes are printed and returned as
+    {"dry_run", "changes", "unchanged", "create_column"}, where create_column is the title
+    of the column that would be created, or None.
     """
     try:
         print(f"🔍 DEBUG: update_gradebook_column_for_quiz() called for quiz {quiz_id}")
 
-        course_obj = canvas.get_course(course_id)
-        quiz_obj = course_obj.get_quiz(quiz_id)
+        course_obj = get_cached_course(course_id)
+        quiz_obj = get_cached_quiz(course_id, quiz_id)
 
         column_title = f"{quiz_obj.title} %"
         print(f"🔍 Looking for column: {column_title}")
 
-        # Get or create the custom gradebook column
-        custom_column = get_or_create_custom_grade_column(course_obj, title=column_title)
+        # Get or create the custom gradebook column (a dry run only looks it up)
+        custom_column = get_or_create_custom_grade_column(course_obj, title=column_title, create=not dry_run)
 
-        if not custom_column:
+        if not custom_column and not dry_run:
             print("❌ Could not get or create custom gradebook column.")
             return
+        column_id = custom_column.id if custom_column else None
+
+        store = get_state_store()
+        run_started = watermark_start()
+        watermark = store.get_watermark("column", quiz_id) if incremental else None
+
+        if watermark:
+            # Only the students whose assignment submission changed since the last run; grades
+            # posted by update_quiz_grades are not new activity for the column
+            posted = store.get_watermark("grades", quiz_obj.assignment_id) or {}
+            changed_users = {submission.user_id for submission in
+                             iter_changed_submissions(course_id, quiz_obj.assignment_id, watermark,
+                                                      ignore_graded_until=posted.get("graded_at"))}
+        else:
+            changed_users = None
 
-        # Get all quiz submissions
-        submissions = quiz_obj.get_submissions()
-        print(f"✅ Found {len(list(submissions))} submissions for quiz {quiz_id}")
-
-        # Load the mapping data for grade conversion
-        mapping = mapping_data.get("quiz_4_mapping_data")
-        if not mapping:
-            print("❌ No mapping found under key 'quiz_4_mapping_data'.")
+        # Compile the mapping data for grade conversion
+        grade_mapping = compile_grade_mapping(mapping_data)
+        if not grade_mapping:
+            print(f"❌ No mapping found under key '{MAPPING_KEY}'.")
             return
 
-        # Retrieve existing column entries
-        column_entries = {entry.user_id: entry for entry in custom_column.get_column_entries()}
-
-        # Debug: Check if users are enrolled
-        enrollments = course_obj.get_enrollments()
-        enrolled_users = {e.user_id for e in enrollments}
-
-        # Update each student's grade
-        for submission in submissions:
-            user_id = submission.user_id
-            if user_id not in enrolled_users:
+        if watermark:
+            # students/submissions only returns enrolled students, so the roster is not needed
+            column_entries = {}
+            enrolled_users = None
+        else:
+            # Retrieve existing column entries (a column a dry run would create has none)
+            column_entries = ({entry.user_id: entry for entry in iter_column_entries(course_id, column_id)}
+                              if custom_column else {})
+
+            # Debug: Check if users are enrolled
+            enrolled_users = {e.user_id for e in iter_enrollments(course_id)}
+
+        # Map the students' raw quiz scores, then collect each student's grade and write them in bulk
+        scores = map_quiz_scores(course_id, quiz_id, grade_mapping, user_ids=changed_users)
+        since = f" changed since {watermark['submitted_at']}" if watermark else ""
+        print(f"✅ Found {len(scores)} scored submissions for quiz {quiz_id}{since}")
+        column_values = []
+        for user_id, (raw_score, segment) in scores.items():
+            if enrolled_users is not None and user_id not in enrolled_users:
                 print(f"⚠️ Skipping user {user_id}: Not enrolled in the course.")
                 continue
 
-            raw_score = submission.score
-            if raw_score is None:
-                print(f"⚠️ Submission {submission.id} has no raw score; skipping.")
-                continue
-
-            raw_score_str = str(int(raw_score))
-            if raw_score_str not in mapping:
-                print(f"⚠️ No mapping rule found for raw score '{raw_score_str}' in submission {submission.id}; skipping.")
+            if segment < 0:
+                print(f"⚠️ No mapping rule found for raw score '{raw_score:g}' of user {user_id}; skipping.")
                 continue
 
-            new_value = mapping[raw_score_str]  # e.g., "80%"
-            time.sleep(1)  # Wait 1 second between requests
-            try:
-                # ✅ Manually update the gradebook column using direct API request
-                url = f"{API_URL}/api/v1/courses/{course_id}/custom_gradebook_columns/{custom_column.id}/data/{user_id}"
-                headers = {
-                    "Authorization": f"Bearer {TOKEN}",
-                    "Content-Type": "application/json"
-                }
-                payload = {"column_data": str(new_value)}
-
-                response = requests.put(url, headers=headers, json=payload)
-                time.sleep(1)  # Wait 1 second between requests
-
-                if response.status_code == 200:
-                    print(f"✅ Successfully updated column for user {user_id} (submission {submission.id}) to '{new_value}'")
-                else:
-                    print(f"❌ Failed to update column for user {user_id}: {response.status_code} - {response.text}")
-
-            except Exception as e:
-                print(f"❌ Failed to update column for submission {submission.id}: {e}")
+            column_values.append((column_id, user_id, grade_mapping.labels[segment]))  # e.g., "80%"
+
+        # Only send the values that differ from what the column already holds
+        changes, unchanged = plan_column_writes(column_values, column_entries)
+        print_write_plan(f"Column '{column_title}'", changes, unchanged, dry_run=dry_run)
+        if dry_run:
+            create_column = None if custom_column else column_title
+            if create_column:
+                print(f"📝 Would create column '{create_column}'.")
+            return {"dry_run": True, "changes": changes, "unchanged": unchanged, "create_column": create_column}
+
+        summary = bulk_update_column_data(course_id, [(column_id, user_id, value)
+                                                      for column_id, user_id, _, value in changes],
+                                          chunk_size=chunk_size)
+        summary["unchanged"] = unchanged
+        for user_id in summary["failed_users"]:
+            print(f"❌ Failed to update column for user {user_id}")
+        print(f"✅ Updated {summary['sent'] - len(summary['failed_users'])}/{summary['sent']} entries in column "
+              f"'{column_title}' using {summary['chunks']} bulk requests.")
+        if not summary["failed_users"]:
+            store.set_watermark("column", quiz_id, run_started, run_started)
+
+        report_throttle()
+        return summary
 
     except Exception as e:
         print(f"❌ Failed to update gradebook column for quiz {quiz_id}: {e}")
 
 
-def update_quiz_grades(course_id, quiz_id, mapping_data):
+def update_quiz_grades(course_id, quiz_id, mapping_data, max_workers=DEFAULT_MAX_WORKERS, incremental=False,
+                       dry_run=False, source=None):
     """
     Updates students' overall quiz grades using the mapped raw scores.
+    quiz_id is the quiz's assignment ID. The raw scores are read from the quiz's own
+    submissions (see map_quiz_scores), never from the assignment score this function posts.
+    Grades are posted with post_grades_in_chunks; students are only updated one at a
+    time if their bulk chunk fails. Returns the posting summary.
+
+    With incremental=True only submissions submitted or graded since the last run (the
+    watermark kept in the state store) are fetched; the first incremental run, or
+    incremental=False, rescans every submission. The graded watermark moves up to
+    WATERMARK_OVERLAP before the time Canvas reports the last grade posted here was applied,
+    so a grade someone else makes during the run is still read by the next run; the grades
+    posted here that are read back again match their mapped grade and count as unchanged.
+
+    Students whose posted grade (or score) already matches the mapped grade are skipped, so
+    a second run posts nothing. With dry_run=True nothing is posted; the planned changes are
+    printed and returned as {"dry_run", "changes", "unchanged"}. source ("rest" or "graphql")
+    picks how a full scan reads the posted grades (default SUBMISSIONS_SOURCE).
     """
-    # Extract actual quiz score-to-percentage mapping
-    score_mapping = mapping_data.get("quiz_4_mapping_data", {})
+    # Compile the quiz score-to-percentage mapping
+    score_mapping = compile_grade_mapping(mapping_data)
+    if not score_mapping:
+        print(f"❌ No mapping found under key '{MAPPING_KEY}'.")
+        return
 
-    # Initialize CanvasAPI course and assignment objects
-    course = canvas.get_course(course_id)
-    assignment = course.get_assignment(quiz_id)
+    store = get_state_store()
+    run_started = watermark_start()
+    watermark = store.get_watermark("grades", quiz_id) if incremental else None
 
-    # Retrieve all submissions
-    submissions = assignment.get_submissions()
-    print(f"✅ Found {len(list(submissions))} submissions for quiz {quiz_id}")
+    assignment = get_cached_assignment(course_id, quiz_id)
+    points_possible = assignment.points_possible
+    raw_quiz_id = getattr(assignment, "quiz_id", None)
+    if not raw_quiz_id:
+        print(f"❌ Assignment {quiz_id} is not a quiz, so it has no raw scores to map.")
+        return
 
-    # Prepare grade mapping dictionary
-    grade_mapping = {}
+    # The grades posted now: {user_id: SubmissionRecord} for the roster, or for the students
+    # whose submission changed since the watermark
+    if watermark:
+        submissions = iter_changed_submissions(course_id, quiz_id, watermark)
+    else:
+        submissions = iter_assignment_submissions(course_id, quiz_id, source=source)
+    posted = {submission.user_id: submission for submission in submissions}
+    since = f" changed since {watermark['submitted_at']}" if watermark else ""
+    print(f"✅ Found {len(posted)} submissions for quiz {quiz_id}{since}")
+
+    # Map their raw quiz scores and collect the students whose posted grade differs
+    changes, unchanged = [], 0
+    for user_id, (raw_score, segment) in map_quiz_scores(course_id, raw_quiz_id, score_mapping,
+                                                         user_ids=posted).items():
+        if segment < 0:
+            print(f"⚠️ No mapping found for User {user_id} with raw score {raw_score}")
+            continue
+        mapped_grade = score_mapping.labels[segment]
+        print(f"🎯 User {user_id} - Raw Score: {raw_score} → Mapped Grade: {mapped_grade}")
+        if grade_matches(posted[user_id], mapped_grade, score_mapping.percents[segment], points_possible):
+            unchanged += 1
+        else:
+            changes.append((user_id, posted[user_id].grade, mapped_grade))
 
-    for submission in submissions:
-        raw_score = submission.score  # The student's raw quiz score
-        user_id = submission.user_id  # The student's user ID
+    # Only post the grades that differ from what Canvas already has
+    print_write_plan(f"Grades for quiz {quiz_id}", changes, unchanged, dry_run=dry_run)
+    if dry_run:
+        return {"dry_run": True, "changes": changes, "unchanged": unchanged}
+    grade_mapping = {user_id: grade for user_id, _, grade in changes}
 
-        # Convert raw score to string (since keys in mapping are strings)
-        raw_score_str = str(int(raw_score)) if raw_score is not None else None
+    # Post the mapped grades in bulk; this returns once any per-student fallback PUTs are done too
+    summary = post_grades_in_chunks(course_id, quiz_id, grade_mapping, max_workers=max_workers)
+    summary["unchanged"] = unchanged
+    if summary["failed_users"]:
+        print(f"❌ Could not update grades for users: {summary['failed_users']}")
+    print(f"✅ Updated {summary['posted'] - len(summary['failed_users'])}/{summary['posted']} grades for quiz "
+          f"{quiz_id} in {summary['chunks']} bulk requests ({summary['fallback_updated']} individually).")
+    if not summary["failed_users"]:
+        # Bounded by Canvas's own clock, less the overlap, never by the local time the posts returned
+        graded_until = watermark_before(summary["completed_at"]) if summary["completed_at"] else run_started
+        store.set_watermark("grades", quiz_id, run_started, graded_until)
+    return summary
 
-        # Map raw score to percentage, if available
-        if raw_score_str in score_mapping:
-            grade_mapping[user_id] = score_mapping[raw_score_str]
-            print(f"🎯 User {user_id} - Raw Score: {raw_score} → Mapped Grade: {score_mapping[raw_score_str]}")
-        else:
-            print(f"⚠️ No mapping found for User {user_id} with raw score {raw_score}")
 
-    # **Raw API Call to Update Grades**
-    url = f"{API_URL}/api/v1/courses/{course_id}/assignments/{quiz_id}/submissions/update_grades"
-    headers = {"Authorization": f"Bearer {TOKEN}", "Content-Type": "application/json"}
 
-    payload = {
-        "grade_data": {
-            str(user_id): {"posted_grade": str(grade)}
-            for user_id, grade in grade_mapping.items()
-        }
-    }
 
-    try:
-        response = requests.post(url, headers=headers, json=payload)
 
-        if response.status_code == 200:
-            print(f"✅ Successfully updated grades for quiz {quiz_id} via raw API.")
-        else:
-            print(f"❌ Raw API update failed: {response.status_code} - {response.text}")
 
-    except Exception as e:
-        print(f"❌ Raw API request error: {e}")
 
-    # **CanvasAPI Method to Update Individual Submissions (if needed)**
-    try:
-        for user_id, grade in grade_mapping.items():
-            submission = assignment.get_submission(user_id)
-            submission.edit(submission={"posted_grade": str(grade)})
-            print(f"✅ Updated grade for User {user_id} via CanvasAPI.")
 
-    except Exception as e:
-        print(f"❌ CanvasAPI update error: {e}")
 
 
 
 
 
+#region ==================== Course Grade Sync ==================== #
+
+def get_or_create_quiz_columns(course_id, titles, create=True):
+    """
+    Returns {title: column_id} for the given custom column titles, listing the course's
+    columns once and creating only the missing ones (with create=False, missing titles
+    are left out).
+    """
+    columns = {column["title"]: column["id"]
+               for column in iter_paginated(f"/api/v1/courses/{course_id}/custom_gradebook_columns")}
+    for title in titles:
+        if title in columns or not create:
+            continue
+        response = canvas_request("POST", f"/api/v1/courses/{course_id}/custom_gradebook_columns",
+                                  json={"column": {"title": title, "hidden": False,
+                                                   "description": "Mapped percent grades"}})
+        if response.status_code == 200:
+            columns[title] = response.json()["id"]
+            print(f"✅ Created custom grade column '{title}' (ID: {columns[title]})")
+        else:
+            print(f"❌ Error creating custom grade column '{title}': {response.status_code} - {response.text}")
+    return {title: columns[title] for title in titles if title in columns}
+
+def sync_course_grades(course_id, quiz_ids=None, update_columns=True, update_grades=True,
+                       chunk_size=BULK_CHUNK_SIZE, max_workers=DEFAULT_MAX_WORKERS, dry_run=False, source=None):
+    """
+    Maps and writes the grades of every quiz in a course (or just quiz_ids) in one pass.
+
+      1. One paginated listing of the course's quizzes gives each quiz's assignment and the
+         mapping stored in its description (quizzes without mapping data are skipped).
+      2. One paginated stream of GET /courses/:id/students/submissions (student_ids[]=all,
+         assignment_ids[] for every mapped quiz) returns the grades currently posted. With
+         source="graphql" (default SUBMISSIONS_SOURCE) they are read in batched GraphQL
+         connection pages instead.
+      3. Each quiz's raw scores are read from its quiz submissions (see map_quiz_scores) and
+         mapped with its compiled GradeMapping.
+      4. Each target is compared with the column's current entries and the submission's
+         posted grade; only the values that changed are written, so a second run writes nothing.
+      5. The "<quiz title> %" columns of all quizzes are written with the bulk column data
+         endpoint, and the grades with the course-level update_grades endpoint.
+
+    Returns {"quizzes", "submissions", "columns": column summary, "grades": grade summary}.
+    With dry_run=True nothing is written, not even missing columns: "columns"/"grades" hold
+    the planned changes, and "columns" lists the titles it would create in "create_columns".
+    """
+    wanted = {int(quiz_id) for quiz_id in quiz_ids} if quiz_ids else None
+    quizzes = [quiz for quiz in iter_paginated(f"/api/v1/courses/{course_id}/quizzes")
+               if wanted is None or quiz["id"] in wanted]
+    mappings = resolve_quiz_mappings(course_id, quizzes=quizzes)
+
+    # assignment_id -> (quiz, compiled mapping)
+    mapped_quizzes = {}
+    for quiz in quizzes:
+        try:
+            grade_mapping = compile_grade_mapping(mappings.get(quiz["id"]))
+        except ValueError as e:
+            print(f"⚠️ Skipping quiz {quiz['id']}: {e}")
+            continue
+        if grade_mapping and quiz.get("assignment_id"):
+            mapped_quizzes[quiz["assignment_id"]] = (quiz, grade_mapping)
+    if not mapped_quizzes:
+        print(f"❌ No quizzes with mapping data found in course {course_id}.")
+        return None
+
+    # Pull every student's posted grades in one stream: assignment_id -> {user_id: submission}
+    posted_by_assignment = {assignment_id: {} for assignment_id in mapped_quizzes}
+    submission_count = 0
+    for submission in iter_course_submissions(course_id, list(mapped_quizzes), source=source):
+        if submission.assignment_id in posted_by_assignment:
+            posted_by_assignment[submission.assignment_id][submission.user_id] = submission
+            submission_count += 1
+    print(f"✅ Found {submission_count} submissions for {len(mapped_quizzes)} quizzes in course {course_id}")
+
+    column_ids, missing_columns = {}, []
+    if update_columns:
+        titles = [f"{quiz['title']} %" for quiz, _ in mapped_quizzes.values()]
+        column_ids = get_or_create_quiz_columns(course_id, titles, create=not dry_run)
+        missing_columns = [title for title in titles if title not in column_ids]
+
+    column_changes, column_unchanged = [], 0
+    grade_changes, grade_unchanged = [], 0
+    for assignment_id, (quiz, grade_mapping) in mapped_quizzes.items():
+        posted = posted_by_assignment[assignment_id]
+        scores = map_quiz_scores(course_id, quiz["id"], grade_mapping, user_ids=posted)
+        column_id = column_ids.get(f"{quiz['title']} %")
+        column_values = []
+        targets = []
+        for user_id, (_, segment) in scores.items():
+            if segment < 0:
+                continue
+            label = grade_mapping.labels[segment]
+            if update_columns and (column_id or dry_run): # a dry run plans columns it would create
+                column_values.append((column_id, user_id, label))
+            targets.append((posted[user_id], label, grade_mapping.percents[segment]))
+
+        if column_values:
+            entries = {entry.user_id: entry for entry in iter_column_entries(course_id, column_id)} if column_id else {}
+            changes, unchanged = plan_column_writes(column_values, entries)
+            print_write_plan(f"Column '{quiz['title']} %'", changes, unchanged, dry_run=dry_run)
+            column_changes += changes
+            column_unchanged += unchanged
+        if update_grades:
+            changes, unchanged = plan_grade_writes(targets, quiz.get("points_possible"))
+            print_write_plan(f"Grades for quiz {quiz['id']}", changes, unchanged, dry_run=dry_run)
+            grade_changes += [(assignment_id,) + change for change in changes]
+            grade_unchanged += unchanged
+
+    summary = {"quizzes": len(mapped_quizzes), "submissions": submission_count, "columns": None, "grades": None}
+    if dry_run:
+        if update_columns:
+            for title in missing_columns:
+                print(f"📝 Would create column '{title}'.")
+            summary["columns"] = {"dry_run": True, "changes": column_changes, "unchanged": column_unchanged,
+                                  "create_columns": missing_columns}
+        if update_grades:
+            summary["grades"] = {"dry_run": True, "changes": grade_changes, "unchanged": grade_unchanged}
+        return summary
+
+    grades = {(assignment_id, user_id): grade for assignment_id, user_id, _, grade in grade_changes}
+    if update_columns:
+        summary["columns"] = bulk_update_column_data(course_id, [(column_id, user_id, value)
+                                                                 for column_id, user_id, _, value in column_changes],
+                                                     chunk_size=chunk_size)
+        summary["columns"]["unchanged"] = column_unchanged
+        print(f"✅ Updated {summary['columns']['sent'] - len(summary['columns']['failed_users'])}/"
+              f"{summary['columns']['sent']} column entries in {summary['columns']['chunks']} bulk requests.")
+    if update_grades:
+        summary["grades"] = post_course_grades(course_id, grades, max_workers=max_workers)
+        summary["grades"]["unchanged"] = grade_unchanged
+        print(f"✅ Posted {summary['grades']['posted'] - len(summary['grades']['failed_users'])}/"
+              f"{summary['grades']['posted']} grades in {summary['grades']['chunks']} bulk requests "
+              f"({summary['grades']['fallback_updated']} individually).")
+
+    report_throttle()
+    return summary
+
+#endregion
+
+#region ==================== Fleet Sync ==================== #
 
+FLEET_SETTINGS = ("API_URL", "TOKEN", "COURSE_ID", "STATE_DB", "DATA_FILE", "SUBMISSIONS_SOURCE", "MAPPING_KEY",
+                  "HTTP_TIMEOUT", "HTTP_POOL_SIZE", "RETRY_MAX_ATTEMPTS", "RETRY_BUDGET", "DEFAULT_MAX_WORKERS",
+                  "BULK_CHUNK_SIZE") # module settings copied into every worker process
 
+def init_fleet_worker(settings, budget):
+    """Runs once in each worker process: applies the parent's settings and builds the worker's own Canvas client."""
+    global canvas, request_budget
+    globals().update(settings)
+    request_budget = budget
+    canvas = Canvas(API_URL, TOKEN)
+    share_http_session(canvas)
 
+def sync_course_in_worker(course_id, sync_args):
+    """
+    Runs sync_course_grades for one course inside a worker process and returns
+    {"course_id", "status", "summary", "seconds", "requests", "bytes_in", "errors"}; the
+    course's printed output is captured and only its ❌ lines are kept. status is "synced",
+    "skipped" (the course has no quizzes with mapping data) or "failed".
+    """
+    before = request_metrics.summary()
+    started = time.perf_counter()
+    output = io.StringIO()
+    result = {"course_id": course_id, "status": "failed", "summary": None}
+    try:
+        with redirect_stdout(output):
+            result["summary"] = sync_course_grades(course_id, **sync_args)
+        result["status"] = "synced" if result["summary"] is not None else "skipped"
+    except Exception as e:
+        output.write(f"❌ {e}\n")
+    after = request_metrics.summary()
+    result["seconds"] = round(time.perf_counter() - started, 3)
+    result["requests"] = after["requests"] - before["requests"]
+    result["bytes_in"] = after["bytes_in"] - before["bytes_in"]
+    result["errors"] = [line for line in output.getvalue().splitlines() if "❌" in line
+                        and result["status"] != "skipped"] # a skipped course only reports why it was skipped
+    return result
+
+def merge_fleet_results(results, elapsed):
+    """Adds up the per-course results of a fleet sync into one report."""
+    totals = {"quizzes": 0, "submissions": 0, "column_entries": 0, "column_failures": 0, "grades": 0,
+              "grade_failures": 0, "unchanged": 0, "planned_changes": 0, "requests": 0, "bytes_in": 0}
+    for result in results:
+        totals["requests"] += result["requests"]
+        totals["bytes_in"] += result["bytes_in"]
+        summary = result["summary"]
+        if not summary:
+            continue
+        totals["quizzes"] += summary["quizzes"]
+        totals["submissions"] += summary["submissions"]
+        columns, grades = summary.get("columns"), summary.get("grades")
+        if columns and not columns.get("dry_run"):
+            totals["column_entries"] += columns["sent"]
+            totals["column_failures"] += len(columns["failed_users"])
+        if grades and not grades.get("dry_run"):
+            totals["grades"] += grades["posted"]
+            totals["grade_failures"] += len(grades["failed_users"])
+        for part in (columns, grades):
+            if part:
+                totals["unchanged"] += part.get("unchanged", 0)
+                totals["planned_changes"] += len(part["changes"]) if part.get("dry_run") else 0
+    return {
+        "courses": len(results),
+        "synced": sum(1 for result in results if result["status"] == "synced"),
+        "skipped_courses": [result["course_id"] for result in results if result["status"] == "skipped"],
+        "failed_courses": [result["course_id"] for result in results if result["status"] == "failed"],
+        "seconds": round(elapsed, 3),
+        "totals": totals,
+        "results": sorted(results, key=lambda result: str(result["course_id"]))
+    }
 
+def sync_courses(course_ids, processes=FLEET_PROCESSES, request_rate=FLEET_REQUEST_RATE, report_file=None,
+                 **sync_args):
+    """
+    Runs sync_course_grades for many courses, sharded across worker processes.
 
+    Each worker process gets its own Canvas client and HTTP session (set up by
+    init_fleet_worker with this process's settings) and takes the next course as soon as
+    it finishes one. All processes draw from one SharedRequestBudget of request_rate
+    requests per second (None for no limit), so the fleet as a whole stays within the
+    instance's rate budget however many processes run. sync_args (quiz_ids,
+    update_columns, dry_run, source, ...) are passed to every sync_course_grades call.
 
+    Returns the merged report (see merge_fleet_results), also written to report_file as JSON if given.
+    """
+    course_ids = list(course_ids)
+    context = multiprocessing.get_context("spawn") # workers must not inherit this process's threads and sockets
+    budget = SharedRequestBudget(request_rate, context) if request_rate else None
+    settings = {name: globals()[name] for name in FLEET_SETTINGS}
+
+    print(f"🚚 Syncing {len(course_ids)} courses in {processes} processes"
+          f"{f' at up to {request_rate} requests/s' if request_rate else ''}...")
+    started = time.perf_counter()
+    results = []
+    with ProcessPoolExecutor(max_workers=max(1, processes), mp_context=context, initializer=init_fleet_worker,
+                             initargs=(settings, budget)) as executor:
+        futures = {executor.submit(sync_course_in_worker, course_id, sync_args): course_id for course_id in course_ids}
+        for future in as_completed(futures):
+            try:
+                result = future.result()
+            except Exception as e: # the worker process itself failed
+                result = {"course_id": futures[future], "status": "failed", "summary": None, "seconds": None,
+                          "requests": 0, "bytes_in": 0, "errors": [f"❌ {e}"]}
+            results.append(result)
+            icon = {"synced": "✅", "skipped": "⏭️"}.get(result["status"], "❌")
+            print(f"{icon} Course {result['course_id']}: {result['status']} in {result['seconds']}s "
+                  f"({result['requests']} requests) [{len(results)}/{len(course_ids)}]")
+            for line in result["errors"][:5]:
+                print(f"   {line}")
+
+    report = merge_fleet_results(results, time.perf_counter() - started)
+    totals = report["totals"]
+    print(f"📊 {report['synced']}/{report['courses']} courses synced in {report['seconds']}s "
+          f"({len(report['skipped_courses'])} skipped with no mapped quizzes, "
+          f"{len(report['failed_courses'])} failed): "
+          f"{totals['grades']} grades and {totals['column_entries']} column entries written, "
+          f"{totals['unchanged']} already up to date, {totals['requests']} requests.")
+    if report_file:
+        try:
+            with open(report_file, "w") as file:
+                json.dump(report, file, indent=4)
+            print(f"💾 Fleet report written to {report_file}")
+        except OSError as e:
+            print(f"❌ Error writing fleet report: {e}")
+    return report
 
+#endregion
 
 # ==================== Example Usage ==================== #
 
@@ -1129,6 +3862,9 @@ if __name__ == "__main__":
     # Create a quiz and save details
     # create_quiz_from_json(COURSE_ID, "Test Quiz 5")
     # complete_quiz_for_students(course_id = COURSE_ID,quiz_id=806, correct_answers_map=correct_answers_map)
+    # from questions import question_data_list
+    # plan = generate_answer_plan(get_state_store().count_students(), questions=question_data_list, seed=1)
+    # complete_quiz_for_students(COURSE_ID, 806, plan, seed=1)
 
     correct_answers_map = {
         0: [1,2,3,4,5,6],  # First student answers Q1 - Q6 correctly
@@ -1154,6 +3890,8 @@ if __name__ == "__main__":
     # print(mapping, type(mapping))
     # update_gradebook_column_for_quiz(COURSE_ID, 808, mapping)
     # update_quiz_grades(COURSE_ID, 2883, mapping)
+    # sync_course_grades(COURSE_ID)  # every quiz with mapping data in the course, in one pass
+    # sync_courses([COURSE_ID, 1234, 5678], processes=4, report_file="fleet_report.json")  # a whole term
 
     # course = canvas.get_course(COURSE_ID)
     # # for assignment in course.get_assignments():
@@ -1162,4 +3900,6 @@ if __name__ == "__main__":
     # for col in columns:
     #     print(f"Column ID: {col.id}, Title: {col.title}")
 
-delete_custom_column_raw(COURSE_ID, 1)
\ No newline at end of file
+    # delete_custom_column_raw(COURSE_ID, 1)
+
+    report_metrics() # per-endpoint request counts and latencies (also exported if METRICS_* files are set)
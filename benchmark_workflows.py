@@ -0,0 +1,244 @@
+"""
+Benchmarks the main workflows in GettingStartedWithCanvasAPI_2.py against the local
+Canvas stand-in (mock_canvas.py).
+
+For each roster size and question count it runs:
+    create_quiz_from_json -> complete_quiz_for_students -> update_gradebook_column_for_quiz -> update_quiz_grades
+and records wall time, HTTP requests, bytes transferred and peak memory for each step.
+
+Usage:
+    python benchmark_workflows.py --sizes 10 100 1000 --questions 10 50 --output benchmark_results.json
+    python benchmark_workflows.py --sizes 100 --baseline benchmark_results.json --tolerance 0.25
+
+Results are written as JSON. The run exits with status 1 if any step breaks a limit in
+benchmark_thresholds.json (requests per student/question) or, with --baseline, is slower or
+makes more requests than the baseline run by more than --tolerance.
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+
+try:
+    import resource
+except ImportError: # Windows
+    resource = None
+
+import GettingStartedWithCanvasAPI_2 as canvas_sbg
+from mock_canvas import MOCK_ADMIN_TOKEN, MockCanvasServer
+
+DEFAULT_SIZES = [10, 100, 1000, 10000]
+DEFAULT_QUESTION_COUNTS = [10, 50]
+THRESHOLDS_FILE = "benchmark_thresholds.json"
+
+
+def build_quiz_file(directory, question_count):
+    """Writes a quiz_data.json-style file with question_count multiple choice questions."""
+    questions = []
+    for i in range(question_count):
+        correct = i % 4
+        questions.append({
+            "question_name": f"Question {i + 1}",
+            "question_text": f"Benchmark question {i + 1}",
+            "question_type": "multiple_choice_question",
+            "points_possible": 1,
+            "answers": [{"answer_text": f"Choice {c + 1}", "weight": 100 if c == correct else 0} for c in range(4)]
+        })
+    quiz = {"title": "Benchmark Quiz", "description": "Benchmark quiz", "quiz_type": "assignment",
+            "published": True, "allowed_attempts": 1, "questions": questions}
+    path = os.path.join(directory, f"quiz_{question_count}.json")
+    with open(path, "w") as file:
+        json.dump(quiz, file)
+    return path
+
+
+def build_mapping(question_count):
+    """
+    Maps every raw score 0..question_count to a percentage from 50% to 100%, like the
+    quiz_4_mapping_data example. Most mapped grades differ from the raw score, so posting
+    them really changes the gradebook.
+    """
+    return {"quiz_4_mapping_data": {str(score): f"{round(50 + 50 * score / question_count)}%"
+                                    for score in range(question_count + 1)}}
+
+
+def peak_rss_bytes():
+    """High-water mark of the process's resident memory, or None where it is not available."""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+def measure(server, step, func, *args, trace_memory=False, **kwargs):
+    """
+    Runs func once and returns (result, metrics dict) for it.
+    Peak memory is the process's peak RSS, or, with trace_memory, the peak of Python
+    allocations during the step (tracemalloc is exact but slows the step down several times).
+    """
+    server.reset_stats()
+    if trace_memory:
+        tracemalloc.start()
+    started = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        result = func(*args, **kwargs)
+    elapsed = time.perf_counter() - started
+    if trace_memory:
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+    else:
+        peak = peak_rss_bytes()
+
+    stats = server.stats()
+    return result, {
+        "step": step,
+        "seconds": round(elapsed, 4),
+        "requests": stats["requests"],
+        "bytes_in": stats["bytes_in"],
+        "bytes_out": stats["bytes_out"],
+        "rate_limited": stats["rate_limited"],
+        "peak_memory_bytes": peak,
+        "by_endpoint": stats["by_endpoint"]
+    }
+
+
+def run_scenario(roster_size, question_count, args, workdir):
+    """Runs the full pipeline for one roster size / question count on a fresh mock server."""
+    server = MockCanvasServer(latency=args.latency, rate_limit=args.rate_limit, page_size=args.page_size).start()
+    try:
+        students = server.state.seed_students(roster_size)
+        canvas_sbg.STATE_DB = os.path.join(workdir, f"canvas_state_{roster_size}_{question_count}.db")
+        canvas_sbg.DATA_FILE = os.path.join(workdir, "no_legacy_data.json")
+        canvas_sbg.get_state_store().add_students(students)
+
+        with contextlib.redirect_stdout(io.StringIO()):
+            canvas_sbg.initialize_canvas(api_url=server.url, token=MOCK_ADMIN_TOKEN, course_id=server.course_id)
+        course_id = server.course_id
+        quiz_file = build_quiz_file(workdir, question_count)
+        rng = random.Random(roster_size * 1000 + question_count)
+        correct_answers_map = {i: rng.sample(range(1, question_count + 1), rng.randint(0, question_count))
+                               for i in range(roster_size)}
+        mapping = build_mapping(question_count)
+
+        steps = []
+        _, metrics = measure(server, "create_quiz_from_json", canvas_sbg.create_quiz_from_json,
+                             course_id, "Benchmark Quiz", json_file=quiz_file, trace_memory=args.trace_memory)
+        steps.append(metrics)
+        quiz_id = max(server.state.quizzes)
+        assignment_id = server.state.quizzes[quiz_id]["assignment_id"]
+
+        _, metrics = measure(server, "complete_quiz_for_students", canvas_sbg.complete_quiz_for_students,
+                             course_id, quiz_id, correct_answers_map, max_workers=args.workers,
+                             trace_memory=args.trace_memory)
+        steps.append(metrics)
+
+        with contextlib.redirect_stdout(io.StringIO()):
+            canvas_sbg.append_mapping_to_quiz_description(course_id, quiz_id, mapping)
+
+        _, metrics = measure(server, "update_gradebook_column_for_quiz", canvas_sbg.update_gradebook_column_for_quiz,
+                             course_id, quiz_id, mapping, trace_memory=args.trace_memory)
+        steps.append(metrics)
+
+        _, metrics = measure(server, "update_quiz_grades", canvas_sbg.update_quiz_grades,
+                             course_id, assignment_id, mapping, trace_memory=args.trace_memory)
+        steps.append(metrics)
+
+        for metrics in steps:
+            metrics["requests_per_student"] = round(metrics["requests"] / roster_size, 3)
+            metrics["requests_per_question"] = round(metrics["requests"] / question_count, 3)
+        return {"students": roster_size, "questions": question_count, "steps": steps}
+    finally:
+        server.stop()
+
+
+def check_thresholds(results, thresholds):
+    """Returns a list of messages for steps that exceed the per-unit limits in thresholds."""
+    failures = []
+    for scenario in results["scenarios"]:
+        for step in scenario["steps"]:
+            for metric, limit in thresholds.get(step["step"], {}).items():
+                value = step.get(metric)
+                if value is not None and value > limit:
+                    failures.append(f"{step['step']} ({scenario['students']} students, {scenario['questions']} "
+                                    f"questions): {metric} {value} > {limit}")
+    return failures
+
+
+def check_baseline(results, baseline, tolerance):
+    """Returns a list of messages for steps that got slower or chattier than the same step in baseline."""
+    previous = {(s["students"], s["questions"], step["step"]): step
+                for s in baseline.get("scenarios", []) for step in s["steps"]}
+    failures = []
+    for scenario in results["scenarios"]:
+        for step in scenario["steps"]:
+            old = previous.get((scenario["students"], scenario["questions"], step["step"]))
+            if not old:
+                continue
+            for metric in ("seconds", "requests", "bytes_out"):
+                if old[metric] and step[metric] > old[metric] * (1 + tolerance):
+                    failures.append(f"{step['step']} ({scenario['students']} students, {scenario['questions']} "
+                                    f"questions): {metric} {step[metric]} vs baseline {old[metric]}")
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the Canvas SBG workflows against mock_canvas.py.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES, help="roster sizes")
+    parser.add_argument("--questions", type=int, nargs="+", default=DEFAULT_QUESTION_COUNTS, help="question counts")
+    parser.add_argument("--workers", type=int, default=canvas_sbg.DEFAULT_MAX_WORKERS)
+    parser.add_argument("--latency", type=float, default=0.0, help="simulated seconds per request")
+    parser.add_argument("--rate-limit", action="store_true", help="enable the mock's rate-limit bucket")
+    parser.add_argument("--page-size", type=int, default=10)
+    parser.add_argument("--trace-memory", action="store_true",
+                        help="measure peak memory with tracemalloc (exact, but inflates wall times)")
+    parser.add_argument("--output", default="benchmark_results.json")
+    parser.add_argument("--thresholds", default=THRESHOLDS_FILE)
+    parser.add_argument("--baseline", help="previous results file to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed slowdown vs --baseline (0.25 = 25%%)")
+    args = parser.parse_args()
+
+    results = {
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "settings": {"workers": args.workers, "latency": args.latency, "rate_limit": args.rate_limit,
+                     "page_size": args.page_size, "trace_memory": args.trace_memory},
+        "scenarios": []
+    }
+
+    with tempfile.TemporaryDirectory() as workdir:
+        for roster_size in args.sizes:
+            for question_count in args.questions:
+                scenario = run_scenario(roster_size, question_count, args, workdir)
+                results["scenarios"].append(scenario)
+                for step in scenario["steps"]:
+                    print(f"{roster_size:>6} students {question_count:>4} questions  {step['step']:<34} "
+                          f"{step['seconds']:>9.3f}s {step['requests']:>7} req "
+                          f"{step['bytes_out'] / 1024:>9.1f} KiB out {(step['peak_memory_bytes'] or 0) / 2 ** 20:>7.1f} MiB")
+
+    failures = []
+    if os.path.exists(args.thresholds):
+        with open(args.thresholds) as file:
+            failures += check_thresholds(results, json.load(file))
+    if args.baseline:
+        with open(args.baseline) as file:
+            failures += check_baseline(results, json.load(file), args.tolerance)
+    results["regressions"] = failures
+
+    with open(args.output, "w") as file:
+        json.dump(results, file, indent=4)
+    print(f"Results written to {args.output}")
+
+    for failure in failures:
+        print(f"REGRESSION: {failure}")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
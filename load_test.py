@@ -0,0 +1,320 @@
+"""
+Load generator for a Canvas instance, built on the masquerading quiz-taking functions in
+GettingStartedWithCanvasAPI_2.py.
+
+Each virtual student runs the same three phases as complete_quiz_for_students:
+    start (start_quiz) -> answer (submit_answers_masquerading) -> complete (complete_quiz_submission)
+and the time of every phase is recorded. Students arrive either open-loop, at --rate students
+per second, or closed-loop, with --concurrency students taking the quiz at once. --profile
+shapes the arrivals:
+    spike   everyone starts at the same moment (a whole school opening an exam)
+    step    the full rate/concurrency from the first second
+    linear  rate/concurrency ramps up from zero over --ramp seconds
+
+Usage:
+    python load_test.py --mock --students 500 --profile spike --output load_results.json
+    python load_test.py --mock --students 1000 --rate 50 --profile linear --ramp 10 --latency 0.05
+    python load_test.py --config config.json --quiz-id 808 --students 300 --concurrency 40
+
+With --mock a local mock_canvas.py server is started and seeded with the students. Otherwise
+the students come from the state store (create_test_students / enroll_students_to_course /
+accept_all_course_invites first), and the quiz is --quiz-id or a new one from --quiz-file.
+Results (per-phase throughput and p50/p95/p99 latency, plus the per-endpoint request
+metrics) are written as JSON; --samples-csv also writes one row per student.
+"""
+import argparse
+import contextlib
+import csv
+import io
+import json
+import math
+import os
+import platform
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import GettingStartedWithCanvasAPI_2 as canvas_sbg
+
+PHASES = ["start", "answer", "complete"]
+PROFILES = ["spike", "step", "linear"]
+
+
+def arrival_offsets(count, rate, profile, ramp):
+    """
+    Seconds after the start at which each of count students arrives (open-loop mode).
+    With the linear profile the arrival rate grows from 0 to rate over ramp seconds, so the
+    i-th arrival is where the cumulative arrivals rate * t^2 / (2 * ramp) reach i.
+    """
+    if profile == "spike" or not rate:
+        return [0.0] * count
+    if profile == "step" or ramp <= 0:
+        return [i / rate for i in range(count)]
+    ramp_arrivals = rate * ramp / 2
+    return [math.sqrt(2 * ramp * i / rate) if i < ramp_arrivals else ramp + (i - ramp_arrivals) / rate
+            for i in range(count)]
+
+
+def worker_offsets(concurrency, profile, ramp):
+    """Seconds after the start at which each closed-loop worker begins taking students."""
+    if profile != "linear" or ramp <= 0:
+        return [0.0] * concurrency
+    return [ramp * i / concurrency for i in range(concurrency)]
+
+
+def take_quiz(course_id, quiz_id, student, answer_key, sorted_question_ids, correct_questions, run_started):
+    """
+    Runs one virtual student through start -> answer -> complete and returns a sample dict
+    with the arrival time, each phase's latency and, on failure, the phase and error.
+    """
+    sample = {"student_id": student["id"], "arrived": round(time.perf_counter() - run_started, 4),
+              "status": "failed", "failed_phase": None, "error": None}
+    token = student.get("token")
+
+    def timed(phase, func, *args):
+        started = time.perf_counter()
+        try:
+            return func(*args)
+        finally:
+            sample[phase] = round(time.perf_counter() - started, 4)
+
+    try:
+        sample["failed_phase"] = "start"
+        submission = timed("start", canvas_sbg.start_quiz, course_id, quiz_id, student["id"], token)
+        if not submission:
+            sample["error"] = "Could not start or find a quiz submission"
+            return sample
+
+        sample["failed_phase"] = "answer"
+        answers = canvas_sbg.build_student_answers(answer_key, sorted_question_ids, correct_questions)
+        if timed("answer", canvas_sbg.submit_answers_masquerading, course_id, quiz_id, submission["id"],
+                 student["id"], answers, submission.get("attempt"), submission.get("validation_token"),
+                 token) is None:
+            sample["error"] = "Failed to submit answers"
+            return sample
+
+        sample["failed_phase"] = "complete"
+        if timed("complete", canvas_sbg.complete_quiz_submission, course_id, quiz_id, submission,
+                 student["id"], token) is None:
+            sample["error"] = "Failed to complete the quiz submission"
+            return sample
+
+        sample["status"] = "completed"
+        sample["failed_phase"] = None
+    except Exception as e:
+        sample["error"] = str(e)
+    finally:
+        sample["finished"] = round(time.perf_counter() - run_started, 4)
+    return sample
+
+
+def run_load(course_id, quiz_id, students, args):
+    """Sends the virtual students through the quiz with the chosen arrival model; returns their samples."""
+    answer_key = canvas_sbg.get_quiz_answer_key(course_id, quiz_id)
+    if not answer_key:
+        raise SystemExit("Could not read the quiz's answer key.")
+    sorted_question_ids = canvas_sbg.question_order(answer_key)
+    plans = canvas_sbg.generate_answer_plan(len(students), question_count=len(sorted_question_ids), seed=args.seed)
+
+    samples = []
+    run_started = time.perf_counter()
+
+    def run_student(index):
+        return take_quiz(course_id, quiz_id, students[index], answer_key, sorted_question_ids, plans[index],
+                         run_started)
+
+    if args.concurrency:
+        # Closed loop: each worker takes the next student as soon as its previous one is done
+        next_index = iter(range(len(students)))
+        lock = threading.Lock()
+
+        def worker(offset):
+            time.sleep(offset)
+            results = []
+            while True:
+                with lock:
+                    index = next(next_index, None)
+                if index is None:
+                    return results
+                results.append(run_student(index))
+
+        offsets = worker_offsets(args.concurrency, args.profile, args.ramp)
+        with ThreadPoolExecutor(max_workers=args.concurrency) as executor:
+            for results in executor.map(worker, offsets):
+                samples.extend(results)
+    else:
+        # Open loop: students arrive on schedule, whether or not earlier ones have finished
+        offsets = arrival_offsets(len(students), args.rate, args.profile, args.ramp)
+        with ThreadPoolExecutor(max_workers=args.max_in_flight) as executor:
+            futures = []
+            for index, offset in enumerate(offsets):
+                delay = offset - (time.perf_counter() - run_started)
+                if delay > 0:
+                    time.sleep(delay)
+                futures.append(executor.submit(run_student, index))
+            samples = [future.result() for future in futures]
+
+    return samples, time.perf_counter() - run_started
+
+
+def latency_summary(values):
+    """Count, mean and p50/p95/p99/max of a list of latencies in seconds."""
+    values = sorted(values)
+    return {
+        "count": len(values),
+        "mean": round(sum(values) / len(values), 4) if values else None,
+        "p50": canvas_sbg.percentile(values, 50),
+        "p95": canvas_sbg.percentile(values, 95),
+        "p99": canvas_sbg.percentile(values, 99),
+        "max": values[-1] if values else None
+    }
+
+
+def summarize(samples, elapsed):
+    """Per-phase throughput, errors and latency percentiles for one run."""
+    completed = [s for s in samples if s["status"] == "completed"]
+    phases = {}
+    for phase in PHASES:
+        latencies = [s[phase] for s in samples if phase in s]
+        failures = sum(1 for s in samples if s["failed_phase"] == phase)
+        phases[phase] = {
+            "throughput_per_second": round((len(latencies) - failures) / elapsed, 3) if elapsed else None,
+            "errors": failures,
+            "latency": latency_summary(latencies)
+        }
+    return {
+        "students": len(samples),
+        "completed": len(completed),
+        "failed": len(samples) - len(completed),
+        "seconds": round(elapsed, 3),
+        "students_per_second": round(len(completed) / elapsed, 3) if elapsed else None,
+        "end_to_end": latency_summary([s["finished"] - s["arrived"] for s in completed]),
+        "phases": phases
+    }
+
+
+def write_samples_csv(path, samples):
+    fields = ["student_id", "status", "arrived", "finished"] + PHASES + ["failed_phase", "error"]
+    with open(path, "w", newline="") as file:
+        writer = csv.DictWriter(file, fieldnames=fields, extrasaction="ignore")
+        writer.writeheader()
+        for sample in samples:
+            writer.writerow(sample)
+
+
+def prepare_mock(args, workdir):
+    """Starts and seeds a mock server; returns (server, course_id, quiz_id, students)."""
+    from mock_canvas import MOCK_ADMIN_TOKEN, MockCanvasServer
+
+    server = MockCanvasServer(latency=args.latency, jitter=args.jitter, rate_limit=args.rate_limit,
+                              error_rate=args.error_rate).start()
+    students = server.state.seed_students(args.students)
+    canvas_sbg.STATE_DB = os.path.join(workdir, "load_test_state.db")
+    canvas_sbg.DATA_FILE = os.path.join(workdir, "no_legacy_data.json")
+    canvas_sbg.get_state_store().add_students(students)
+    with contextlib.redirect_stdout(io.StringIO()):
+        canvas_sbg.initialize_canvas(api_url=server.url, token=MOCK_ADMIN_TOKEN, course_id=server.course_id)
+        report = canvas_sbg.create_quiz_from_json(server.course_id, "Load Test Quiz", json_file=args.quiz_file)
+    return server, server.course_id, report["quiz_id"], students
+
+
+def prepare_host(args):
+    """Connects to the host in --config; returns (None, course_id, quiz_id, students)."""
+    canvas_sbg.initialize_canvas(config_file=args.config)
+    if canvas_sbg.canvas is None:
+        raise SystemExit("Canvas could not be initialized; check the config file.")
+    students = [s for s in canvas_sbg.get_state_store().get_students() if s.get("token")]
+    if len(students) < args.students:
+        raise SystemExit(f"Only {len(students)} students with tokens in {canvas_sbg.STATE_DB}; "
+                         f"create and enroll more with create_test_students first.")
+    course_id = canvas_sbg.COURSE_ID
+    quiz_id = args.quiz_id
+    if quiz_id is None:
+        with contextlib.redirect_stdout(io.StringIO()):
+            report = canvas_sbg.create_quiz_from_json(course_id, "Load Test Quiz", json_file=args.quiz_file)
+        quiz_id = report["quiz_id"]
+    return None, course_id, quiz_id, students[:args.students]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Simulate many students taking a Canvas quiz at once.")
+    parser.add_argument("--students", type=int, default=100, help="virtual students")
+    mode = parser.add_mutually_exclusive_group()
+    mode.add_argument("--rate", type=float, help="open loop: students arriving per second")
+    mode.add_argument("--concurrency", type=int, help="closed loop: students taking the quiz at once")
+    parser.add_argument("--profile", choices=PROFILES, default="spike")
+    parser.add_argument("--ramp", type=float, default=0.0, help="seconds to reach full rate/concurrency (linear)")
+    parser.add_argument("--max-in-flight", type=int, default=256, help="open loop: cap on students in progress")
+    parser.add_argument("--seed", type=int, default=0, help="seed for the students' answer plans")
+    parser.add_argument("--no-throttle", action="store_true", help="ignore X-Rate-Limit-Remaining pacing")
+    parser.add_argument("--no-retry", action="store_true", help="send every request once")
+    parser.add_argument("--quiz-file", default="quiz_data.json", help="quiz created when --quiz-id is not given")
+    parser.add_argument("--quiz-id", type=int, help="existing quiz to take (real host only)")
+    parser.add_argument("--config", default="config.json", help="config for the real host")
+    parser.add_argument("--mock", action="store_true", help="run against a local mock_canvas.py server")
+    parser.add_argument("--latency", type=float, default=0.0, help="mock: seconds added to each response")
+    parser.add_argument("--jitter", type=float, default=0.0, help="mock: extra random seconds per response")
+    parser.add_argument("--rate-limit", action="store_true", help="mock: enforce the leaky bucket")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="mock: share of requests answered with 503")
+    parser.add_argument("--output", default="load_results.json")
+    parser.add_argument("--samples-csv", help="also write one row per virtual student here")
+    args = parser.parse_args()
+
+    if args.profile != "spike" and not (args.rate or args.concurrency):
+        parser.error(f"--profile {args.profile} needs --rate or --concurrency")
+    if args.profile == "spike" and not args.concurrency:
+        args.rate = None
+        args.max_in_flight = max(args.max_in_flight, args.students)
+    if args.no_throttle:
+        canvas_sbg.throttle = canvas_sbg.RateLimitThrottle(comfortable=float("-inf"))
+    if args.no_retry:
+        canvas_sbg.RETRY_MAX_ATTEMPTS = 1
+    in_flight = args.concurrency or args.max_in_flight
+    canvas_sbg.configure_http(pool_size=max(canvas_sbg.HTTP_POOL_SIZE, in_flight))
+
+    with tempfile.TemporaryDirectory() as workdir:
+        server, course_id, quiz_id, students = prepare_mock(args, workdir) if args.mock else prepare_host(args)
+        try:
+            canvas_sbg.request_metrics.reset()
+            with contextlib.redirect_stdout(io.StringIO()):
+                samples, elapsed = run_load(course_id, quiz_id, students, args)
+        finally:
+            if server is not None:
+                server.stop()
+
+    summary = summarize(samples, elapsed)
+    results = {
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "target": "mock" if args.mock else canvas_sbg.API_URL,
+        "settings": {"students": args.students, "rate": args.rate, "concurrency": args.concurrency,
+                     "profile": args.profile, "ramp": args.ramp, "throttle": not args.no_throttle,
+                     "retry": not args.no_retry, "latency": args.latency, "error_rate": args.error_rate},
+        "course_id": course_id,
+        "quiz_id": quiz_id,
+        "summary": summary,
+        "requests": canvas_sbg.request_metrics.summary()
+    }
+
+    print(f"{summary['completed']}/{summary['students']} students completed in {summary['seconds']}s "
+          f"({summary['students_per_second']} students/s)")
+    for phase, stats in summary["phases"].items():
+        latency = stats["latency"]
+        if latency["count"]:
+            print(f"  {phase:<9} {stats['throughput_per_second']:>9.2f}/s {stats['errors']:>5} errors  "
+                  f"p50 {latency['p50'] * 1000:>8.1f}ms  p95 {latency['p95'] * 1000:>8.1f}ms  "
+                  f"p99 {latency['p99'] * 1000:>8.1f}ms")
+
+    with open(args.output, "w") as file:
+        json.dump(results, file, indent=4)
+    print(f"Results written to {args.output}")
+    if args.samples_csv:
+        write_samples_csv(args.samples_csv, samples)
+        print(f"Samples written to {args.samples_csv}")
+    sys.exit(1 if summary["failed"] else 0)
+
+
+if __name__ == "__main__":
+    main()
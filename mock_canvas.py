@@ -0,0 +1,1224 @@
+"""
+Local stand-in for the parts of the Canvas REST API used by GettingStartedWithCanvasAPI_2.py.
+
+It keeps everything in memory and serves it over HTTP on localhost, so the workflows in
+the main script can run (and be benchmarked) without a live Canvas instance.
+
+Run it on its own:
+    python mock_canvas.py --port 8765 --students 30 --latency 0.05 --data-file canvas_data.json
+and set "API_URL": "http://127.0.0.1:8765" in config.json (any TOKEN works, COURSE_ID is 1).
+
+Or start it in-process:
+    server = MockCanvasServer(latency=0.02).start()
+    students = server.state.seed_students(100)
+    initialize_canvas(api_url=server.url, token=MOCK_ADMIN_TOKEN, course_id=server.course_id)
+    ...
+    server.stop()
+"""
+import argparse
+import base64
+import csv
+import io
+import itertools
+import json
+import random
+import re
+import threading
+import time
+import xml.etree.ElementTree as ET
+import zipfile
+from datetime import datetime, timezone
+from email.parser import BytesParser
+from email.policy import HTTP
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qsl, urlencode, urlsplit
+
+MOCK_ADMIN_TOKEN = "mock-admin-token"
+MOCK_ACCOUNT_ID = 1
+MOCK_COURSE_ID = 1
+MOCK_ADMIN_ID = 1
+
+DEFAULT_PAGE_SIZE = 10 # Canvas's default per_page
+MAX_PAGE_SIZE = 100
+
+ROUTES = [] # (method, compiled path regex, handler)
+UNAUTHENTICATED_PREFIX = "/api/v1/uploads/" # pre_attachment upload URLs
+
+
+def route(method, pattern, prefix="/api/v1"):
+    """Registers a handler for METHOD <prefix><pattern>. Named groups are passed as keyword arguments."""
+    def decorator(func):
+        ROUTES.append((method, re.compile("^" + prefix + pattern + "/?$"), func))
+        return func
+    return decorator
+
+
+def now_iso():
+    return datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+
+
+def parse_nested_params(pairs):
+    """
+    Turns Rails-style form/query pairs (e.g. "quiz[title]", "question[answers][][weight]",
+    "state[]") into nested dicts and lists, the way Canvas reads them.
+    """
+    result = {}
+    for key, value in pairs:
+        head = key.split("[", 1)[0]
+        parts = [head] + re.findall(r"\[([^\]]*)\]", key[len(head):])
+        node = result
+        for i, part in enumerate(parts[:-1]):
+            following = parts[i + 1]
+            if part == "":
+                if not node or not isinstance(node[-1], dict) or following in node[-1]:
+                    node.append({})
+                node = node[-1]
+            else:
+                existing = node.get(part)
+                if not isinstance(existing, (dict, list)):
+                    node[part] = [] if following == "" else {}
+                node = node[part]
+        if parts[-1] == "":
+            node.append(value)
+        else:
+            node[parts[-1]] = value
+    return result
+
+
+def parse_multipart(content_type, body):
+    """Splits a multipart/form-data body into ([(name, value)] form fields, {name: bytes} files)."""
+    message = BytesParser(policy=HTTP).parsebytes(f"Content-Type: {content_type}\r\n\r\n".encode() + body)
+    fields, files = [], {}
+    for part in message.iter_parts():
+        name = part.get_param("name", header="content-disposition")
+        payload = part.get_payload(decode=True) or b""
+        if part.get_filename():
+            files[name] = payload
+        else:
+            fields.append((name, payload.decode("utf-8")))
+    return fields, files
+
+
+def as_list(value):
+    if value is None:
+        return []
+    return value if isinstance(value, list) else [value]
+
+
+def as_bool(value):
+    return value is True or str(value).lower() in ("true", "1")
+
+
+class MockError(Exception):
+    """Raised by handlers to return a Canvas-style error response."""
+
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+
+
+class MockRequest:
+    """One parsed request, as seen by a route handler."""
+
+    def __init__(self, server, method, path, query, params, token, raw_body=b"", files=None):
+        self.server = server
+        self.method = method
+        self.path = path
+        self.query = query # list of raw (key, value) pairs from the query string
+        self.params = params # query string and body merged into nested dicts
+        self.token = token
+        self.raw_body = raw_body
+        self.files = files or {} # multipart file fields: name -> bytes
+        self.response_headers = {}
+
+    @property
+    def user_id(self):
+        """The effective user: the masqueraded as_user_id, else the token's owner."""
+        if self.params.get("as_user_id"):
+            return int(self.params["as_user_id"])
+        return self.server.state.tokens.get(self.token, MOCK_ADMIN_ID)
+
+    def paginate(self, items):
+        """Returns one page of items and sets the Canvas-style Link header for the rest."""
+        per_page = min(int(self.params.get("per_page") or self.server.page_size), MAX_PAGE_SIZE)
+        page = max(int(self.params.get("page") or 1), 1)
+        last_page = max((len(items) + per_page - 1) // per_page, 1)
+
+        base_query = [(k, v) for k, v in self.query if k not in ("page", "per_page")]
+
+        def link(number, rel):
+            query = urlencode(base_query + [("page", number), ("per_page", per_page)])
+            return f'<{self.server.url}{self.path}?{query}>; rel="{rel}"'
+
+        links = [link(page, "current"), link(1, "first")]
+        if page > 1:
+            links.append(link(page - 1, "prev"))
+        if page < last_page:
+            links.append(link(page + 1, "next"))
+        links.append(link(last_page, "last"))
+        self.response_headers["Link"] = ",".join(links)
+
+        start = (page - 1) * per_page
+        return items[start:start + per_page]
+
+
+class MockCanvasState:
+    """In-memory Canvas data: one account, courses, users, quizzes, submissions and columns."""
+
+    def __init__(self):
+        self.lock = threading.RLock()
+        self.ids = itertools.count(1000)
+        self.users = {MOCK_ADMIN_ID: {"id": MOCK_ADMIN_ID, "name": "Mock Admin", "login_id": "admin"}}
+        self.users_by_sis_id = {} # sis_user_id -> user, so SIS imports do not scan every user
+        self.tokens = {MOCK_ADMIN_TOKEN: MOCK_ADMIN_ID}
+        self.courses = {MOCK_COURSE_ID: {"id": MOCK_COURSE_ID, "name": "Mock Course", "course_code": "MOCK-101",
+                                         "account_id": MOCK_ACCOUNT_ID}}
+        self.enrollments = {} # id -> enrollment
+        self.quizzes = {} # id -> quiz
+        self.questions = {} # quiz_id -> [question]
+        self.quiz_submissions = {} # id -> quiz submission
+        self.assignments = {} # id -> assignment
+        self.submissions = {} # (assignment_id, user_id) -> submission
+        self.columns = {} # id -> custom gradebook column
+        self.column_data = {} # column_id -> {user_id: content}
+        self.progress = {} # id -> progress
+        self.sis_imports = {} # id -> sis import
+        self.content_migrations = {} # id -> content migration
+
+    def next_id(self):
+        return next(self.ids)
+
+    # ---- seeding helpers (used by benchmarks and tests, not part of the API) ---- #
+
+    def add_user(self, name, email=None, sis_user_id=None):
+        with self.lock:
+            user_id = self.next_id()
+            self.users[user_id] = {"id": user_id, "name": name, "sortable_name": name,
+                                   "login_id": email or f"user{user_id}@example.com", "sis_user_id": sis_user_id}
+            if sis_user_id:
+                self.users_by_sis_id[sis_user_id] = self.users[user_id]
+            self.tokens[f"mock-token-{user_id}"] = user_id
+            return self.users[user_id]
+
+    def add_enrollment(self, course_id, user_id, enrollment_type="StudentEnrollment", state="active"):
+        with self.lock:
+            enrollment_id = self.next_id()
+            self.enrollments[enrollment_id] = {
+                "id": enrollment_id, "course_id": course_id, "user_id": user_id, "type": enrollment_type,
+                "role": enrollment_type, "enrollment_state": state, "created_at": now_iso()
+            }
+            return self.enrollments[enrollment_id]
+
+    def seed_students(self, count, course_id=MOCK_COURSE_ID, enroll=True):
+        """
+        Creates count students (enrolled and active in course_id by default) and returns them
+        in the same shape as the "students" list in canvas_data.json, including a token.
+        """
+        students = []
+        for i in range(count):
+            name = f"Mock Student{i + 1}"
+            email = f"mockstudent{i + 1}@example.com"
+            user = self.add_user(name, email)
+            if enroll:
+                self.add_enrollment(course_id, user["id"])
+            students.append({"id": user["id"], "name": name, "email": email, "password": "Pass123!",
+                             "token": f"mock-token-{user['id']}"})
+        return students
+
+    def add_course(self, name=None):
+        """Creates another course in the mock account and returns it."""
+        with self.lock:
+            course_id = self.next_id()
+            self.courses[course_id] = {"id": course_id, "name": name or f"Mock Course {course_id}",
+                                       "course_code": f"MOCK-{course_id}", "account_id": MOCK_ACCOUNT_ID}
+            return self.courses[course_id]
+
+    def add_quiz(self, course_id, quiz, questions=()):
+        """Creates a published quiz (and its assignment) with the given questions; returns the quiz."""
+        with self.lock:
+            created = create_quiz_record(self, course_id, quiz)
+            for question in questions:
+                create_question_record(self, created, question)
+            return created
+
+    # ---- lookups ---- #
+
+    def course(self, course_id):
+        course = self.courses.get(int(course_id))
+        if not course:
+            raise MockError(404, "The specified resource does not exist.")
+        return course
+
+    def quiz(self, course_id, quiz_id):
+        quiz = self.quizzes.get(int(quiz_id))
+        if not quiz or quiz["course_id"] != int(course_id):
+            raise MockError(404, "The specified resource does not exist.")
+        return quiz
+
+    def student_ids(self, course_id):
+        return [e["user_id"] for e in self.enrollments.values()
+                if e["course_id"] == int(course_id) and e["type"] == "StudentEnrollment"
+                and e["enrollment_state"] in ("active", "invited")]
+
+    def submission(self, assignment_id, user_id):
+        """Returns the assignment submission for a user, creating the unsubmitted placeholder Canvas shows."""
+        key = (int(assignment_id), int(user_id))
+        if key not in self.submissions:
+            self.submissions[key] = {
+                "id": self.next_id(), "assignment_id": int(assignment_id), "user_id": int(user_id),
+                "score": None, "grade": None, "entered_score": None, "entered_grade": None,
+                "submitted_at": None, "graded_at": None, "posted_at": None,
+                "workflow_state": "unsubmitted", "attempt": None
+            }
+        return self.submissions[key]
+
+    def create_progress(self, tag, context_id, delay=0.0, message=None):
+        progress_id = self.next_id()
+        self.progress[progress_id] = {
+            "id": progress_id, "context_id": context_id, "context_type": "Course", "user_id": MOCK_ADMIN_ID,
+            "tag": tag, "completion": 0, "workflow_state": "queued", "message": message,
+            "created_at": now_iso(), "updated_at": now_iso(), "url": f"/api/v1/progress/{progress_id}",
+            "ready_at": time.monotonic() + delay
+        }
+        return public_progress(self.progress[progress_id])
+
+
+def public_progress(progress):
+    return {k: v for k, v in progress.items() if k != "ready_at"}
+
+
+def create_quiz_record(state, course_id, quiz_params):
+    quiz_id = state.next_id()
+    assignment_id = state.next_id()
+    quiz = {
+        "id": quiz_id, "course_id": int(course_id), "assignment_id": assignment_id,
+        "title": quiz_params.get("title", "Unnamed Quiz"), "description": quiz_params.get("description", ""),
+        "quiz_type": quiz_params.get("quiz_type", "assignment"), "published": as_bool(quiz_params.get("published")),
+        "allowed_attempts": int(quiz_params.get("allowed_attempts") or 1), "points_possible": 0.0,
+        "question_count": 0, "time_limit": quiz_params.get("time_limit"), "created_at": now_iso(),
+        "updated_at": now_iso()
+    }
+    if "quiz_engine" in quiz_params:
+        quiz["quiz_engine"] = int(quiz_params["quiz_engine"])
+    state.quizzes[quiz_id] = quiz
+    state.questions[quiz_id] = []
+    state.assignments[assignment_id] = {
+        "id": assignment_id, "course_id": int(course_id), "name": quiz["title"], "quiz_id": quiz_id,
+        "points_possible": 0.0, "grading_type": "points", "submission_types": ["online_quiz"],
+        "is_quiz_assignment": True
+    }
+    return quiz
+
+
+def create_question_record(state, quiz, question_params):
+    answers = []
+    for answer in as_list(question_params.get("answers")):
+        answers.append({
+            "id": state.next_id(),
+            "text": answer.get("answer_text", answer.get("text", "")),
+            "weight": float(answer.get("weight", 0) or 0)
+        })
+    questions = state.questions[quiz["id"]]
+    question = {
+        "id": state.next_id(), "quiz_id": quiz["id"],
+        "position": int(question_params.get("position") or len(questions) + 1),
+        "question_name": question_params.get("question_name", "Question"),
+        "question_text": question_params.get("question_text", ""),
+        "question_type": question_params.get("question_type", "multiple_choice_question"),
+        "points_possible": float(question_params.get("points_possible", 1) or 0),
+        "answers": answers
+    }
+    questions.append(question)
+    questions.sort(key=lambda q: (q["position"], q["id"]))
+    quiz["question_count"] = len(questions)
+    quiz["points_possible"] = sum(q["points_possible"] for q in questions)
+    quiz["updated_at"] = now_iso()
+    state.assignments[quiz["assignment_id"]]["points_possible"] = quiz["points_possible"]
+    return question
+
+
+def apply_posted_grade(state, assignment, submission, posted_grade):
+    """Sets score/grade from a posted_grade such as "80%" or "8", the way Canvas interprets it."""
+    posted_grade = str(posted_grade).strip()
+    points_possible = assignment["points_possible"] or 0
+    if posted_grade.endswith("%"):
+        score = float(posted_grade[:-1]) / 100.0 * points_possible
+    else:
+        score = float(posted_grade)
+    submission.update({
+        "score": score, "grade": posted_grade, "entered_score": score, "entered_grade": posted_grade,
+        "graded_at": now_iso(), "workflow_state": "graded"
+    })
+
+
+#region ==================== Accounts & Users ==================== #
+
+@route("GET", r"/accounts")
+def list_accounts(state, request):
+    return 200, request.paginate([{"id": MOCK_ACCOUNT_ID, "name": "Mock Account"}])
+
+
+@route("GET", r"/accounts/(?P<account_id>\d+)")
+def get_account(state, request, account_id):
+    if int(account_id) != MOCK_ACCOUNT_ID:
+        raise MockError(404, "The specified resource does not exist.")
+    return 200, {"id": MOCK_ACCOUNT_ID, "name": "Mock Account"}
+
+
+@route("GET", r"/accounts/(?P<account_id>\d+)/users")
+def list_account_users(state, request, account_id):
+    term = (request.params.get("search_term") or "").lower()
+    users = [u for u in state.users.values()
+             if not term or any(term in str(u.get(field) or "").lower() for field in ("name", "login_id", "sis_user_id"))]
+    return 200, request.paginate(users)
+
+
+@route("POST", r"/accounts/(?P<account_id>\d+)/users")
+def create_user(state, request, account_id):
+    user_params = request.params.get("user", {})
+    pseudonym = request.params.get("pseudonym", {})
+    if not pseudonym.get("unique_id"):
+        raise MockError(400, "pseudonym[unique_id] is required")
+    user = state.add_user(user_params.get("name", pseudonym["unique_id"]), pseudonym["unique_id"])
+    return 200, user
+
+
+@route("DELETE", r"/accounts/(?P<account_id>\d+)/users/(?P<user_id>\d+)")
+def delete_user(state, request, account_id, user_id):
+    user = state.users.pop(int(user_id), None)
+    if not user:
+        raise MockError(404, "The specified resource does not exist.")
+    state.users_by_sis_id.pop(user.get("sis_user_id"), None)
+    for enrollment in list(state.enrollments.values()):
+        if enrollment["user_id"] == int(user_id):
+            enrollment["enrollment_state"] = "deleted"
+    return 200, user
+
+@route("POST", r"/accounts/(?P<account_id>\d+)/sis_imports")
+def create_sis_import(state, request, account_id):
+    attachment = request.files.get("attachment") or request.raw_body
+    if not attachment:
+        raise MockError(400, "attachment is required")
+    created = 0
+    for row in csv.DictReader(io.StringIO(attachment.decode("utf-8"))):
+        if not row.get("user_id") or not row.get("login_id"):
+            continue
+        if row["user_id"] not in state.users_by_sis_id:
+            state.add_user(row.get("full_name") or row["login_id"], row["login_id"], row["user_id"])
+            created += 1
+    import_id = state.next_id()
+    state.sis_imports[import_id] = {
+        "id": import_id, "workflow_state": "created", "progress": 0, "created_at": now_iso(),
+        "data": {"import_type": "instructure_csv", "counts": {"users": created}},
+        "ready_at": time.monotonic() + request.server.job_delay
+    }
+    return 200, public_progress(state.sis_imports[import_id])
+
+
+@route("GET", r"/accounts/(?P<account_id>\d+)/sis_imports/(?P<import_id>\d+)")
+def get_sis_import(state, request, account_id, import_id):
+    sis_import = state.sis_imports.get(int(import_id))
+    if not sis_import:
+        raise MockError(404, "The specified resource does not exist.")
+    if sis_import["workflow_state"] != "imported" and time.monotonic() >= sis_import["ready_at"]:
+        sis_import.update({"workflow_state": "imported", "progress": 100})
+    elif sis_import["workflow_state"] == "created":
+        sis_import["workflow_state"] = "importing"
+    return 200, public_progress(sis_import)
+
+#endregion
+
+#region ==================== Courses & Enrollments ==================== #
+
+@route("GET", r"/courses")
+def list_courses(state, request):
+    return 200, request.paginate(list(state.courses.values()))
+
+
+@route("GET", r"/courses/(?P<course_id>\d+)")
+def get_course(state, request, course_id):
+    return 200, state.course(course_id)
+
+
+@route("GET", r"/courses/(?P<course_id>\d+)/enrollments")
+def list_enrollments(state, request, course_id):
+    state.course(course_id)
+    states = as_list(request.params.get("state"))
+    types = as_list(request.params.get("type"))
+    user_id = request.params.get("user_id")
+    enrollments = [
+        e for e in state.enrollments.values()
+        if e["course_id"] == int(course_id)
+        and (e["enrollment_state"] in states if states else e["enrollment_state"] in ("active", "invited"))
+        and (not types or e["type"] in types)
+        and (not user_id or e["user_id"] == int(user_id))
+    ]
+    return 200, request.paginate(enrollments)
+
+
+@route("POST", r"/courses/(?P<course_id>\d+)/enrollments")
+def enroll_user(state, request, course_id):
+    state.course(course_id)
+    enrollment = request.params.get("enrollment", {})
+    user_id = enrollment.get("user_id") or request.params.get("user_id")
+    if not user_id or int(user_id) not in state.users:
+        raise MockError(400, "enrollment[user_id] is invalid")
+    enrollment_type = enrollment.get("type") or request.params.get("type") or "StudentEnrollment"
+    enrollment_state = enrollment.get("enrollment_state") or request.params.get("enrollment_state") or "invited"
+    return 200, state.add_enrollment(int(course_id), int(user_id), enrollment_type, enrollment_state)
+
+
+@route("POST", r"/courses/(?P<course_id>\d+)/enrollments/(?P<enrollment_id>\d+)/accept")
+def accept_enrollment(state, request, course_id, enrollment_id):
+    enrollment = state.enrollments.get(int(enrollment_id))
+    if not enrollment or enrollment["course_id"] != int(course_id):
+        raise MockError(404, "The specified resource does not exist.")
+    if enrollment["user_id"] != request.user_id:
+        raise MockError(401, "user not authorized to perform that action")
+    enrollment["enrollment_state"] = "active"
+    return 200, {"success": True}
+
+#endregion
+
+#region ==================== Quizzes ==================== #
+
+@route("GET", r"/courses/(?P<course_id>\d+)/quizzes")
+def list_quizzes(state, request, course_id):
+    state.course(course_id)
+    search_term = (request.params.get("search_term") or "").lower()
+    quizzes = [q for q in state.quizzes.values()
+               if q["course_id"] == int(course_id) and search_term in q["title"].lower()]
+    return 200, request.paginate(quizzes)
+
+
+@route("POST", r"/courses/(?P<course_id>\d+)/quizzes")
+def create_quiz(state, request, course_id):
+    state.course(course_id)
+    return 200, create_quiz_record(state, course_id, request.params.get("quiz", {}))
+
+
+@route("GET", r"/courses/(?P<course_id>\d+)/quizzes/(?P<quiz_id>\d+)")
+def get_quiz(state, request, course_id, quiz_id):
+    return 200, state.quiz(course_id, quiz_id)
+
+
+@route("PUT", r"/courses/(?P<course_id>\d+)/quizzes/(?P<quiz_id>\d+)")
+def edit_quiz(state, request, course_id, quiz_id):
+    quiz = state.quiz(course_id, quiz_id)
+    for key, value in request.params.get("quiz", {}).items():
+        if key in ("title", "description", "quiz_type", "time_limit"):
+            quiz[key] = value
+        elif key == "allowed_attempts":
+            quiz[key] = int(value)
+        elif key == "published":
+            quiz[key] = as_bool(value)
+    quiz["updated_at"] = now_iso()
+    return 200, quiz
+
+
+@route("DELETE", r"/courses/(?P<course_id>\d+)/quizzes/(?P<quiz_id>\d+)")
+def delete_quiz(state, request, course_id, quiz_id):
+    quiz = state.quiz(course_id, quiz_id)
+    del state.quizzes[quiz["id"]]
+    return 200, quiz
+
+
+@route("GET", r"/courses/(?P<course_id>\d+)/quizzes/(?P<quiz_id>\d+)/questions")
+def list_questions(state, request, course_id, quiz_id):
+    quiz = state.quiz(course_id, quiz_id)
+    return 200, request.paginate(state.questions[quiz["id"]])
+
+
+@route("POST", r"/courses/(?P<course_id>\d+)/quizzes/(?P<quiz_id>\d+)/questions")
+def create_question(state, request, course_id, quiz_id):
+    quiz = state.quiz(course_id, quiz_id)
+    return 200, create_question_record(state, quiz, request.params.get("question", {}))
+
+#endregion
+
+#region ==================== Quiz Submissions ==================== #
+
+def quiz_submission_payload(submissions):
+    return {"quiz_submissions": submissions}
+
+
+@route("GET", r"/courses/(?P<course_id>\d+)/quizzes/(?P<quiz_id>\d+)/submissions")
+def list_quiz_submissions(state, request, course_id, quiz_id):
+    quiz = state.quiz(course_id, quiz_id)
+    submissions = [s for s in state.quiz_submissions.values() if s["quiz_id"] == quiz["id"]]
+    if request.user_id != MOCK_ADMIN_ID:
+        submissions = [s for s in submissions if s["user_id"] == request.user_id]
+    return 200, quiz_submission_payload(request.paginate(submissions))
+
+
+@route("POST", r"/courses/(?P<course_id>\d+)/quizzes/(?P<quiz_id>\d+)/submissions")
+def start_quiz_submission(state, request, course_id, quiz_id):
+    quiz = state.quiz(course_id, quiz_id)
+    user_id = request.user_id
+    previous = [s for s in state.quiz_submissions.values() if s["quiz_id"] == quiz["id"] and s["user_id"] == user_id]
+    if any(s["workflow_state"] == "untaken" for s in previous):
+        raise MockError(409, "a quiz submission already exists")
+    if len(previous) >= quiz["allowed_attempts"] and quiz["allowed_attempts"] != -1:
+        raise MockError(403, "you are not allowed to participate in this quiz")
+
+    submission = {
+        "id": state.next_id(), "quiz_id": quiz["id"], "user_id": user_id,
+        "submission_id": state.submission(quiz["assignment_id"], user_id)["id"],
+        "attempt": len(previous) + 1, "validation_token": f"vt-{random.getrandbits(64):016x}",
+        "workflow_state": "untaken", "score": None, "kept_score": None, "started_at": now_iso(),
+        "finished_at": None, "answers": {}
+    }
+    state.quiz_submissions[submission["id"]] = submission
+    return 200, quiz_submission_payload([public_quiz_submission(submission)])
+
+
+def public_quiz_submission(submission):
+    return {k: v for k, v in submission.items() if k != "answers"}
+
+
+@route("GET", r"/courses/(?P<course_id>\d+)/quizzes/(?P<quiz_id>\d+)/submissions/(?P<submission_id>\d+)")
+def get_quiz_submission(state, request, course_id, quiz_id, submission_id):
+    submission = state.quiz_submissions.get(int(submission_id))
+    if not submission or submission["quiz_id"] != int(quiz_id):
+        raise MockError(404, "The specified resource does not exist.")
+    return 200, quiz_submission_payload([public_quiz_submission(submission)])
+
+
+@route("PUT", r"/courses/(?P<course_id>\d+)/quizzes/(?P<quiz_id>\d+)/submissions/(?P<submission_id>\d+)")
+def update_quiz_submission(state, request, course_id, quiz_id, submission_id):
+    submission = state.quiz_submissions.get(int(submission_id))
+    if not submission or submission["quiz_id"] != int(quiz_id):
+        raise MockError(404, "The specified resource does not exist.")
+    for update in as_list(request.params.get("quiz_submissions")):
+        if "fudge_points" in update:
+            submission["fudge_points"] = float(update["fudge_points"])
+    if "score" in request.params:
+        submission["score"] = submission["kept_score"] = float(request.params["score"])
+    return 200, quiz_submission_payload([public_quiz_submission(submission)])
+
+
+def check_validation(submission, params):
+    if str(params.get("validation_token")) != submission["validation_token"]:
+        raise MockError(403, "invalid validation token")
+    if params.get("attempt") is not None and int(params["attempt"]) != submission["attempt"]:
+        raise MockError(400, "attempt is not the latest attempt")
+
+
+@route("GET", r"/quiz_submissions/(?P<submission_id>\d+)/questions")
+def list_submission_questions(state, request, submission_id):
+    submission = state.quiz_submissions.get(int(submission_id))
+    if not submission:
+        raise MockError(404, "The specified resource does not exist.")
+    questions = []
+    for question in state.questions.get(submission["quiz_id"], []):
+        questions.append({
+            "id": question["id"], "position": question["position"], "question_text": question["question_text"],
+            "question_type": question["question_type"], "flagged": False,
+            "answer": submission["answers"].get(question["id"]),
+            "answers": [{"id": a["id"], "text": a["text"]} for a in question["answers"]]
+        })
+    return 200, {"quiz_submission_questions": questions}
+
+
+@route("POST", r"/quiz_submissions/(?P<submission_id>\d+)/questions")
+def answer_submission_questions(state, request, submission_id):
+    submission = state.quiz_submissions.get(int(submission_id))
+    if not submission:
+        raise MockError(404, "The specified resource does not exist.")
+    if submission["workflow_state"] != "untaken":
+        raise MockError(400, "quiz submission is already complete")
+    check_validation(submission, request.params)
+    answered = as_list(request.params.get("quiz_questions")) + as_list(request.params.get("quiz_answers"))
+    for answer in answered:
+        submission["answers"][int(answer["id"])] = int(answer["answer"]) if answer.get("answer") is not None else None
+    return list_submission_questions(state, request, submission_id)
+
+
+@route("POST", r"/courses/(?P<course_id>\d+)/quizzes/(?P<quiz_id>\d+)/submissions/(?P<submission_id>\d+)/complete")
+def complete_quiz_submission(state, request, course_id, quiz_id, submission_id):
+    quiz = state.quiz(course_id, quiz_id)
+    submission = state.quiz_submissions.get(int(submission_id))
+    if not submission or submission["quiz_id"] != quiz["id"]:
+        raise MockError(404, "The specified resource does not exist.")
+    if submission["workflow_state"] != "untaken":
+        raise MockError(400, "quiz submission is already complete")
+    check_validation(submission, request.params)
+
+    score = 0.0
+    for question in state.questions[quiz["id"]]:
+        chosen = submission["answers"].get(question["id"])
+        if any(a["id"] == chosen and a["weight"] == 100 for a in question["answers"]):
+            score += question["points_possible"]
+    submission.update({"workflow_state": "complete", "score": score, "kept_score": score,
+                       "finished_at": now_iso()})
+
+    assignment_submission = state.submission(quiz["assignment_id"], submission["user_id"])
+    assignment_submission.update({
+        "score": score, "grade": f"{score:g}", "entered_score": score, "entered_grade": f"{score:g}",
+        "submitted_at": now_iso(), "graded_at": now_iso(), "workflow_state": "graded",
+        "attempt": submission["attempt"]
+    })
+    return 200, quiz_submission_payload([public_quiz_submission(submission)])
+
+#endregion
+
+#region ==================== Assignments & Grades ==================== #
+
+@route("GET", r"/courses/(?P<course_id>\d+)/assignments/(?P<assignment_id>\d+)")
+def get_assignment(state, request, course_id, assignment_id):
+    assignment = state.assignments.get(int(assignment_id))
+    if not assignment or assignment["course_id"] != int(course_id):
+        raise MockError(404, "The specified resource does not exist.")
+    return 200, assignment
+
+
+@route("GET", r"/courses/(?P<course_id>\d+)/assignments/(?P<assignment_id>\d+)/submissions")
+def list_assignment_submissions(state, request, course_id, assignment_id):
+    get_assignment(state, request, course_id, assignment_id)
+    submissions = [state.submission(assignment_id, user_id) for user_id in state.student_ids(course_id)]
+    return 200, request.paginate(submissions)
+
+
+@route("GET", r"/courses/(?P<course_id>\d+)/assignments/(?P<assignment_id>\d+)/submissions/(?P<user_id>\d+)")
+def get_assignment_submission(state, request, course_id, assignment_id, user_id):
+    get_assignment(state, request, course_id, assignment_id)
+    return 200, state.submission(assignment_id, user_id)
+
+
+@route("PUT", r"/courses/(?P<course_id>\d+)/assignments/(?P<assignment_id>\d+)/submissions/(?P<user_id>\d+)")
+def grade_assignment_submission(state, request, course_id, assignment_id, user_id):
+    status, assignment = get_assignment(state, request, course_id, assignment_id)
+    submission = state.submission(assignment_id, user_id)
+    posted_grade = request.params.get("submission", {}).get("posted_grade")
+    if posted_grade is not None:
+        apply_posted_grade(state, assignment, submission, posted_grade)
+    return 200, submission
+
+
+@route("POST", r"/courses/(?P<course_id>\d+)/assignments/(?P<assignment_id>\d+)/submissions/update_grades")
+def update_grades(state, request, course_id, assignment_id):
+    status, assignment = get_assignment(state, request, course_id, assignment_id)
+    grade_data = request.params.get("grade_data", {})
+    failed = []
+    for user_id, grade in grade_data.items():
+        if not str(user_id).isdigit() or int(user_id) not in state.users:
+            failed.append(user_id)
+            continue
+        if "posted_grade" in grade:
+            apply_posted_grade(state, assignment, state.submission(assignment_id, user_id), grade["posted_grade"])
+    message = f"Couldn't find User(s) with API ids {', '.join(map(str, failed))}" if failed else None
+    return 200, state.create_progress("submissions_update", int(course_id), request.server.job_delay, message)
+
+
+@route("GET", r"/courses/(?P<course_id>\d+)/students/submissions")
+def list_course_submissions(state, request, course_id):
+    """Flat (ungrouped) list of the course's student submissions, as with student_ids[]=all."""
+    state.course(course_id)
+    student_ids = as_list(request.params.get("student_ids"))
+    if "all" in student_ids or not student_ids:
+        user_ids = state.student_ids(course_id)
+    else:
+        user_ids = [int(user_id) for user_id in student_ids]
+    assignment_ids = [int(a) for a in as_list(request.params.get("assignment_ids"))] or \
+        [a["id"] for a in state.assignments.values() if a["course_id"] == int(course_id)]
+    submissions = [state.submission(assignment_id, user_id)
+                   for assignment_id in assignment_ids if assignment_id in state.assignments
+                   for user_id in user_ids]
+    for field, param in (("submitted_at", "submitted_since"), ("graded_at", "graded_since")):
+        since = request.params.get(param)
+        if since:
+            submissions = [s for s in submissions if s[field] and s[field] >= since]
+    return 200, request.paginate(submissions)
+
+
+@route("POST", r"/courses/(?P<course_id>\d+)/submissions/update_grades")
+def update_course_grades(state, request, course_id):
+    """Course-level bulk grading: grade_data[assignment_id][user_id][posted_grade]."""
+    state.course(course_id)
+    failed = []
+    for assignment_id, users in request.params.get("grade_data", {}).items():
+        assignment = state.assignments.get(int(assignment_id))
+        if not assignment or assignment["course_id"] != int(course_id):
+            failed.append(assignment_id)
+            continue
+        for user_id, grade in users.items():
+            if not str(user_id).isdigit() or int(user_id) not in state.users:
+                failed.append(user_id)
+                continue
+            if "posted_grade" in grade:
+                apply_posted_grade(state, assignment, state.submission(assignment_id, user_id), grade["posted_grade"])
+    message = f"Couldn't find records with API ids {', '.join(map(str, failed))}" if failed else None
+    return 200, state.create_progress("submissions_update", int(course_id), request.server.job_delay, message)
+
+#endregion
+
+#region ==================== Custom Gradebook Columns ==================== #
+
+@route("GET", r"/courses/(?P<course_id>\d+)/custom_gradebook_columns")
+def list_columns(state, request, course_id):
+    columns = [c for c in state.columns.values() if c["course_id"] == int(course_id)]
+    return 200, request.paginate(columns)
+
+
+@route("POST", r"/courses/(?P<course_id>\d+)/custom_gradebook_columns")
+def create_column(state, request, course_id):
+    state.course(course_id)
+    column_params = request.params.get("column", {})
+    column_id = state.next_id()
+    state.columns[column_id] = {
+        "id": column_id, "course_id": int(course_id), "title": column_params.get("title", "Column"),
+        "position": int(column_params.get("position") or len(state.columns) + 1),
+        "hidden": as_bool(column_params.get("hidden")), "read_only": False, "teacher_notes": False
+    }
+    state.column_data[column_id] = {}
+    return 200, state.columns[column_id]
+
+
+@route("DELETE", r"/courses/(?P<course_id>\d+)/custom_gradebook_columns/(?P<column_id>\d+)")
+def delete_column(state, request, course_id, column_id):
+    column = state.columns.pop(int(column_id), None)
+    if not column:
+        raise MockError(404, "The specified resource does not exist.")
+    state.column_data.pop(int(column_id), None)
+    return 200, column
+
+
+@route("GET", r"/courses/(?P<course_id>\d+)/custom_gradebook_columns/(?P<column_id>\d+)/data")
+def list_column_data(state, request, course_id, column_id):
+    if int(column_id) not in state.columns:
+        raise MockError(404, "The specified resource does not exist.")
+    entries = [{"user_id": user_id, "content": content}
+               for user_id, content in state.column_data[int(column_id)].items()]
+    return 200, request.paginate(entries)
+
+
+@route("PUT", r"/courses/(?P<course_id>\d+)/custom_gradebook_columns/(?P<column_id>\d+)/data/(?P<user_id>\d+)")
+def update_column_entry(state, request, course_id, column_id, user_id):
+    if int(column_id) not in state.columns:
+        raise MockError(404, "The specified resource does not exist.")
+    column_data = request.params.get("column_data")
+    content = column_data.get("content") if isinstance(column_data, dict) else column_data
+    state.column_data[int(column_id)][int(user_id)] = content
+    return 200, {"user_id": int(user_id), "content": content}
+
+
+@route("PUT", r"/courses/(?P<course_id>\d+)/custom_gradebook_column_data")
+def bulk_update_column_data(state, request, course_id):
+    state.course(course_id)
+    for entry in as_list(request.params.get("column_data")):
+        column_id = int(entry["column_id"])
+        if column_id in state.columns:
+            state.column_data[column_id][int(entry["user_id"])] = entry.get("content")
+    return 200, state.create_progress("custom_gradebook_column_data", int(course_id), request.server.job_delay)
+
+#endregion
+
+#region ==================== Content Migrations (QTI) ==================== #
+
+QTI_NS = {"qti": "http://www.imsglobal.org/xsd/ims_qtiasiv1p2"}
+
+
+def parse_qti_package(package):
+    """Reads a QTI 1.2 zip and returns [(assessment title, [question params])] for create_question_record."""
+    assessments = []
+    with zipfile.ZipFile(io.BytesIO(package)) as archive:
+        for name in archive.namelist():
+            if not name.endswith(".xml") or name.endswith("imsmanifest.xml"):
+                continue
+            root = ET.fromstring(archive.read(name))
+            for assessment in root.iter(f"{{{QTI_NS['qti']}}}assessment"):
+                questions = []
+                for position, item in enumerate(assessment.iter(f"{{{QTI_NS['qti']}}}item"), start=1):
+                    metadata = {field.findtext("qti:fieldlabel", namespaces=QTI_NS):
+                                field.findtext("qti:fieldentry", namespaces=QTI_NS)
+                                for field in item.iterfind(".//qti:qtimetadatafield", QTI_NS)}
+                    correct = {node.text for node in item.iterfind(".//qti:respcondition//qti:varequal", QTI_NS)}
+                    answers = [{"answer_text": label.findtext(".//qti:mattext", namespaces=QTI_NS) or "",
+                                "weight": 100 if label.get("ident") in correct else 0}
+                               for label in item.iterfind(".//qti:response_label", QTI_NS)]
+                    questions.append({
+                        "question_name": item.get("title") or f"Question {position}", "position": position,
+                        "question_text": item.findtext("qti:presentation/qti:material/qti:mattext",
+                                                       namespaces=QTI_NS) or "",
+                        "question_type": metadata.get("question_type", "multiple_choice_question"),
+                        "points_possible": metadata.get("points_possible", 1), "answers": answers
+                    })
+                assessments.append((assessment.get("title") or "Imported Quiz", questions))
+    return assessments
+
+
+@route("POST", r"/courses/(?P<course_id>\d+)/content_migrations")
+def create_content_migration(state, request, course_id):
+    state.course(course_id)
+    if request.params.get("migration_type") != "qti_converter":
+        raise MockError(400, "only qti_converter migrations are supported by the mock")
+    pre_attachment = request.params.get("pre_attachment") or {}
+    if not pre_attachment.get("name"):
+        raise MockError(400, "pre_attachment[name] is required")
+    migration_id = state.next_id()
+    migration = {
+        "id": migration_id, "migration_type": "qti_converter", "workflow_state": "pre_processing",
+        "course_id": int(course_id), "created_at": now_iso(), "issues": [], "progress_id": None,
+        "pre_attachment": {"upload_url": f"{request.server.url}/api/v1/uploads/content_migrations/{migration_id}",
+                           "upload_params": {"filename": pre_attachment["name"]}, "file_param": "file"}
+    }
+    state.content_migrations[migration_id] = migration
+    return 200, public_migration(migration)
+
+
+def public_migration(migration):
+    payload = {k: v for k, v in migration.items() if k not in ("issues", "progress_id")}
+    if migration["progress_id"]:
+        payload["progress_url"] = f"/api/v1/progress/{migration['progress_id']}"
+    return payload
+
+
+@route("POST", r"/uploads/content_migrations/(?P<migration_id>\d+)")
+def upload_content_migration(state, request, migration_id):
+    """The pre_attachment upload_url; the package is imported as soon as it arrives."""
+    migration = state.content_migrations.get(int(migration_id))
+    if not migration or migration["workflow_state"] != "pre_processing":
+        raise MockError(404, "The specified resource does not exist.")
+    package = request.files.get("file")
+    if not package:
+        raise MockError(400, "file is required")
+    try:
+        assessments = parse_qti_package(package)
+    except (zipfile.BadZipFile, ET.ParseError) as e:
+        migration["workflow_state"] = "failed"
+        migration["issues"].append({"id": state.next_id(), "description": f"Invalid QTI package: {e}",
+                                    "issue_type": "error", "workflow_state": "active"})
+        assessments = []
+    for title, questions in assessments:
+        quiz = create_quiz_record(state, migration["course_id"], {"title": title, "quiz_type": "assignment"})
+        for question in questions:
+            if not question["answers"]:
+                migration["issues"].append({"id": state.next_id(), "issue_type": "warning", "workflow_state": "active",
+                                            "description": f"Question {question['position']} has no answers"})
+            create_question_record(state, quiz, question)
+    progress = state.create_progress("content_migration", migration["course_id"], request.server.job_delay)
+    migration["progress_id"] = progress["id"]
+    if migration["workflow_state"] != "failed":
+        migration["workflow_state"] = "running"
+    return 201, {"id": state.next_id(), "display_name": request.params.get("filename", "package.zip"),
+                 "size": len(package), "content-type": "application/zip"}
+
+
+@route("GET", r"/courses/(?P<course_id>\d+)/content_migrations/(?P<migration_id>\d+)")
+def get_content_migration(state, request, course_id, migration_id):
+    migration = state.content_migrations.get(int(migration_id))
+    if not migration or migration["course_id"] != int(course_id):
+        raise MockError(404, "The specified resource does not exist.")
+    progress = state.progress.get(migration["progress_id"])
+    if migration["workflow_state"] == "running" and progress and time.monotonic() >= progress["ready_at"]:
+        migration["workflow_state"] = "completed"
+    return 200, public_migration(migration)
+
+
+@route("GET", r"/courses/(?P<course_id>\d+)/content_migrations/(?P<migration_id>\d+)/migration_issues")
+def list_migration_issues(state, request, course_id, migration_id):
+    migration = state.content_migrations.get(int(migration_id))
+    if not migration or migration["course_id"] != int(course_id):
+        raise MockError(404, "The specified resource does not exist.")
+    return 200, request.paginate(migration["issues"])
+
+#endregion
+
+#region ==================== GraphQL ==================== #
+
+GRAPHQL_CONNECTION_PATTERN = re.compile(
+    r"(\w+)\s*:\s*assignment\(id:\s*\$(\w+)\)\s*\{\s*submissionsConnection\(first:\s*\$(\w+),\s*after:\s*\$(\w+)")
+
+
+def graphql_submission(submission):
+    return {"_id": str(submission["id"]), "userId": str(submission["user_id"]),
+            "assignmentId": str(submission["assignment_id"]), "score": submission["score"],
+            "grade": submission["grade"], "submittedAt": submission["submitted_at"],
+            "gradedAt": submission["graded_at"], "state": submission["workflow_state"]}
+
+
+@route("POST", r"/graphql", prefix="/api")
+def graphql(state, request):
+    """
+    Minimal /api/graphql: answers queries made of aliased assignment(id:) { submissionsConnection }
+    fields, as sent by iter_graphql_submissions, with cursor-paged submissions of the
+    course's students. Anything else gets a GraphQL error.
+    """
+    variables = request.params.get("variables") or {}
+    fields = GRAPHQL_CONNECTION_PATTERN.findall(request.params.get("query") or "")
+    if not fields:
+        return 200, {"errors": [{"message": "mock_canvas only supports assignment submissionsConnection queries"}]}
+    data = {}
+    for alias, id_var, first_var, after_var in fields:
+        assignment = state.assignments.get(int(variables[id_var]))
+        if assignment is None:
+            data[alias] = None
+            continue
+        first = min(int(variables.get(first_var) or DEFAULT_PAGE_SIZE), MAX_PAGE_SIZE)
+        after = variables.get(after_var)
+        offset = int(base64.b64decode(after).decode()) if after else 0
+        user_ids = state.student_ids(assignment["course_id"])
+        page = [state.submission(assignment["id"], user_id) for user_id in user_ids[offset:offset + first]]
+        end = offset + len(page)
+        data[alias] = {"submissionsConnection": {
+            "nodes": [graphql_submission(submission) for submission in page],
+            "pageInfo": {"hasNextPage": end < len(user_ids),
+                         "endCursor": base64.b64encode(str(end).encode()).decode() if page else after}
+        }}
+    return 200, {"data": data}
+
+#endregion
+
+#region ==================== Progress ==================== #
+
+@route("GET", r"/progress/(?P<progress_id>\d+)")
+def get_progress(state, request, progress_id):
+    progress = state.progress.get(int(progress_id))
+    if not progress:
+        raise MockError(404, "The specified resource does not exist.")
+    if progress["workflow_state"] != "completed" and time.monotonic() >= progress["ready_at"]:
+        progress.update({"workflow_state": "completed", "completion": 100, "updated_at": now_iso()})
+    elif progress["workflow_state"] == "queued":
+        progress["workflow_state"] = "running"
+    return 200, public_progress(progress)
+
+#endregion
+
+
+class RateLimitBucket:
+    """Canvas-style leaky bucket: each request adds its cost, the bucket drains at leak_rate per second."""
+
+    def __init__(self, capacity=700.0, leak_rate=10.0, request_cost=1.0):
+        self.capacity = capacity
+        self.leak_rate = leak_rate
+        self.request_cost = request_cost
+        self.level = 0.0
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def charge(self):
+        """Charges one request. Returns (allowed, remaining, cost)."""
+        with self.lock:
+            now = time.monotonic()
+            self.level = max(0.0, self.level - (now - self.updated) * self.leak_rate)
+            self.updated = now
+            if self.level + self.request_cost > self.capacity:
+                return False, max(0.0, self.capacity - self.level), 0.0
+            self.level += self.request_cost
+            return True, self.capacity - self.level, self.request_cost
+
+
+class MockCanvasHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1" # keep-alive, like Canvas
+    disable_nagle_algorithm = True # otherwise delayed ACKs add ~40ms to every keep-alive response
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+    def do_GET(self):
+        self.dispatch("GET")
+
+    def do_POST(self):
+        self.dispatch("POST")
+
+    def do_PUT(self):
+        self.dispatch("PUT")
+
+    def do_DELETE(self):
+        self.dispatch("DELETE")
+
+    def read_body(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        return self.rfile.read(length) if length else b""
+
+    def dispatch(self, method):
+        server = self.server
+        raw_body = self.read_body()
+        split = urlsplit(self.path)
+        query = parse_qsl(split.query, keep_blank_values=True)
+        headers = {"Content-Type": "application/json"}
+
+        if server.latency or server.jitter:
+            time.sleep(server.latency + random.uniform(0, server.jitter))
+
+        status, payload, template = self.handle_api(method, split.path, query, raw_body, headers)
+
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        for key, value in headers.items():
+            self.send_header(key, value)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+        server.record(method, template, status, len(raw_body) + len(self.path), len(body))
+
+    def handle_api(self, method, path, query, raw_body, headers):
+        """Returns (status, payload, endpoint template) and fills in response headers."""
+        server = self.server
+        auth = self.headers.get("Authorization", "")
+        if path.startswith(UNAUTHENTICATED_PREFIX):
+            auth = "Bearer " # file upload URLs carry no token, as with Canvas's upload service
+        elif not auth.startswith("Bearer "):
+            return 401, {"errors": [{"message": "user authorization required"}]}, path
+
+        if server.error_rate and random.random() < server.error_rate:
+            return 503, {"errors": [{"message": "Service Unavailable"}]}, path
+
+        if server.bucket:
+            allowed, remaining, cost = server.bucket.charge()
+            headers["X-Rate-Limit-Remaining"] = f"{remaining:.3f}"
+            headers["X-Request-Cost"] = f"{cost:.3f}"
+            if not allowed:
+                return 403, "403 Forbidden (Rate Limit Exceeded)", path
+
+        for route_method, pattern, handler in ROUTES:
+            match = pattern.match(path)
+            if route_method != method or not match:
+                continue
+            template = pattern.pattern.replace("/?$", "").lstrip("^")
+            template = re.sub(r"\(\?P<(\w+)>[^)]*\)", r":\1", template)
+
+            try:
+                params = parse_nested_params(query)
+                files = {}
+                content_type = self.headers.get("Content-Type") or ""
+                if raw_body:
+                    if "json" in content_type:
+                        params.update(json.loads(raw_body))
+                    elif content_type.startswith("multipart/form-data"):
+                        fields, files = parse_multipart(content_type, raw_body)
+                        params.update(parse_nested_params(fields))
+                    elif "form-urlencoded" in content_type:
+                        params.update(parse_nested_params(parse_qsl(raw_body.decode("utf-8"), keep_blank_values=True)))
+                request = MockRequest(server, method, path, query, params, auth[len("Bearer "):], raw_body, files)
+                with server.state.lock:
+                    status, payload = handler(server.state, request, **match.groupdict())
+                headers.update(request.response_headers)
+                return status, payload, template
+            except MockError as e:
+                return e.status, {"errors": [{"message": e.message}]}, template
+            except (KeyError, ValueError, TypeError) as e:
+                return 400, {"errors": [{"message": f"bad request: {e}"}]}, template
+
+        return 404, {"errors": [{"message": "The specified resource does not exist."}]}, path
+
+
+class MockCanvasServer(ThreadingHTTPServer):
+    """
+    Threaded localhost HTTP server backed by a MockCanvasState.
+
+    :param latency: Seconds added to every response.
+    :param jitter: Up to this many extra random seconds per response.
+    :param rate_limit: Enforce a Canvas-style leaky bucket and send X-Rate-Limit-Remaining /
+        X-Request-Cost headers (403 "Rate Limit Exceeded" when empty).
+    :param page_size: Default per_page for paginated lists.
+    :param job_delay: Seconds before a Progress job (update_grades, bulk column data) completes.
+    :param error_rate: Share of requests answered with 503 before they are handled.
+    """
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, host="127.0.0.1", port=0, latency=0.0, jitter=0.0, rate_limit=False, bucket_capacity=700.0,
+                 leak_rate=10.0, request_cost=1.0, page_size=DEFAULT_PAGE_SIZE, job_delay=0.0, verbose=False,
+                 state=None, error_rate=0.0):
+        super().__init__((host, port), MockCanvasHandler)
+        self.state = state or MockCanvasState()
+        self.latency = latency
+        self.jitter = jitter
+        self.bucket = RateLimitBucket(bucket_capacity, leak_rate, request_cost) if rate_limit else None
+        self.page_size = page_size
+        self.job_delay = job_delay
+        self.error_rate = error_rate
+        self.verbose = verbose
+        self.course_id = MOCK_COURSE_ID
+        self.admin_token = MOCK_ADMIN_TOKEN
+        self.stats_lock = threading.Lock()
+        self.thread = None
+        self.reset_stats()
+
+    @property
+    def url(self):
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def record(self, method, template, status, bytes_in, bytes_out):
+        with self.stats_lock:
+            self.requests += 1
+            self.bytes_in += bytes_in
+            self.bytes_out += bytes_out
+            key = f"{method} {template}"
+            self.by_endpoint[key] = self.by_endpoint.get(key, 0) + 1
+            if status == 403:
+                self.rate_limited += 1
+            elif status >= 500:
+                self.server_errors += 1
+
+    def reset_stats(self):
+        with self.stats_lock:
+            self.requests = 0
+            self.bytes_in = 0
+            self.bytes_out = 0
+            self.rate_limited = 0
+            self.server_errors = 0
+            self.by_endpoint = {}
+
+    def stats(self):
+        """Request counts and bytes seen by the server since the last reset_stats()."""
+        with self.stats_lock:
+            return {"requests": self.requests, "bytes_in": self.bytes_in, "bytes_out": self.bytes_out,
+                    "rate_limited": self.rate_limited, "server_errors": self.server_errors,
+                    "by_endpoint": dict(self.by_endpoint)}
+
+    def start(self):
+        """Serves requests on a background thread and returns self."""
+        self.thread = threading.Thread(target=self.serve_forever, name="mock-canvas", daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run a local Canvas API stand-in.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds added to each response")
+    parser.add_argument("--jitter", type=float, default=0.0, help="extra random seconds per response")
+    parser.add_argument("--rate-limit", action="store_true", help="enforce a Canvas-style leaky bucket")
+    parser.add_argument("--bucket-capacity", type=float, default=700.0)
+    parser.add_argument("--leak-rate", type=float, default=10.0)
+    parser.add_argument("--request-cost", type=float, default=1.0)
+    parser.add_argument("--page-size", type=int, default=DEFAULT_PAGE_SIZE)
+    parser.add_argument("--job-delay", type=float, default=0.0, help="seconds before Progress jobs complete")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="share of requests answered with 503")
+    parser.add_argument("--students", type=int, default=0, help="students to create and enroll at startup")
+    parser.add_argument("--data-file", help="write the seeded students here in canvas_data.json format")
+    parser.add_argument("--verbose", action="store_true")
+    args = parser.parse_args()
+
+    server = MockCanvasServer(args.host, args.port, latency=args.latency, jitter=args.jitter,
+                              rate_limit=args.rate_limit, bucket_capacity=args.bucket_capacity,
+                              leak_rate=args.leak_rate, request_cost=args.request_cost, page_size=args.page_size,
+                              job_delay=args.job_delay, verbose=args.verbose, error_rate=args.error_rate)
+    students = server.state.seed_students(args.students)
+    if args.data_file:
+        with open(args.data_file, "w") as file:
+            json.dump({"students": students, "quizzes": []}, file, indent=4)
+
+    print(f"Mock Canvas running at {server.url} (token: {MOCK_ADMIN_TOKEN}, course: {MOCK_COURSE_ID}, "
+          f"students: {len(students)})")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,222 @@
+"""
+Tests for the grade sync workflows in GettingStartedWithCanvasAPI_2.py, run against the
+local Canvas stand-in (mock_canvas.py).
+
+Usage:
+    python -m unittest test_grade_sync
+"""
+import contextlib
+import io
+import json
+import os
+import random
+import tempfile
+import unittest
+
+import GettingStartedWithCanvasAPI_2 as canvas_sbg
+from mock_canvas import MOCK_ADMIN_TOKEN, MockCanvasServer
+
+STUDENTS = 30
+QUIZ_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "quiz_data.json")
+
+# Not the identity: a grade posted as "75%" of 10 points is a score of 7.5, which this
+# mapping would turn into "100%" if it were ever mapped again
+MAPPING = {"quiz_4_mapping_data": {"0-3": "50%", "4-6": "75%", ">=7": "100%"}}
+
+
+def quietly(func, *args, **kwargs):
+    """Runs func with its progress output suppressed."""
+    with contextlib.redirect_stdout(io.StringIO()):
+        return func(*args, **kwargs)
+
+
+class GradeSyncTestCase(unittest.TestCase):
+    """Each test gets a fresh mock course where STUDENTS students have taken a mapped quiz."""
+
+    def setUp(self):
+        self.workdir = tempfile.TemporaryDirectory()
+        self.settings = {name: getattr(canvas_sbg, name) for name in ("STATE_DB", "DATA_FILE")}
+        canvas_sbg.STATE_DB = os.path.join(self.workdir.name, "canvas_state.db")
+        canvas_sbg.DATA_FILE = os.path.join(self.workdir.name, "no_legacy_data.json")
+
+        self.server = MockCanvasServer().start()
+        students = self.server.state.seed_students(STUDENTS)
+        canvas_sbg.get_state_store().add_students(students)
+        quietly(canvas_sbg.initialize_canvas, api_url=self.server.url, token=MOCK_ADMIN_TOKEN,
+                course_id=self.server.course_id)
+        self.course_id = self.server.course_id
+
+        report = quietly(canvas_sbg.create_quiz_from_json, self.course_id, "Sync Quiz", json_file=QUIZ_FILE)
+        self.quiz_id = report["quiz_id"]
+        self.assignment_id = self.server.state.quizzes[self.quiz_id]["assignment_id"]
+        rng = random.Random(7)
+        correct_answers_map = {index: rng.sample(range(1, 11), rng.randint(0, 10)) for index in range(STUDENTS)}
+        quietly(canvas_sbg.complete_quiz_for_students, self.course_id, self.quiz_id, correct_answers_map, seed=7)
+        quietly(canvas_sbg.append_mapping_to_quiz_description, self.course_id, self.quiz_id, MAPPING)
+
+    def tearDown(self):
+        self.server.stop()
+        canvas_sbg.get_state_store().close()
+        for name, value in self.settings.items():
+            setattr(canvas_sbg, name, value)
+        self.workdir.cleanup()
+
+    def expected_scores(self):
+        """{user_id: score} that the mapped grade of each student's raw quiz score stands for."""
+        grade_mapping = canvas_sbg.compile_grade_mapping(MAPPING)
+        points_possible = self.server.state.quizzes[self.quiz_id]["points_possible"]
+        return {submission["user_id"]: grade_mapping.percent(submission["score"]) / 100.0 * points_possible
+                for submission in self.server.state.quiz_submissions.values()
+                if submission["quiz_id"] == self.quiz_id and submission["score"] is not None}
+
+    def expected_labels(self):
+        """{user_id: mapped grade} of each student's raw quiz score."""
+        grade_mapping = canvas_sbg.compile_grade_mapping(MAPPING)
+        return {submission["user_id"]: grade_mapping.label(submission["score"])
+                for submission in self.server.state.quiz_submissions.values()
+                if submission["quiz_id"] == self.quiz_id and submission["score"] is not None}
+
+    def column_contents(self):
+        """{user_id: content} of the quiz's "<title> %" column."""
+        column_id = next(column["id"] for column in self.server.state.columns.values()
+                         if column["title"] == "Sync Quiz %")
+        return dict(self.server.state.column_data[column_id])
+
+    def posted_scores(self):
+        """{user_id: score} as the mock's assignment submissions hold them."""
+        return {user_id: submission["score"] for (assignment_id, user_id), submission
+                in self.server.state.submissions.items() if assignment_id == self.assignment_id}
+
+
+class SyncCourseGradesTest(GradeSyncTestCase):
+
+    def test_rerun_changes_nothing(self):
+        first = quietly(canvas_sbg.sync_course_grades, self.course_id)
+        self.assertGreater(first["grades"]["posted"], 0)
+        self.assertEqual(self.posted_scores(), self.expected_scores())
+
+        second = quietly(canvas_sbg.sync_course_grades, self.course_id)
+        self.assertEqual(second["columns"]["sent"], 0)
+        self.assertEqual(second["grades"]["posted"], 0)
+        self.assertEqual(second["grades"]["unchanged"], STUDENTS)
+        self.assertEqual(self.posted_scores(), self.expected_scores())
+
+    def test_dry_run_creates_no_columns(self):
+        plan = quietly(canvas_sbg.sync_course_grades, self.course_id, dry_run=True)
+        self.assertEqual(self.server.state.columns, {})
+        self.assertEqual(plan["columns"]["create_columns"], ["Sync Quiz %"])
+        self.assertEqual(len(plan["columns"]["changes"]), STUDENTS)
+
+
+class UpdateGradebookColumnTest(GradeSyncTestCase):
+
+    def test_dry_run_creates_no_column(self):
+        plan = quietly(canvas_sbg.update_gradebook_column_for_quiz, self.course_id, self.quiz_id, MAPPING,
+                       dry_run=True)
+        self.assertEqual(self.server.state.columns, {})
+        self.assertEqual(plan["create_column"], "Sync Quiz %")
+        self.assertEqual(len(plan["changes"]), STUDENTS)
+
+    def test_rerun_changes_nothing(self):
+        first = quietly(canvas_sbg.update_gradebook_column_for_quiz, self.course_id, self.quiz_id, MAPPING)
+        self.assertEqual(first["sent"], STUDENTS)
+        second = quietly(canvas_sbg.update_gradebook_column_for_quiz, self.course_id, self.quiz_id, MAPPING)
+        self.assertEqual(second["sent"], 0)
+
+    def test_incremental_run_after_grading_maps_raw_scores(self):
+        quietly(canvas_sbg.update_gradebook_column_for_quiz, self.course_id, self.quiz_id, MAPPING, incremental=True)
+        quietly(canvas_sbg.update_quiz_grades, self.course_id, self.assignment_id, MAPPING)
+        quietly(canvas_sbg.update_gradebook_column_for_quiz, self.course_id, self.quiz_id, MAPPING, incremental=True)
+        self.assertEqual(self.column_contents(), self.expected_labels())
+
+
+class UpdateQuizGradesTest(GradeSyncTestCase):
+
+    def test_rerun_changes_nothing(self):
+        first = quietly(canvas_sbg.update_quiz_grades, self.course_id, self.assignment_id, MAPPING)
+        self.assertGreater(first["posted"], 0)
+        self.assertEqual(self.posted_scores(), self.expected_scores())
+
+        second = quietly(canvas_sbg.update_quiz_grades, self.course_id, self.assignment_id, MAPPING)
+        self.assertEqual(second["posted"], 0)
+        self.assertEqual(second["unchanged"], STUDENTS)
+        self.assertEqual(self.posted_scores(), self.expected_scores())
+
+    def test_dry_run_after_sync_plans_nothing(self):
+        quietly(canvas_sbg.update_quiz_grades, self.course_id, self.assignment_id, MAPPING)
+        plan = quietly(canvas_sbg.update_quiz_grades, self.course_id, self.assignment_id, MAPPING, dry_run=True)
+        self.assertEqual(plan["changes"], [])
+
+    def test_rerun_after_fallback_posts_changes_nothing(self):
+        post_grade_chunk = canvas_sbg.post_grade_chunk
+        canvas_sbg.post_grade_chunk = lambda *args, **kwargs: False # every student is posted one at a time
+        try:
+            first = quietly(canvas_sbg.update_quiz_grades, self.course_id, self.assignment_id, MAPPING,
+                            incremental=True)
+        finally:
+            canvas_sbg.post_grade_chunk = post_grade_chunk
+        self.assertGreater(first["fallback_updated"], 0)
+
+        # The fallback posts are read back (they are inside the overlap) but already match
+        second = quietly(canvas_sbg.update_quiz_grades, self.course_id, self.assignment_id, MAPPING,
+                         incremental=True)
+        self.assertEqual(second["posted"], 0)
+        self.assertEqual(self.posted_scores(), self.expected_scores())
+
+    def test_incremental_run_picks_up_grade_made_during_run(self):
+        post_grade_chunk = canvas_sbg.post_grade_chunk
+        overridden = []
+
+        def post_then_override(course_id, assignment_id, grade_data):
+            # Someone else grades a student right after this run's bulk post lands
+            result = post_grade_chunk(course_id, assignment_id, grade_data)
+            user_id = next(iter(grade_data))
+            canvas_sbg.post_grade_for_student(course_id, assignment_id, user_id, "0%")
+            overridden.append(int(user_id))
+            return result
+
+        # Submitted long ago, so only the graded watermark decides what the next run reads
+        for submission in self.server.state.submissions.values():
+            submission["submitted_at"] = "2020-01-01T00:00:00Z"
+        canvas_sbg.post_grade_chunk = post_then_override
+        try:
+            quietly(canvas_sbg.update_quiz_grades, self.course_id, self.assignment_id, MAPPING, incremental=True)
+        finally:
+            canvas_sbg.post_grade_chunk = post_grade_chunk
+        self.assertTrue(overridden)
+        self.assertNotEqual(self.posted_scores(), self.expected_scores())
+
+        second = quietly(canvas_sbg.update_quiz_grades, self.course_id, self.assignment_id, MAPPING,
+                         incremental=True)
+        self.assertEqual(second["posted"], len(overridden))
+        self.assertEqual(self.posted_scores(), self.expected_scores())
+
+
+
+class ChunkCourseGradeDataTest(unittest.TestCase):
+
+    def test_chunks_fill_up_to_max_bytes(self):
+        grades = {(assignment_id, user_id): f"{user_id % 100}%"
+                  for assignment_id in (101, 2002, 30003) for user_id in range(1000, 1012)}
+        keys = list(grades)
+        # Some of these sizes flush a chunk right where a new assignment starts
+        for max_bytes in range(200, 1200, 7):
+            chunks = canvas_sbg.chunk_course_grade_data(grades, max_bytes=max_bytes)
+            self.assertEqual(sum(len(users) for chunk in chunks for users in chunk.values()), len(grades))
+            sent = 0
+            for chunk in chunks:
+                self.assertLessEqual(len(json.dumps({"grade_data": chunk})), max_bytes)
+                sent += sum(len(users) for users in chunk.values())
+                if sent == len(grades):
+                    break
+                # The next grade must not have fit; the size estimate may only run 2 bytes high
+                # per dict (the separator the first item of each dict does not need)
+                assignment_id, user_id = keys[sent]
+                fuller = json.loads(json.dumps(chunk))
+                fuller.setdefault(str(assignment_id), {})[str(user_id)] = {"posted_grade": grades[keys[sent]]}
+                slack = 2 + 2 * len(fuller)
+                self.assertGreater(len(json.dumps({"grade_data": fuller})), max_bytes - slack)
+
+
+if __name__ == "__main__":
+    unittest.main()